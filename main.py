@@ -1,18 +1,8 @@
 import os
 import glob
 import sys
+from src.utils import tracing
 from src.utils.system import SystemUtils
-from src.processors.formats import FormatMapper
-from src.processors.tracks import TrackProcessor
-from src.processors.merger import StreamMerger
-from src.processors.compressor import VideoCompressor
-from src.processors.editor import VideoEditor
-from src.processors.division import VideoDivider
-from src.processors.stitcher import VideoStitcher
-from src.processors.watermark import Watermarker
-from src.processors.gif_maker import GifMaker
-from src.processors.remaster import VideoRemaster
-from src.processors.extractor import AudioExtractor
 
 def scan_folder(folder_path, extensions):
     files = []
@@ -20,6 +10,11 @@ def scan_folder(folder_path, extensions):
         files.extend(glob.glob(os.path.join(glob.escape(folder_path), '**', f'*{ext}'), recursive=True))
     return files
 
+def ask_workers() -> int:
+    """Asks how many files to process in parallel (blank = one per CPU core)."""
+    value = input("Parallel jobs (Enter = auto): ").strip()
+    return int(value) if value.isdigit() else 0
+
 def main():
     if not SystemUtils.check_ffmpeg_availability():
         print("❌ CRITICAL: FFmpeg not found. Please install it and add to PATH.")
@@ -39,9 +34,31 @@ def main():
     print("11. Remaster Old Footage (Denoise + Upscale)")
     print("12. Division (Split into 2 Parts)")
     print("13. Extract Audio (MP3/WAV)")
+    print("14. Batch Clean Tracks (Rules)")
+
+    choice = input("\nSelect an option (1-14): ")
+    # Spans only record when tracing is on (VIDFLOW_TRACE=trace.json)
+    with tracing.span(f"menu option {choice.strip()}", 'op'):
+        run_choice(choice)
+
+
+def run_choice(choice: str):
+    # Imported here so 'python main.py <command>' only loads the processor it runs
+    from src.utils.batch import BatchRunner
+    from src.utils.ledger import JobLedger
+    from src.utils.subtitles import SubtitleMatcher
+    from src.processors.formats import FormatMapper
+    from src.processors.tracks import TrackProcessor, TrackRules
+    from src.processors.merger import StreamMerger
+    from src.processors.compressor import VideoCompressor
+    from src.processors.editor import VideoEditor
+    from src.processors.division import VideoDivider
+    from src.processors.stitcher import VideoStitcher
+    from src.processors.watermark import Watermarker
+    from src.processors.gif_maker import GifMaker
+    from src.processors.remaster import VideoRemaster
+    from src.processors.extractor import AudioExtractor
 
-    choice = input("\nSelect an option (1-13): ")
-    
     # --- 1. CONVERT ---
     if choice == "1":
         path = input("Enter video path: ").strip('"')
@@ -81,21 +98,19 @@ def main():
     elif choice == "4":
         folder = input("Enter folder path: ").strip('"')
         merger = StreamMerger()
-        videos = scan_folder(folder, ['.mkv', '.mp4', '.avi'])
-        print(f"Found {len(videos)} videos. Scanning for subs...")
-        
-        for vid_path in videos:
-            base = os.path.splitext(vid_path)[0]
-            found_sub = None
-            for ext in ['.srt', '.ass']:
-                if os.path.exists(base + ext):
-                    found_sub = base + ext
-                    break
-            
-            if found_sub:
-                print(f"🔗 Matching: {os.path.basename(vid_path)}")
-                out = base + "_subbed.mkv"
-                merger.mux_subtitles(vid_path, found_sub, out)
+        print("Scanning for videos and subs...")
+        matches = SubtitleMatcher().match(folder)
+        print(f"Found {len(matches)} videos with subtitles.")
+        runner = BatchRunner(ask_workers())
+
+        for vid_path, tracks in matches:
+            print(f"🔗 Matching: {os.path.basename(vid_path)} ({', '.join(t.label for t in tracks)})")
+            out = os.path.splitext(vid_path)[0] + "_subbed.mkv"
+            runner.submit(os.path.basename(vid_path), merger.mux_subtitle_tracks,
+                          vid_path, tracks, out, threads=runner.threads_per_job)
+
+        runner.wait()
+        runner.summary()
 
     # --- 5. COMPRESS ---
     elif choice == "5":
@@ -103,12 +118,19 @@ def main():
         compressor = VideoCompressor()
         videos = scan_folder(folder, ['.mkv', '.mp4', '.mov'])
         threshold = 1.5 
-        
+        runner = BatchRunner(ask_workers())
+        ledger = JobLedger()  # Re-running after a crash skips files already compressed
+
         for vid in videos:
             if compressor.get_file_size_gb(vid) > threshold:
                 print(f"📉 Compressing: {os.path.basename(vid)}")
                 out = os.path.splitext(vid)[0] + "_compressed.mkv"
-                compressor.compress_audio_maintain_video(vid, out)
+                runner.submit(os.path.basename(vid), ledger.run, "compress",
+                              compressor.compress_audio_maintain_video, vid, out,
+                              threads=runner.threads_per_job)
+
+        runner.wait()
+        runner.summary()
 
     # --- 6. SHORTS ---
     elif choice == "6":
@@ -122,8 +144,9 @@ def main():
     elif choice == "7":
         path = input("Enter video path: ").strip('"')
         sec = int(input("Enter duration per part (seconds): "))
+        accurate = input("Frame-accurate cuts? (y/N): ").strip().lower() == "y"
         editor = VideoEditor()
-        editor.split_by_time(path, sec)
+        editor.split_by_time(path, sec, accurate)
 
     # --- 8. STITCH ---
     elif choice == "8":
@@ -133,16 +156,26 @@ def main():
         if files:
             out_name = input("Output filename: ")
             stitcher = VideoStitcher()
-            stitcher.concat_videos(files, os.path.join(folder, out_name))
+            stitcher.stitch(files, os.path.join(folder, out_name))
 
     # --- 9. WATERMARK ---
     elif choice == "9":
-        vid = input("Video path: ").strip('"')
+        vid = input("Video path (or folder to brand all): ").strip('"')
         img = input("Logo path: ").strip('"')
         pos = input("Position (br, bl, tr, tl, center): ")
+        size = input("Logo height as % of video (Enter = original size): ").strip()
+        first = input("Only show for the first N seconds (Enter = whole video): ").strip()
+        scale = float(size) / 100 if size else None
+        end = float(first) if first else None
         wm = Watermarker()
-        out = os.path.splitext(vid)[0] + "_branded.mp4"
-        wm.add_image_watermark(vid, img, out, pos)
+        if os.path.isdir(vid):
+            files = sorted(f for f in glob.glob(os.path.join(vid, "*"))
+                           if f.lower().endswith(('.mp4', '.mkv', '.mov', '.m4v')) and '_branded.' not in f)
+            wm.brand_batch(files, img, position=pos, scale=scale or 0.08, end=end)
+        else:
+            stem, ext = os.path.splitext(vid)
+            out = f"{stem}_branded{ext}"
+            wm.add_image_watermark(vid, img, out, pos, scale=scale, end=end)
 
     # --- 10. GIF ---
     elif choice == "10":
@@ -166,9 +199,10 @@ def main():
         try:
             print("Tip: 1 hour = 3600 seconds")
             split_time = float(input("Enter split time in seconds: "))
+            accurate = input("Frame-accurate cut? (y/N): ").strip().lower() == "y"
             
             divider = VideoDivider() # Using new class
-            success, p1, p2 = divider.split_at_intermission(path, split_time)
+            success, p1, p2 = divider.split_at_intermission(path, split_time, accurate)
             
             if success:
                 print(f"✅ Division Successful!")
@@ -181,14 +215,35 @@ def main():
         # --- OPTION 13: EXTRACT AUDIO ---
     elif choice == "13":
         path = input("Enter video path: ").strip('"')
-        fmt = input("Output format (mp3/wav/original): ").lower()
+        fmt = input("Output format (mp3/mp3-320/wav/wav24/flac/original): ").lower()
 
         extractor = AudioExtractor()
         success, out = extractor.extract_audio(path, fmt)
-    if success:
-        print(f"✅ Audio saved to: {out}")
-    else:
-        print("❌ Extraction failed.")  
+        if success:
+            print(f"✅ Audio saved to: {out}")
+        else:
+            print("❌ Extraction failed.")  
+
+    # --- 14. BATCH CLEAN TRACKS ---
+    elif choice == "14":
+        folder = input("Enter folder path: ").strip('"')
+        audio = input("Audio languages to keep (e.g. eng,jpn; Enter = all): ").strip()
+        subs = input("Subtitle languages to keep (e.g. eng; Enter = all): ").strip()
+        drop = input("Drop tracks whose title matches (e.g. commentary; Enter = none): ").strip()
+        rules = TrackRules(
+            audio_languages=audio.split(",") if audio else None,
+            subtitle_languages=subs.split(",") if subs else None,
+            drop_titles=drop or None,
+        )
+        processor = TrackProcessor()
+        stats = processor.clean_library(folder, rules, dry_run=True)
+        if stats['changed'] and input("Apply these changes? (y/N): ").strip().lower() == "y":
+            in_place = input("Replace originals instead of writing *_clean files? (y/N): ").strip().lower() == "y"
+            processor.clean_library(folder, rules, dry_run=False, in_place=in_place, workers=ask_workers())
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Non-interactive: 'python main.py remaster in.mp4 out.mp4', 'python main.py run jobs.json', ...
+        from src.utils.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
     main()
\ No newline at end of file
@@ -1,26 +1,24 @@
 import subprocess
-import json
 import os
+import sys
+
+try:
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
 
 class AudioProcessor:
     def get_track_info(self, input_path: str) -> list:
         """
-        Returns a list of audio tracks found in the video using ffprobe.
+        Returns a list of audio tracks found in the video (shared probe cache).
         """
-        cmd = [
-            'ffprobe', '-v', 'error',
-            '-show_entries', 'stream=index:stream_tags=language,title',
-            '-select_streams', 'a',
-            '-of', 'json',
-            input_path
-        ]
-        try:
-            output = subprocess.check_output(cmd)
-            data = json.loads(output)
-            return data.get('streams', [])
-        except Exception as e:
-            print(f"Error reading tracks: {e}")
+        info = get_probe().probe(input_path)
+        if info is None:
             return []
+        return [s.as_track() for s in info.audio]
 
     def keep_single_track(self, input_path: str, output_path: str, track_index: int):
         """
@@ -37,7 +35,7 @@ class AudioProcessor:
                 '-y', output_path
             ]
             
-            subprocess.run(command, check=True, capture_output=True)
+            run_ffmpeg(command)
             return True
         except subprocess.CalledProcessError:
             return False
\ No newline at end of file
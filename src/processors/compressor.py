@@ -2,19 +2,69 @@ import subprocess
 import os
 import sys
 
+try:
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.planning import COPY, TRANSCODE, StreamDecision, parse_bitrate, plan_streams
+    from src.utils.probe import get_probe
+    from src.utils.system import SystemUtils
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.planning import COPY, TRANSCODE, StreamDecision, parse_bitrate, plan_streams
+    from src.utils.probe import get_probe
+    from src.utils.system import SystemUtils
+
 class VideoCompressor:
-    def compress_audio_maintain_video(self, input_path: str, output_path: str, bitrate="384k") -> bool:
+    def get_file_size_gb(self, path: str) -> float:
+        return os.path.getsize(path) / (1024 ** 3)
+
+    # Audio codecs worth keeping as-is when they are already at or below the target bitrate
+    EFFICIENT_AUDIO = {'aac', 'mp3', 'opus', 'vorbis', 'ac3', 'eac3'}
+
+    def plan(self, input_path: str, output_path: str, bitrate="384k"):
+        """
+        Per-stream plan: video is always copied, audio is only re-encoded when that
+        actually shrinks it, and anything the output container can't hold is fixed or dropped.
+        """
+        info = get_probe().probe(input_path)
+        if info is None:
+            return None
+        target = parse_bitrate(bitrate)
+
+        def audio_rule(stream):
+            if stream.codec_name in self.EFFICIENT_AUDIO:
+                if stream.bit_rate is None:
+                    # Re-encoding blind could make the file bigger; an efficient codec is kept
+                    return StreamDecision(stream, COPY, reason="bitrate unknown, efficient codec kept")
+                if stream.bit_rate <= target:
+                    return StreamDecision(stream, COPY, reason=f"already {stream.bit_rate // 1000}k")
+            return StreamDecision(stream, TRANSCODE, ['aac', '-b:a', bitrate], f"-> aac {bitrate}")
+
+        return plan_streams(info, output_path, audio_rule=audio_rule)
+
+    def compress_audio_maintain_video(self, input_path: str, output_path: str, bitrate="384k", threads: int = 0,
+                                      skip_if_noop: bool = True) -> dict:
+        """
+        Returns {"status": "success" | "skipped" | "error", ...}. "skipped" means nothing
+        would change (skip_if_noop) and no output file was created.
+        """
+        plan = self.plan(input_path, output_path, bitrate)
+        if plan is None:
+            return {"status": "error", "message": "Could not read media info"}
+        if skip_if_noop and plan.is_noop:
+            print(f"⏭️  Already optimal, skipped: {os.path.basename(input_path)}")
+            return {"status": "skipped", "output_path": input_path, "message": "Already optimal"}
+
         command = [
             'ffmpeg', '-i', input_path,
-            '-map', '0', '-c:v', 'copy',
-            '-c:a', 'aac', '-b:a', bitrate,
-            '-c:s', 'copy', '-y', output_path
+            *plan.ffmpeg_args(), *SystemUtils.thread_args(threads),
+            '-y', output_path
         ]
         try:
-            subprocess.run(command, check=True, capture_output=True)
-            return True
+            run_ffmpeg(command)
+            return {"status": "success", "output_path": output_path}
         except subprocess.CalledProcessError as e:
-            return False
+            return {"status": "error", "message": str(e)}
 
 # --- STANDALONE EXECUTION LOGIC ---
 if __name__ == "__main__":
@@ -29,10 +79,13 @@ if __name__ == "__main__":
     comp = VideoCompressor()
     
     print(f"Compressing audio to {bitrate}...")
-    if comp.compress_audio_maintain_video(path, out, bitrate):
+    result = comp.compress_audio_maintain_video(path, out, bitrate)
+    if result["status"] == "success":
         print(f"✅ Finished: {out}")
+    elif result["status"] == "skipped":
+        print("⏭️  Nothing to do, audio is already efficient.")
     else:
-        print("❌ Failed.")
+        print(f"❌ Failed: {result['message']}")
 
 # ==========================================
 # HOW TO USE THIS CODE (EXAMPLE)
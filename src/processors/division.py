@@ -1,34 +1,114 @@
+import csv
 import subprocess
 import os
 import sys
 import math
+import tempfile
+
+try:
+    from src.utils.batch import BatchRunner
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.smartcut import SmartCutter
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.batch import BatchRunner
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.smartcut import SmartCutter
 
 class VideoDivider:
-    def split_by_chunks(self, input_path: str, segment_time: int):
+    def split_with_segmenter(self, input_path: str, output_pattern: str, segment_time: float = None,
+                             segment_times: list = None):
         """
-        Splits video into multiple chunks of X seconds (e.g., for WhatsApp Status).
+        Single-demux splitter shared by every split mode: one FFmpeg process reads the
+        file once and the segment muxer writes all parts (stream copy).
+        Returns [(path, start, end), ...] with the actual keyframe-snapped boundaries,
+        or None on failure.
         """
-        filename = os.path.splitext(os.path.basename(input_path))[0]
-        output_pattern = os.path.join(os.path.dirname(input_path), f"{filename}_part%03d.mp4")
-        
-        command = [
-            'ffmpeg', '-i', input_path, 
-            '-c', 'copy', 
-            '-f', 'segment', 
-            '-segment_time', str(segment_time), 
-            '-reset_timestamps', '1', 
+        output_dir = os.path.dirname(os.path.abspath(output_pattern))
+        fd, list_path = tempfile.mkstemp(prefix=".vidflow_segments_", suffix=".csv", dir=output_dir)
+        os.close(fd)
+
+        command = ['ffmpeg', '-i', input_path, '-c', 'copy', '-f', 'segment']
+        if segment_times:
+            command.extend(['-segment_times', ','.join(f"{t:.6f}" for t in segment_times)])
+        else:
+            command.extend(['-segment_time', str(segment_time)])
+        command.extend([
+            '-reset_timestamps', '1',
+            '-segment_list', list_path, '-segment_list_type', 'csv',
             '-y', output_pattern
-        ]
-        
+        ])
+
         try:
-            print(f"✂️  Dividing into {segment_time}s chunks...")
-            subprocess.run(command, check=True, capture_output=True)
-            return True
+            run_ffmpeg(command)
+            parts = []
+            with open(list_path, newline='', encoding='utf-8') as f:
+                for name, part_start, part_end in csv.reader(f):
+                    parts.append((os.path.join(output_dir, name), float(part_start), float(part_end)))
+            return parts
         except subprocess.CalledProcessError as e:
             print(f"Error: {e.stderr.decode()}")
-            return False
+            return None
+        finally:
+            os.remove(list_path)
 
-    def split_at_intermission(self, input_path: str, split_time: float):
+    @staticmethod
+    def _pattern(input_path: str, ext: str) -> str:
+        # '%' in the file name would be read as a segment number placeholder
+        filename = os.path.splitext(os.path.basename(input_path))[0].replace('%', '%%')
+        return os.path.join(os.path.dirname(input_path), f"{filename}_part%03d{ext}")
+
+    def split_by_chunks(self, input_path: str, segment_time: int, accurate: bool = False):
+        """
+        Splits video into multiple chunks of X seconds (e.g., for WhatsApp Status).
+        """
+        print(f"✂️  Dividing into {segment_time}s chunks...")
+        if accurate:
+            info = get_probe().probe(input_path)
+            if info is None or not info.duration:
+                return False
+            points = [t * segment_time for t in range(1, math.ceil(info.duration / segment_time))]
+            parts = self.split_at_points(input_path, points, accurate=True)
+            return parts is not None
+        ext = os.path.splitext(input_path)[1]
+        parts = self.split_with_segmenter(input_path, self._pattern(input_path, ext), segment_time=segment_time)
+        return parts is not None
+
+    def split_at_points(self, input_path: str, cut_points: list, accurate: bool = False):
+        """
+        Splits a video at any number of timestamps in one pass.
+        Returns [(path, start, end), ...]; cuts snap to the next keyframe unless
+        accurate=True, which smart-cuts every part (only boundary GOPs re-encoded).
+        """
+        ext = os.path.splitext(input_path)[1]
+        points = sorted(t for t in cut_points if t > 0)
+        if accurate:
+            return self._smart_split(input_path, self._pattern(input_path, ext), points)
+        return self.split_with_segmenter(input_path, self._pattern(input_path, ext), segment_times=points)
+
+    def _smart_split(self, input_path: str, output_pattern: str, points: list):
+        info = get_probe().probe(input_path)
+        if info is None or not info.duration:
+            return None
+        bounds = [0.0] + [t for t in points if t < info.duration] + [info.duration]
+        ranges = list(zip(bounds[:-1], bounds[1:]))
+
+        runner = BatchRunner(min(len(ranges), os.cpu_count() or 1), verbose=False)
+        cutter = SmartCutter(threads=runner.threads_per_job)
+        parts = []
+        for i, (start, end) in enumerate(ranges):
+            path = output_pattern % i
+            parts.append((path, start, end))
+            runner.submit(os.path.basename(path), cutter.cut, input_path, path, start, end)
+        runner.wait()
+        if runner.failures:
+            runner.summary()
+            return None
+        return parts
+
+    def split_at_intermission(self, input_path: str, split_time: float, accurate: bool = False):
         """
         Splits a video into exactly two parts at the specified timestamp.
         """
@@ -38,43 +118,53 @@ class VideoDivider:
         out1 = os.path.join(output_dir, f"{base_name}_First_Half{ext}")
         out2 = os.path.join(output_dir, f"{base_name}_Second_Half{ext}")
 
-        try:
-            print(f"✂️  Creating Part 1 (Start -> {split_time}s)...")
-            cmd1 = ['ffmpeg', '-i', input_path, '-to', str(split_time), '-c', 'copy', '-y', out1]
-            subprocess.run(cmd1, check=True, capture_output=True)
-
-            print(f"✂️  Creating Part 2 ({split_time}s -> End)...")
-            cmd2 = ['ffmpeg', '-ss', str(split_time), '-i', input_path, '-c', 'copy', '-y', out2]
-            subprocess.run(cmd2, check=True, capture_output=True)
-            
-            return True, out1, out2
-        except subprocess.CalledProcessError as e:
-            print(f"Error: {e.stderr.decode()}")
+        print(f"✂️  Splitting at {split_time}s ({'frame-accurate' if accurate else 'single pass'})...")
+        parts = self.split_at_points(input_path, [split_time], accurate)
+        if not parts or len(parts) != 2:
+            for path, _, _ in parts or []:
+                os.remove(path)
+            print("Error: split point is outside the video.")
             return False, None, None
 
+        os.replace(parts[0][0], out1)
+        os.replace(parts[1][0], out2)
+        actual = parts[1][1]
+        if abs(actual - split_time) > 0.01:
+            print(f"ℹ️  Cut snapped to keyframe at {actual:.3f}s")
+        return True, out1, out2
+
 # --- STANDALONE EXECUTION LOGIC ---
 if __name__ == "__main__":
     if len(sys.argv) < 3:
         print("❌ Error: Missing arguments.")
-        print("Usage: python division.py <file> <mode:chunk|cut> [args]")
+        print("Usage: python division.py <file> <mode:chunk|cut|points> [args] [accurate]")
         sys.exit(1)
 
     path = sys.argv[1]
     mode = sys.argv[2]
+    exact = sys.argv[-1] == "accurate"
     divider = VideoDivider()
 
     if mode == "chunk":
-        sec = int(sys.argv[3]) if len(sys.argv) > 3 else 30
-        if divider.split_by_chunks(path, sec):
+        sec = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] != "accurate" else 30
+        if divider.split_by_chunks(path, sec, exact):
             print("✅ Chunk division complete.")
 
     elif mode == "cut":
         # Default to 3600s (1 hour) if not specified
-        time_point = float(sys.argv[3]) if len(sys.argv) > 3 else 3600
-        success, p1, p2 = divider.split_at_intermission(path, time_point)
+        time_point = float(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] != "accurate" else 3600
+        success, p1, p2 = divider.split_at_intermission(path, time_point, exact)
         if success:
             print(f"✅ Cut Complete:\n   Part 1: {p1}\n   Part 2: {p2}")
 
+    elif mode == "points":
+        points = [float(t) for t in sys.argv[3].split(',')]
+        parts = divider.split_at_points(path, points, exact)
+        if parts:
+            print("✅ Split Complete:")
+            for part, start, end in parts:
+                print(f"   {os.path.basename(part)}  ({start:.3f}s -> {end:.3f}s)")
+
 # ==========================================
 # HOW TO USE THIS CODE (EXAMPLE)
 # ==========================================
@@ -86,4 +176,12 @@ if __name__ == "__main__":
 # Option 2: Split Movie at Specific Time (Intermission)
 # Syntax: python src/processors/division.py <VideoPath> "cut" <SplitTimeSeconds>
 # Example: python src/processors/division.py "Movie.mp4" "cut" 3600
-# (Splits the movie into Part 1 and Part 2 exactly at the 1-hour mark)
\ No newline at end of file
+# (Splits the movie into Part 1 and Part 2 exactly at the 1-hour mark)
+#
+# Option 3: Split at Several Timestamps (one read of the file)
+# Syntax: python src/processors/division.py <VideoPath> "points" <T1,T2,...>
+# Example: python src/processors/division.py "Movie.mp4" "points" 1800,3600,5400
+#
+# Add "accurate" at the end of any mode for frame-exact cuts (smart cut: only the
+# GOPs around each cut are re-encoded, the rest is copied)
+# Example: python src/processors/division.py "Movie.mp4" "cut" 3600.48 accurate
\ No newline at end of file
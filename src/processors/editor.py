@@ -3,44 +3,82 @@ import os
 import sys
 import math
 
+try:
+    from src.utils.cache import get_result_cache
+    from src.utils.ffmpeg import console_progress, run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.segments import SegmentEncoder
+    from src.utils.pipeline import PipelineStage
+    from src.utils.autotune import PresetAutotuner
+    from src.processors.division import VideoDivider
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.cache import get_result_cache
+    from src.utils.ffmpeg import console_progress, run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.segments import SegmentEncoder
+    from src.utils.pipeline import PipelineStage
+    from src.utils.autotune import PresetAutotuner
+    from src.processors.division import VideoDivider
+
 class VideoEditor:
-    def convert_to_shorts_style(self, input_path: str, output_path: str):
-        """Converts Landscape to Vertical (9:16) with blur background."""
-        filter_cmd = (
-            "split[a][b];"
-            "[a]scale=1080:1920:force_original_aspect_ratio=increase,boxblur=20:20[bg];"
-            "[b]scale=1080:-1[fg];"
-            "[bg][fg]overlay=(W-w)/2:(H-h)/2"
-        )
+    SHORTS_FILTER = (
+        "split[a][b];"
+        "[a]scale=1080:1920:force_original_aspect_ratio=increase,boxblur=20:20[bg];"
+        "[b]scale=1080:-1[fg];"
+        "[bg][fg]overlay=(W-w)/2:(H-h)/2"
+    )
+    ENCODER_ARGS = ['-c:v', 'libx264', '-preset', 'fast', '-crf', '23']
+
+    def shorts_stage(self) -> PipelineStage:
+        """9:16 blur-background layout as a fusable pipeline stage."""
+        return PipelineStage.from_chain("shorts", self.SHORTS_FILTER, encoder_args=self.ENCODER_ARGS)
+
+    def convert_to_shorts_style(self, input_path: str, output_path: str, segments: int = 0, realtime: float = None,
+                                deadline: float = None):
+        """
+        Converts Landscape to Vertical (9:16) with blur background.
+        realtime: autotune the x264 preset to reach this speed (1.0 = realtime).
+        deadline: alternatively, autotune so the whole file takes at most this many seconds.
+        """
+        cache = get_result_cache()
+        key = cache.key("shorts", [input_path], {'filter': self.SHORTS_FILTER, 'encoder': self.ENCODER_ARGS,
+                                                 'realtime': realtime, 'deadline': deadline, 'segments': segments,
+                                                 'ext': os.path.splitext(output_path)[1].lower()})
+        if cache.fetch(key, [output_path]):
+            print("⚡ Short served from the result cache")
+            return True
+
+        encoder_args = self.ENCODER_ARGS
+        if realtime or deadline:
+            encoder_args = PresetAutotuner().encoder_args(encoder_args, input_path, self.SHORTS_FILTER,
+                                                          realtime=realtime, deadline=deadline, segments=segments)
+
+        if segments > 1:
+            print(f"⏳ Processing in {segments} parallel segments...")
+            ok = SegmentEncoder(segments, overlap=0).encode(input_path, output_path, self.SHORTS_FILTER, encoder_args)
+            if ok:
+                cache.store(key, "shorts", [output_path])
+            return ok
+
         command = [
             'ffmpeg', '-i', input_path,
-            '-vf', filter_cmd,
-            '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
+            '-vf', self.SHORTS_FILTER,
+            *encoder_args,
             '-c:a', 'copy', '-y', output_path
         ]
         try:
             print("⏳ Processing (this may take time)...")
-            subprocess.run(command, check=True, capture_output=True)
+            info = get_probe().probe(input_path)
+            run_ffmpeg(command, on_progress=console_progress, duration=info.duration if info else None)
+            cache.store(key, "shorts", [output_path])
             return True
         except subprocess.CalledProcessError as e:
             print(f"Error: {e.stderr.decode()}")
             return False
 
-    def split_by_time(self, input_path: str, segment_time: int):
-        filename = os.path.splitext(os.path.basename(input_path))[0]
-        output_dir = os.path.dirname(input_path)
-        output_pattern = os.path.join(output_dir, f"{filename}_part%03d.mp4")
-        
-        command = [
-            'ffmpeg', '-i', input_path, '-c', 'copy', '-f', 'segment',
-            '-segment_time', str(segment_time), '-reset_timestamps', '1',
-            '-y', output_pattern
-        ]
-        try:
-            subprocess.run(command, check=True, capture_output=True)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+    def split_by_time(self, input_path: str, segment_time: int, accurate: bool = False):
+        return VideoDivider().split_by_chunks(input_path, segment_time, accurate)
 
 # --- STANDALONE EXECUTION LOGIC ---
 if __name__ == "__main__":
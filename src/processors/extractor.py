@@ -3,68 +3,172 @@ import os
 import sys
 from pathlib import Path
 
+try:
+    from src.utils.cache import get_result_cache
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.subtitles import normalize_language
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.cache import get_result_cache
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.subtitles import normalize_language
+
 class AudioExtractor:
-    def extract_audio(self, input_path: str, output_format: str = "mp3"):
+    # format -> (codec args, file extension); 'original' copies the stream
+    FORMATS = {
+        "mp3": (['-c:a', 'libmp3lame', '-q:a', '2'], "mp3"),         # High Quality VBR MP3
+        "mp3-320": (['-c:a', 'libmp3lame', '-b:a', '320k'], "mp3"),
+        "wav": (['-c:a', 'pcm_s16le'], "wav"),                       # Uncompressed 16-bit
+        "wav24": (['-c:a', 'pcm_s24le'], "wav"),                     # Uncompressed 24-bit
+        "flac": (['-c:a', 'flac', '-compression_level', '8'], "flac"),
+        "aac": (['-c:a', 'aac', '-b:a', '256k'], "aac"),
+        "opus": (['-c:a', 'libopus', '-b:a', '160k'], "opus"),
+    }
+    # Any other format name is encoded with this and keeps its name as the extension
+    FALLBACK_CODEC = ['-c:a', 'aac']
+    # Source codec -> container that can hold it as-is (stream copy)
+    COPY_EXTENSIONS = {
+        "aac": "aac", "mp3": "mp3", "mp2": "mp2", "ac3": "ac3", "eac3": "eac3", "dts": "dts",
+        "truehd": "thd", "flac": "flac", "opus": "opus", "vorbis": "ogg", "alac": "m4a",
+    }
+
+    @staticmethod
+    def select_tracks(info, selector) -> list:
         """
-        Extracts audio track from video.
-        output_format: 'mp3', 'wav', 'aac', or 'original' (copy stream).
+        Resolves a track selector to audio streams:
+        'default' (the default-flagged or first track), 'all', a track number (0, 1, ...)
+        or a language code ('en', 'eng', 'lang:jpn'; 2- and 3-letter codes match each other).
         """
+        tracks = info.audio
+        selector = str(selector).lower() if selector is not None else "default"
+        if selector == "all":
+            return tracks
+        if selector == "default":
+            flagged = [t for t in tracks if 'default' in t.disposition]
+            return (flagged or tracks)[:1]
+        if selector.isdigit():
+            return [t for t in tracks if t.type_index == int(selector)]
+        language = normalize_language(selector.split(":", 1)[-1])
+        return [t for t in tracks if normalize_language(t.language) == language]
+
+    def _codec_args(self, output_format: str) -> list:
+        if output_format == "original":
+            return ['-c:a', 'copy']
+        return self.FORMATS[output_format][0] if output_format in self.FORMATS else self.FALLBACK_CODEC
+
+    def _extension(self, stream, output_format: str) -> str:
+        if output_format != "original":
+            return self.FORMATS[output_format][1] if output_format in self.FORMATS else output_format
+        codec = stream.codec_name or ""
+        if codec.startswith("pcm_"):
+            return "wav"
+        return self.COPY_EXTENSIONS.get(codec, "mka")  # Matroska holds anything else
+
+    def extract_targets(self, input_path: str, targets: list, output_folder: str = None):
+        """
+        Produces every (track selector, format) target from ONE read of the input,
+        e.g. [("all", "flac"), ("eng", "mp3-320")].
+        Returns (success, [output paths]).
+        """
+        info = get_probe().probe(input_path)
+        if info is None or not info.audio:
+            print("❌ No audio tracks found.")
+            return False, []
+
+        jobs = []
+        for selector, output_format in targets:
+            if output_format != "original" and output_format not in self.FORMATS:
+                # Kept from the original extractor: other formats got a generic AAC encode
+                print(f"ℹ️  Unknown format '{output_format}', encoding AAC into .{output_format}")
+            streams = self.select_tracks(info, selector)
+            if not streams:
+                print(f"⚠️  No audio track matches '{selector}'")
+            jobs.extend((stream, output_format) for stream in streams)
+        if not jobs:
+            return False, []
+
         filename = Path(input_path).stem
-        output_folder = os.path.dirname(input_path)
-        
-        # Determine output extension
-        ext = output_format if output_format != "original" else "aac"
-        output_path = os.path.join(output_folder, f"{filename}.{ext}")
+        output_folder = output_folder or os.path.dirname(input_path)
+        single = len(jobs) == 1
+        command = ['ffmpeg', '-i', input_path]
+        outputs = []
+        for stream, output_format in jobs:
+            ext = self._extension(stream, output_format)
+            name = filename
+            if not single:
+                name += f".a{stream.type_index}" + (f".{stream.language}" if stream.language else "")
+            path = os.path.join(output_folder, f"{name}.{ext}")
+            if path in outputs:
+                path = os.path.join(output_folder, f"{name}.{output_format}.{ext}")
+            outputs.append(path)
 
-        # Base command: Input file + Disable Video (-vn)
-        command = ['ffmpeg', '-i', input_path, '-vn']
+            command.extend(['-map', f'0:{stream.index}', *self._codec_args(output_format), '-y', path])
 
-        if output_format == "original":
-            # Stream Copy (Instant, no quality loss)
-            command.extend(['-c:a', 'copy'])
-        elif output_format == "mp3":
-            # High Quality MP3
-            command.extend(['-c:a', 'libmp3lame', '-q:a', '2'])
-        elif output_format == "wav":
-            # Uncompressed Audio
-            command.extend(['-c:a', 'pcm_s16le'])
-        else:
-            # Generic re-encode for other formats
-            command.extend(['-c:a', 'aac'])
-
-        command.extend(['-y', output_path])
+        cache = get_result_cache()
+        key = cache.key("extract_audio", [input_path], {'tracks': [(s.index, f) for s, f in jobs],
+                                                        'ext': [os.path.splitext(p)[1].lower() for p in outputs]})
+        if cache.fetch(key, outputs):
+            print(f"⚡ Audio served from the result cache ({len(outputs)} file(s))")
+            return True, outputs
 
         try:
-            print(f"🎵 Extracting Audio ({output_format})...")
-            subprocess.run(command, check=True, capture_output=True)
-            return True, output_path
+            print(f"🎵 Extracting Audio ({', '.join(sorted({f for _, f in jobs}))}, {len(outputs)} file(s), one pass)...")
+            run_ffmpeg(command, duration=info.duration)
+            cache.store(key, "extract_audio", outputs)
+            return True, outputs
         except subprocess.CalledProcessError as e:
             print(f"Error: {e.stderr.decode()}")
-            return False, None
+            return False, []
+
+    def extract_audio(self, input_path: str, output_format: str = "mp3"):
+        """
+        Extracts audio track from video.
+        output_format: 'mp3', 'mp3-320', 'wav', 'wav24', 'flac', 'aac', 'opus',
+        or 'original' (copy stream, saved with the extension its codec needs).
+        Any other name (e.g. 'm4a') is encoded as AAC and used as the extension.
+        """
+        success, outputs = self.extract_targets(input_path, [("default", output_format)])
+        return success, outputs[0] if success else None
 
 # --- STANDALONE EXECUTION LOGIC ---
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python extractor.py <video_file> [format:mp3|wav|original]")
+        print("Usage: python extractor.py <video_file> [format | track:format ...]")
         sys.exit(1)
 
     path = sys.argv[1]
-    fmt = sys.argv[2] if len(sys.argv) > 2 else "mp3"
-    
+    specs = sys.argv[2:] or ["mp3"]
     extractor = AudioExtractor()
-    success, out = extractor.extract_audio(path, fmt)
-    
-    if success:
-        print(f"✅ Extracted: {out}")
+
+    if len(specs) == 1 and ":" not in specs[0]:
+        success, out = extractor.extract_audio(path, specs[0])
+        if success:
+            print(f"✅ Extracted: {out}")
+    else:
+        targets = [tuple(spec.rsplit(":", 1)) if ":" in spec else ("default", spec) for spec in specs]
+        success, outs = extractor.extract_targets(path, targets)
+        if success:
+            print("✅ Extracted:")
+            for out in outs:
+                print(f"   {out}")
 
 # ==========================================
 # HOW TO USE THIS CODE
 # ==========================================
 #
 # Syntax: python src/processors/extractor.py <VideoPath> <Format>
+#         python src/processors/extractor.py <VideoPath> <Track>:<Format> [<Track>:<Format> ...]
+#
+# Formats: mp3, mp3-320, wav, wav24, flac, aac, opus, original
+# Tracks:  default, all, 0/1/2... (audio track number), eng/jpn/... (language)
 #
 # Example 1 (Convert to MP3):
 # python src/processors/extractor.py "MusicVideo.mp4" "mp3"
 #
-# Example 2 (Instant Extraction/Copy):
-# python src/processors/extractor.py "MusicVideo.mp4" "original"
\ No newline at end of file
+# Example 2 (Instant Extraction/Copy, e.g. AC3 -> .ac3):
+# python src/processors/extractor.py "MusicVideo.mp4" "original"
+#
+# Example 3 (Archive rip: every track to FLAC + English to MP3 320k, one read):
+# python src/processors/extractor.py "Movie.mkv" all:flac eng:mp3-320
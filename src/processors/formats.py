@@ -3,21 +3,33 @@ import subprocess
 import sys
 from pathlib import Path
 
+try:
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.planning import plan_streams
+    from src.utils.probe import get_probe
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.planning import plan_streams
+    from src.utils.probe import get_probe
+
 class FormatMapper:
     def convert_video(self, input_path: str, output_folder: str, target_format: str) -> dict:
         filename = Path(input_path).stem
         output_path = os.path.join(output_folder, f"{filename}.{target_format}")
-        
-        if target_format == 'mkv':
-            cmd_flags = ['-map', '0', '-c', 'copy']
-        elif target_format == 'mp4':
-            cmd_flags = ['-c:v', 'copy', '-c:a', 'copy', '-c:s', 'mov_text']
-        else:
-            cmd_flags = ['-c', 'copy']
 
-        command = ['ffmpeg', '-i', input_path, *cmd_flags, '-y', output_path]
+        # Decide per stream (copy / convert / drop) before reading the whole file,
+        # e.g. image-based subtitles are dropped for MP4 instead of failing at the end
+        info = get_probe().probe(input_path)
+        if info is None:
+            return {"status": "error", "message": "Could not read media info"}
+        plan = plan_streams(info, output_path)
+        if plan.is_noop:
+            return {"status": "skipped", "output_path": input_path, "message": f"Already {target_format}"}
+
+        command = ['ffmpeg', '-i', input_path, *plan.ffmpeg_args(), '-y', output_path]
         try:
-            subprocess.run(command, check=True, capture_output=True)
+            run_ffmpeg(command)
             return {"status": "success", "output_path": output_path}
         except subprocess.CalledProcessError as e:
             return {"status": "error", "message": str(e)}
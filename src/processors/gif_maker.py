@@ -2,7 +2,36 @@ import subprocess
 import os
 import sys
 
+try:
+    from src.utils.cache import get_result_cache
+    from src.utils.ffmpeg import run_ffmpeg
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.cache import get_result_cache
+    from src.utils.ffmpeg import run_ffmpeg
+
+class GifClip:
+    """One GIF to cut from a source: start/duration in seconds, output width and frame rate."""
+
+    def __init__(self, start: float, duration: float = 5, width: int = 480, fps: int = 15, output_path: str = None):
+        self.start = float(start)
+        self.duration = float(duration)
+        self.width = width
+        self.fps = fps
+        self.output_path = output_path
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+
 class GifMaker:
+    # Extra encodes per clip when short video variants are requested
+    VARIANT_ARGS = {
+        "mp4": ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '23', '-movflags', '+faststart'],
+        "webp": ['-c:v', 'libwebp', '-loop', '0', '-q:v', '75'],
+    }
+
     def create_high_quality_gif(self, input_path: str, output_path: str, start_time: int = 0, duration: int = 5, width: int = 480):
         """
         Converts video to GIF using a 2-pass palette generation for high quality.
@@ -25,9 +54,117 @@ class GifMaker:
             '-y', output_path
         ]
 
+        cache = get_result_cache()
+        key = cache.key("gif", [input_path], {'filter': filter_cmd, 'start': start_time, 'duration': duration,
+                                                  'ext': os.path.splitext(output_path)[1].lower()})
+        if cache.fetch(key, [output_path]):
+            print("⚡ GIF served from the result cache")
+            return True
+
         try:
             print(f"🎨 Generating High-Quality GIF ({duration}s)...")
-            subprocess.run(command, check=True, capture_output=True)
+            run_ffmpeg(command)
+            cache.store(key, "gif", [output_path])
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
+
+    @staticmethod
+    def _group_clips(clips: list, max_gap: float) -> list:
+        """Clips close together share one seek + decode; far-apart ones get their own."""
+        groups = []
+        for clip in sorted(clips, key=lambda c: c.start):
+            if groups and clip.start - max(c.end for c in groups[-1]) <= max_gap:
+                groups[-1].append(clip)
+            else:
+                groups.append([clip])
+        return groups
+
+    def _group_command(self, input_path: str, group: list, variants: list, cache_palettes: bool) -> list:
+        group_start = group[0].start
+        group_end = max(c.end for c in group)
+
+        # One decode, split into one branch per clip; each branch trims its range and
+        # runs its own palettegen/paletteuse (plus optional MP4/WebP copies)
+        graph = [f"[0:v]split={len(group)}" + "".join(f"[c{i}]" for i in range(len(group)))]
+        outputs = []
+        for i, clip in enumerate(group):
+            branches = 2 + len(variants)  # The cached palette is split off palettegen, not here
+            graph.append(
+                f"[c{i}]trim=start={clip.start - group_start:.3f}:duration={clip.duration:.3f},"
+                f"setpts=PTS-STARTPTS,fps={clip.fps},scale={clip.width}:-2:flags=lanczos,"
+                f"split={branches}[g{i}][p{i}src]" + "".join(f"[v{i}_{k}]" for k in range(branches - 2))
+            )
+            if cache_palettes:
+                graph.append(f"[p{i}src]palettegen,split[p{i}][pal{i}]")
+                outputs.append((f"[pal{i}]", ['-frames:v', '1', '-update', '1'], self.palette_path(clip.output_path)))
+            else:
+                graph.append(f"[p{i}src]palettegen[p{i}]")
+            graph.append(f"[g{i}][p{i}]paletteuse[gif{i}]")
+            outputs.append((f"[gif{i}]", [], clip.output_path))
+            for k, variant in enumerate(variants):
+                variant_path = os.path.splitext(clip.output_path)[0] + f".{variant}"
+                outputs.append((f"[v{i}_{k}]", self.VARIANT_ARGS[variant], variant_path))
+
+        command = [
+            'ffmpeg', '-ss', f"{group_start:.3f}", '-t', f"{group_end - group_start:.3f}",
+            '-i', input_path,
+            '-filter_complex', ";".join(graph)
+        ]
+        for label, args, path in outputs:
+            command.extend(['-map', label, *args, '-y', path])
+        return command
+
+    def _render_group(self, input_path: str, group: list, variants: list, cache_palettes: bool) -> bool:
+        command = self._group_command(input_path, group, variants, cache_palettes)
+        try:
+            run_ffmpeg(command, label=f"{len(group)} clips @ {group[0].start:.0f}s")
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
+
+    @staticmethod
+    def palette_path(gif_path: str) -> str:
+        return os.path.splitext(gif_path)[0] + ".palette.png"
+
+    def create_gif_batch(self, input_path: str, clips: list, output_folder: str = None, variants: list = None,
+                         cache_palettes: bool = False, max_gap: float = 30.0) -> list:
+        """
+        Makes many GIFs from one source with one decode per group of nearby ranges.
+        clips: GifClip objects or (start, duration, width, fps) tuples.
+        variants: extra short clips per range, e.g. ['mp4', 'webp'].
+        cache_palettes: also save each clip's palette for fast re-renders at other widths.
+        Returns the list of GIF paths that were created.
+        """
+        variants = [v for v in (variants or []) if v in self.VARIANT_ARGS]
+        output_folder = output_folder or os.path.dirname(input_path)
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+
+        clips = [c if isinstance(c, GifClip) else GifClip(*c) for c in clips]
+        for i, clip in enumerate(clips):
+            if not clip.output_path:
+                clip.output_path = os.path.join(output_folder, f"{stem}_clip{i + 1:02d}_{clip.start:g}s.gif")
+
+        groups = self._group_clips(clips, max_gap)
+        print(f"🎨 Generating {len(clips)} GIFs from {len(groups)} decode pass(es)...")
+        created = []
+        for group in groups:
+            if self._render_group(input_path, group, variants, cache_palettes):
+                created.extend(c.output_path for c in group)
+        return created
+
+    def render_with_palette(self, input_path: str, clip: GifClip, palette_path: str, output_path: str) -> bool:
+        """Re-renders a clip (e.g. at another width) reusing its cached palette: single pass, no palettegen."""
+        command = [
+            'ffmpeg', '-ss', f"{clip.start:.3f}", '-t', f"{clip.duration:.3f}",
+            '-i', input_path, '-i', palette_path,
+            '-filter_complex', f"[0:v]fps={clip.fps},scale={clip.width}:-1:flags=lanczos[x];[x][1:v]paletteuse",
+            '-y', output_path
+        ]
+        try:
+            run_ffmpeg(command)
             return True
         except subprocess.CalledProcessError as e:
             print(f"Error: {e.stderr.decode()}")
@@ -37,9 +174,18 @@ class GifMaker:
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python gif_maker.py <video_path> [start_sec] [duration_sec] [width_px]")
+        print("       python gif_maker.py <video_path> batch <start:duration,...> [width_px]")
         sys.exit(1)
 
     path = sys.argv[1]
+    if len(sys.argv) > 3 and sys.argv[2] == "batch":
+        width = int(sys.argv[4]) if len(sys.argv) > 4 else 480
+        ranges = [r.split(':') for r in sys.argv[3].split(',')]
+        clips = [GifClip(float(s), float(d), width) for s, d in ranges]
+        created = GifMaker().create_gif_batch(path, clips)
+        print(f"✅ {len(created)}/{len(clips)} GIFs created.")
+        sys.exit(0 if len(created) == len(clips) else 1)
+
     start = int(sys.argv[2]) if len(sys.argv) > 2 else 0
     dur = int(sys.argv[3]) if len(sys.argv) > 3 else 5
     width = int(sys.argv[4]) if len(sys.argv) > 4 else 480
@@ -61,4 +207,7 @@ if __name__ == "__main__":
 # Example Command:
 # python src/processors/gif_maker.py "FunnyClip.mp4" 10 5 480
 #
-# (Takes 5 seconds starting at 00:00:10 and makes a 480px wide GIF)
\ No newline at end of file
+# (Takes 5 seconds starting at 00:00:10 and makes a 480px wide GIF)
+#
+# Batch Mode (many GIFs, one decode): <Video> batch <Start:Duration,...> [Width]
+# python src/processors/gif_maker.py "Episode01.mkv" batch 65:4,70:3,1210:5 480
\ No newline at end of file
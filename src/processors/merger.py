@@ -1,5 +1,18 @@
 import subprocess
 import os
+import sys
+
+try:
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.subtitles import SubtitleTrack, parse_subtitle_name
+    from src.utils.system import SystemUtils
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.subtitles import SubtitleTrack, parse_subtitle_name
+    from src.utils.system import SystemUtils
 
 class StreamMerger:
     def merge_video_audio(self, video_path: str, audio_path: str, output_path: str):
@@ -12,14 +25,39 @@ class StreamMerger:
             '-map', '1:a:0', # Take audio from file 1
             '-y', output_path
         ]
-        subprocess.run(command, check=True)
+        run_ffmpeg(command)
 
-    def mux_subtitles(self, video_path: str, sub_path: str, output_path: str):
+    def mux_subtitles(self, video_path: str, sub_path: str, output_path: str, threads: int = 0) -> bool:
         """Embeds a subtitle file into the video container (Soft subs)."""
-        command = [
-            'ffmpeg', '-i', video_path, '-i', sub_path,
-            '-map', '0', '-map', '1',
-            '-c', 'copy',
-            '-y', output_path
-        ]
-        subprocess.run(command, check=True)
\ No newline at end of file
+        _, language, forced, sdh, default = parse_subtitle_name(os.path.basename(sub_path))
+        track = SubtitleTrack(sub_path, language, forced, sdh, default)
+        return self.mux_subtitle_tracks(video_path, [track], output_path, threads)
+
+    def mux_subtitle_tracks(self, video_path: str, tracks: list, output_path: str, threads: int = 0) -> bool:
+        """
+        Embeds several subtitle files in ONE stream-copy pass, tagging each new
+        track with its language and default/forced/hearing-impaired flags.
+        """
+        info = get_probe().probe(video_path)
+        existing = len(info.subtitles) if info else 0
+
+        command = ['ffmpeg', '-i', video_path]
+        for track in tracks:
+            command.extend(['-i', track.path])
+        command.extend(['-map', '0'])
+        for k in range(1, len(tracks) + 1):
+            command.extend(['-map', f'{k}:0'])
+        for n, track in enumerate(tracks, start=existing):
+            if track.language:
+                command.extend([f'-metadata:s:s:{n}', f'language={track.language}'])
+            if track.forced or track.sdh:
+                command.extend([f'-metadata:s:s:{n}', f'title={track.label}'])
+            command.extend([f'-disposition:s:{n}', track.disposition])
+        command.extend(['-c', 'copy', *SystemUtils.thread_args(threads), '-y', output_path])
+
+        try:
+            run_ffmpeg(command)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
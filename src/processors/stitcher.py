@@ -1,48 +1,217 @@
 import subprocess
 import os
+import shutil
 import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src.utils import tracing
+    from src.utils.batch import BatchRunner
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.batch import BatchRunner
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
 
 class VideoStitcher:
-    def concat_videos(self, video_list: list, output_path: str):
+    # Encoders used to bring outliers to the majority's codec
+    VIDEO_ENCODERS = {
+        'h264': ['libx264', '-preset', 'medium', '-crf', '18'],
+        'hevc': ['libx265', '-preset', 'medium', '-crf', '20'],
+        'mpeg4': ['mpeg4', '-q:v', '3'],
+        'vp9': ['libvpx-vp9', '-crf', '30', '-b:v', '0'],
+        'av1': ['libaom-av1', '-crf', '30', '-b:v', '0'],
+    }
+    AUDIO_ENCODERS = {
+        'aac': ['aac', '-b:a', '192k'],
+        'mp3': ['libmp3lame', '-b:a', '192k'],
+        'opus': ['libopus', '-b:a', '160k'],
+        'vorbis': ['libvorbis', '-q:a', '5'],
+        'ac3': ['ac3', '-b:a', '448k'],
+        'flac': ['flac'],
+        'pcm_s16le': ['pcm_s16le'],
+    }
+    LAYOUTS = {1: 'mono', 2: 'stereo', 6: '5.1', 8: '7.1'}
+    # Codecs whose parameter sets can travel in-band, so clips with different ones can be joined
+    ANNEXB_FILTERS = {'h264': 'h264_mp4toannexb', 'hevc': 'hevc_mp4toannexb'}
+
+    def concat_videos(self, video_list: list, output_path: str, maps: list = None):
         """
         Joins multiple video files into one using the FFmpeg 'concat demuxer'.
-        Requirements: All videos must have the same codec/resolution.
+        Requirements: All videos must have the same codec/resolution
+        (use stitch() to fix up mismatched inputs first).
         """
         if not video_list:
             return False
 
-        # 1. Create a temporary text file listing all videos
+        # 1. Create a private list file next to the output (concurrent stitches never share it)
         # Format: file 'path/to/video.mp4'
-        list_file_path = "temp_stitch_list.txt"
-        with open(list_file_path, "w", encoding='utf-8') as f:
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        fd, list_file_path = tempfile.mkstemp(prefix=".vidflow_stitch_", suffix=".txt", dir=output_dir)
+        with os.fdopen(fd, "w", encoding='utf-8') as f:
             for vid in video_list:
                 # FFmpeg requires paths to be escaped strictly
-                safe_path = vid.replace("'", "'\\''") 
+                safe_path = os.path.abspath(vid).replace("'", "'\\''")
                 f.write(f"file '{safe_path}'\n")
 
         # 2. Run FFmpeg concat command
         # -f concat: Use the concat format
         # -safe 0: Allow unsafe file paths (absolute paths)
         # -c copy: No re-encoding (Instant join)
-        command = [
-            'ffmpeg', '-f', 'concat', '-safe', '0',
-            '-i', list_file_path,
-            '-c', 'copy', '-y', output_path
-        ]
+        command = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', list_file_path]
+        for stream in maps or []:
+            command.extend(['-map', stream])
+        command.extend(['-c', 'copy', '-y', output_path])
 
         try:
             print(f"🔗 Stitching {len(video_list)} files...")
-            subprocess.run(command, check=True, capture_output=True)
-            
-            # Cleanup temp file
+            run_ffmpeg(command)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
+        finally:
             os.remove(list_file_path)
+
+    @staticmethod
+    def profile(info) -> tuple:
+        """
+        Stream parameters that must match for a lossless concat. The frame rate is left
+        out on purpose: concat keeps every clip's own timestamps, and phone clips are
+        variable-rate, so their average rates differ without being incompatible.
+        """
+        video = info.video
+        audio = info.audio[0] if info.audio else None
+        video_key = (video.codec_name, video.width, video.height, video.pix_fmt) if video else None
+        audio_key = (audio.codec_name, audio.sample_rate, audio.channels) if audio else None
+        return video_key, audio_key
+
+    @tracing.traced('stitch plan', 'plan')
+    def plan(self, video_list: list, workers: int = 0):
+        """
+        Probes every input in parallel and picks the majority profile.
+        Returns (target_profile, outliers) where outliers are input paths to re-encode,
+        or (None, None) if an input can't be read.
+        """
+        with ThreadPoolExecutor(max_workers=workers or min(16, len(video_list))) as pool:
+            infos = list(pool.map(get_probe().probe, video_list))
+        for path, info in zip(video_list, infos):
+            if info is None or info.video is None:
+                print(f"❌ Can't read video stream: {os.path.basename(path)}")
+                return None, None
+
+        profiles = [self.profile(info) for info in infos]
+        # Most common profile wins; ties go to whichever covers more running time
+        counts = Counter(profiles)
+        durations = Counter()
+        for p, info in zip(profiles, infos):
+            durations[p] += info.duration or 0
+        target = max(counts, key=lambda p: (counts[p], durations[p]))
+        outliers = [path for path, p in zip(video_list, profiles) if p != target]
+        return target, outliers
+
+    def _normalize(self, input_path: str, output_path: str, target: tuple, threads: int = 0) -> bool:
+        (codec, width, height, pix_fmt), audio = target
+        chain = (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                 f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2")
+        if pix_fmt:
+            chain += f",format={pix_fmt}"
+
+        info = get_probe().probe(input_path)
+        command = ['ffmpeg', '-i', input_path]
+        if audio and not info.audio:
+            # Silent track so the stream layout matches the other clips
+            a_codec, rate, channels = audio
+            layout = self.LAYOUTS.get(channels, 'stereo')
+            command.extend(['-f', 'lavfi', '-i', f"anullsrc=r={rate or 48000}:cl={layout}"])
+        command.extend(['-map', '0:v:0', '-vf', chain, '-c:v', *self.VIDEO_ENCODERS[codec]])
+
+        if audio:
+            a_codec, rate, channels = audio
+            command.extend(['-map', '0:a:0' if info.audio else '1:a:0',
+                            '-c:a', *self.AUDIO_ENCODERS[a_codec]])
+            if rate:
+                command.extend(['-ar', str(rate)])
+            if channels:
+                command.extend(['-ac', str(channels)])
+            command.append('-shortest')
+        else:
+            command.append('-an')
+        if threads:
+            command.extend(['-threads', str(threads)])
+        command.extend(['-sn', '-dn', '-y', output_path])
+
+        try:
+            run_ffmpeg(command)
             return True
         except subprocess.CalledProcessError as e:
             print(f"Error: {e.stderr.decode()}")
-            if os.path.exists(list_file_path):
-                os.remove(list_file_path)
             return False
 
+    def _remux_ts(self, input_path: str, output_path: str, codec: str, audio: bool) -> bool:
+        """Stream-copies a clip into MPEG-TS with in-band parameter sets (annexb)."""
+        command = ['ffmpeg', '-i', input_path, '-map', '0:v:0']
+        if audio:
+            command.extend(['-map', '0:a:0'])
+        command.extend(['-c', 'copy', '-bsf:v', self.ANNEXB_FILTERS[codec], '-y', output_path])
+        try:
+            run_ffmpeg(command)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
+
+    def stitch(self, video_list: list, output_path: str, workers: int = 0) -> bool:
+        """
+        Joins videos losslessly, first re-encoding only the inputs whose codec,
+        resolution, pixel format or audio format differ from the majority.
+        Re-encoded H.264/HEVC clips carry their own SPS/PPS, so when any clip was
+        re-encoded every clip is joined through MPEG-TS (annexb) like SmartCutter
+        does, instead of reusing the first clip's out-of-band avcC for all of them.
+        """
+        if not video_list:
+            return False
+        target, outliers = self.plan(video_list, workers)
+        if target is None:
+            return False
+        maps = ['0:v:0'] + (['0:a:0'] if target[1] else [])
+        if not outliers:
+            return self.concat_videos(video_list, output_path, maps)
+
+        video_codec, audio = target[0][0], target[1]
+        if video_codec not in self.VIDEO_ENCODERS or (audio and audio[0] not in self.AUDIO_ENCODERS):
+            print(f"❌ No encoder to match the majority format ({video_codec}, {audio[0] if audio else 'no audio'})")
+            return False
+
+        print(f"🩹 Normalising {len(outliers)} of {len(video_list)} clips to the common format...")
+        via_ts = video_codec in self.ANNEXB_FILTERS
+        ext = '.ts' if via_ts else os.path.splitext(next(v for v in video_list if v not in outliers))[1]
+        work_dir = tempfile.mkdtemp(prefix=".vidflow_stitch_", dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            fixed = {}
+            runner = BatchRunner(workers or len(outliers))
+            for i, path in enumerate(outliers):
+                fixed[path] = os.path.join(work_dir, f"fixed_{i:04d}{ext}")
+                runner.submit(os.path.basename(path), self._normalize, path, fixed[path],
+                              target, threads=runner.threads_per_job)
+            if via_ts:
+                for i, path in enumerate([v for v in dict.fromkeys(video_list) if v not in fixed]):
+                    fixed[path] = os.path.join(work_dir, f"copy_{i:04d}.ts")
+                    runner.submit(os.path.basename(path), self._remux_ts, path, fixed[path],
+                                  video_codec, bool(audio))
+            runner.wait()
+            if runner.failures:
+                runner.summary()
+                return False
+            return self.concat_videos([fixed.get(v, v) for v in video_list], output_path, maps)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
 # --- STANDALONE EXECUTION LOGIC ---
 if __name__ == "__main__":
     # Usage: python stitcher.py output.mp4 video1.mp4 video2.mp4 video3.mp4 ...
@@ -54,10 +223,10 @@ if __name__ == "__main__":
     input_videos = sys.argv[2:]
 
     stitcher = VideoStitcher()
-    if stitcher.concat_videos(input_videos, output_file):
+    if stitcher.stitch(input_videos, output_file):
         print(f"✅ Successfully stitched into: {output_file}")
     else:
-        print("❌ Failed to stitch videos. Ensure they have matching formats.")
+        print("❌ Failed to stitch videos.")
 
 # ==========================================
 # HOW TO USE THIS CODE (EXAMPLE)
@@ -66,4 +235,6 @@ if __name__ == "__main__":
 # Syntax: python src/processors/stitcher.py <Output> <Input1> <Input2> ...
 #
 # Example Command:
-# python src/processors/stitcher.py "FullMovie.mp4" "Part1.mp4" "Part2.mp4"
\ No newline at end of file
+# python src/processors/stitcher.py "FullMovie.mp4" "Part1.mp4" "Part2.mp4"
+#
+# (Clips that don't match the others' codec/size/pixel format are re-encoded first; the rest are copied)
@@ -1,26 +1,100 @@
 import subprocess
-import json
 import os
+import re
 import sys
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+try:
+    from src.utils import tracing
+    from src.utils.batch import BatchRunner
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.ledger import partial_path
+    from src.utils.planning import COPY, DROP, StreamDecision, StreamPlan
+    from src.utils.probe import get_probe
+    from src.utils.pipeline import PipelineStage
+    from src.utils.subtitles import normalize_language
+    from src.utils.system import SystemUtils
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.batch import BatchRunner
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.ledger import partial_path
+    from src.utils.planning import COPY, DROP, StreamDecision, StreamPlan
+    from src.utils.probe import get_probe
+    from src.utils.pipeline import PipelineStage
+    from src.utils.subtitles import normalize_language
+    from src.utils.system import SystemUtils
+
+VIDEO_EXTENSIONS = ('.mkv', '.mp4', '.m4v', '.mov', '.avi')
+
+
+class TrackRules:
+    """
+    Declarative track-cleaning rules, applied the same way to every file.
+
+    audio_languages / subtitle_languages: languages to keep ('eng', 'en', 'jpn'...);
+    None keeps every language. keep_forced: forced subtitles survive regardless of
+    language. drop_titles: regex matched against track titles (e.g. 'commentary').
+    keep_undefined: tracks with no language tag are kept. min_audio: never leave a
+    file with fewer audio tracks than this (the best dropped ones are kept back).
+    """
+
+    def __init__(self, audio_languages: Optional[List[str]] = None, subtitle_languages: Optional[List[str]] = None,
+                 keep_forced: bool = True, drop_titles: str = None, keep_undefined: bool = True, min_audio: int = 1):
+        self.audio_languages = {normalize_language(l) for l in audio_languages} if audio_languages else None
+        self.subtitle_languages = {normalize_language(l) for l in subtitle_languages} if subtitle_languages else None
+        self.keep_forced = keep_forced
+        self.drop_titles = re.compile(drop_titles, re.IGNORECASE) if drop_titles else None
+        self.keep_undefined = keep_undefined
+        self.min_audio = min_audio
+
+    def _verdict(self, stream, languages) -> Optional[str]:
+        """Reason to drop the stream, or None to keep it."""
+        if self.drop_titles and stream.title and self.drop_titles.search(stream.title):
+            return f"title matches '{self.drop_titles.pattern}'"
+        if stream.codec_type == 'subtitle' and self.keep_forced and 'forced' in stream.disposition:
+            return None
+        language = normalize_language(stream.language)
+        if languages is None or language in languages:
+            return None
+        if language == 'und' and self.keep_undefined:
+            return None
+        return f"language {language} not wanted"
+
+    def plan(self, info, output_path: str) -> StreamPlan:
+        decisions = []
+        for stream in info.streams:
+            languages = {'audio': self.audio_languages, 'subtitle': self.subtitle_languages}.get(stream.codec_type)
+            reason = self._verdict(stream, languages) if stream.codec_type in ('audio', 'subtitle') else None
+            decisions.append(StreamDecision(stream, DROP if reason else COPY, reason=reason or ""))
+
+        # Keep the file playable: put back the default (else first) dropped audio tracks
+        kept_audio = [d for d in decisions if d.stream.codec_type == 'audio' and d.action == COPY]
+        dropped_audio = sorted((d for d in decisions if d.stream.codec_type == 'audio' and d.action == DROP),
+                               key=lambda d: ('default' not in d.stream.disposition, d.stream.type_index))
+        for d in dropped_audio[:max(0, self.min_audio - len(kept_audio))]:
+            d.action, d.reason = COPY, "kept: file needs an audio track"
+        return StreamPlan(info, output_path, decisions)
 
 class TrackProcessor:
     def get_track_info(self, input_path: str, stream_type: str = 'a') -> list:
         """Returns a list of tracks for the given type ('a' or 's')."""
-        cmd = [
-            'ffprobe', '-v', 'error',
-            '-show_entries', 'stream=index:stream_tags=language,title',
-            '-select_streams', stream_type,
-            '-of', 'json',
-            input_path
-        ]
-        try:
-            output = subprocess.check_output(cmd)
-            data = json.loads(output)
-            return data.get('streams', [])
-        except Exception as e:
-            print(f"Error reading tracks: {e}")
+        info = get_probe().probe(input_path)
+        if info is None:
             return []
+        return [s.as_track() for s in info.streams_of(stream_type)]
+
+    def keep_tracks_stage(self, track_indices: List[int], stream_type: str = 'a') -> PipelineStage:
+        """Track selection as a pipeline stage (mapping only, never forces an encode)."""
+        # Like keep_multiple_tracks, the other type is kept whole
+        maps = [f'0:{stream_type}:{idx}' for idx in track_indices]
+        if stream_type == 's':
+            maps.insert(0, '0:a?')
+        else:
+            maps.append('0:s?')
+        return PipelineStage(f"keep {stream_type} tracks", maps=maps)
 
     def keep_multiple_tracks(self, input_path: str, output_path: str, track_indices: List[int], stream_type: str = 'a'):
         """Removes all tracks of 'stream_type' EXCEPT the ones in 'track_indices'."""
@@ -33,20 +107,124 @@ class TrackProcessor:
         command.extend(['-c', 'copy', '-y', output_path])
         
         try:
-            subprocess.run(command, check=True, capture_output=True)
+            run_ffmpeg(command)
             return True
         except subprocess.CalledProcessError as e:
             print(f"FFmpeg Error: {e.stderr.decode()}")
             return False
 
+    def _apply_plan(self, plan: StreamPlan, output_path: str, in_place: bool, threads: int = 0) -> bool:
+        command = ['ffmpeg', '-i', plan.info.path, *plan.ffmpeg_args()]
+        # If the default audio track was dropped, make the first remaining one default
+        audio = [d for d in plan.decisions if d.action != DROP and d.stream.codec_type == 'audio']
+        if audio and not any('default' in d.stream.disposition for d in audio):
+            command.extend(['-disposition:a:0', 'default'])
+        # Written under a temp name either way: an interrupted run must not leave a
+        # '_clean' file that the next run would take as up to date
+        target = partial_path(output_path)
+        command.extend([*SystemUtils.thread_args(threads), '-y', target])
+        try:
+            run_ffmpeg(command)
+            with tracing.span('replace original' if in_place else 'publish output', 'finalize',
+                              file=os.path.basename(plan.info.path)):
+                os.replace(target, output_path)
+                if in_place:
+                    get_probe().invalidate(plan.info.path)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"FFmpeg Error: {e.stderr.decode()}")
+            if os.path.exists(target):
+                os.remove(target)
+            return False
+
+    @staticmethod
+    def _is_newer(output_path: str, source_path: str) -> bool:
+        try:
+            return os.stat(output_path).st_mtime_ns >= os.stat(source_path).st_mtime_ns
+        except OSError:
+            return False
+
+    def _is_current(self, plan: StreamPlan, output_path: str) -> bool:
+        """Whether output_path is newer than the source and holds exactly the streams 'plan' keeps."""
+        if not self._is_newer(output_path, plan.info.path):
+            return False
+        output = get_probe().probe(output_path)
+        if output is None:
+            return False
+        def layout(streams):
+            return [(s.codec_type, s.codec_name, normalize_language(s.language)) for s in streams]
+        return layout(output.streams) == layout(d.stream for d in plan.decisions if d.action != DROP)
+
+    def clean_library(self, folder: str, rules: TrackRules, dry_run: bool = True, in_place: bool = False,
+                      workers: int = 0) -> dict:
+        """
+        Applies 'rules' to every video under 'folder': one (cached) probe per file,
+        already-compliant files skipped, stream-copy remuxes run concurrently.
+        dry_run=True only prints the plan. Outputs go to '<name>_clean<ext>', or
+        replace the original atomically with in_place=True. A '_clean' output newer
+        than its source that already has the tracks the rules keep counts as up to
+        date, so reruns only redo changed files or files the new rules treat differently.
+        """
+        videos = []
+        for root, _, files in os.walk(folder):
+            videos.extend(os.path.join(root, f) for f in files
+                          if f.lower().endswith(VIDEO_EXTENSIONS) and not f.startswith('.')
+                          and '_clean.' not in f)
+        with ThreadPoolExecutor(max_workers=min(16, len(videos) or 1)) as pool:
+            infos = list(pool.map(get_probe().probe, videos))
+
+        stats = {'files': len(videos), 'compliant': 0, 'changed': 0, 'up_to_date': 0, 'unreadable': 0, 'failed': 0}
+        runner = None if dry_run else BatchRunner(workers)
+        for path, info in zip(videos, infos):
+            if info is None:
+                stats['unreadable'] += 1
+                continue
+            stem, ext = os.path.splitext(path)
+            output_path = path if in_place else f"{stem}_clean{ext}"
+            plan = rules.plan(info, output_path)
+            if all(d.action == COPY for d in plan.decisions):
+                stats['compliant'] += 1
+                continue
+            if not in_place and self._is_current(plan, output_path):
+                stats['up_to_date'] += 1
+                continue
+            stats['changed'] += 1
+            if dry_run:
+                print(f"📝 {path}\n{plan.describe()}")
+            else:
+                runner.submit(os.path.basename(path), self._apply_plan, plan, output_path, in_place,
+                              threads=runner.threads_per_job)
+
+        if runner:
+            runner.wait()
+            runner.summary()
+            stats['failed'] = len(runner.failures)
+        mode = "Dry run" if dry_run else "Cleaned"
+        print(f"🧹 {mode}: {stats['changed']} to change, {stats['compliant']} already compliant, "
+              f"{stats['up_to_date']} already cleaned, {stats['unreadable']} unreadable (of {stats['files']})")
+        return stats
+
 # --- STANDALONE EXECUTION LOGIC ---
 if __name__ == "__main__":
     # Args: Script, InputPath, StreamType(a/s), Indices(comma-separated)
-    if len(sys.argv) < 4:
+    # or:   Script, Folder, "rules", key=value ... [apply] [inplace]
+    if len(sys.argv) < 4 and not (len(sys.argv) >= 3 and sys.argv[2] == "rules"):
         print("❌ Error: Missing arguments.")
         print("Usage: python tracks.py <input_file> <type:a|s> <keep_indexes:0,1>")
+        print("       python tracks.py <folder> rules [audio=eng,jpn] [subs=eng] [drop=commentary] [apply] [inplace]")
         sys.exit(1)
 
+    if sys.argv[2] == "rules":
+        options = dict(arg.split("=", 1) for arg in sys.argv[3:] if "=" in arg)
+        rules = TrackRules(
+            audio_languages=options["audio"].split(",") if "audio" in options else None,
+            subtitle_languages=options["subs"].split(",") if "subs" in options else None,
+            drop_titles=options.get("drop"),
+        )
+        TrackProcessor().clean_library(sys.argv[1], rules, dry_run="apply" not in sys.argv[3:],
+                                       in_place="inplace" in sys.argv[3:])
+        sys.exit(0)
+
     input_path = sys.argv[1]
     stream_type = sys.argv[2]
     indices_str = sys.argv[3]
@@ -80,4 +258,8 @@ if __name__ == "__main__":
 # Example Command:
 # python src/processors/tracks.py "C:\Movies\Avatar.mkv" "a" "0,2"
 #
-# (This keeps Audio Track 0 and 2, removes the rest)
\ No newline at end of file
+# (This keeps Audio Track 0 and 2, removes the rest)
+#
+# Batch Mode (rules over a whole library, dry run unless 'apply' is given):
+# python src/processors/tracks.py "D:\Anime" rules audio=jpn,eng subs=eng drop=commentary
+# python src/processors/tracks.py "D:\Anime" rules audio=jpn,eng subs=eng drop=commentary apply inplace
\ No newline at end of file
@@ -1,62 +1,213 @@
+import hashlib
 import subprocess
 import os
 import sys
+import threading
+
+try:
+    from src.utils.batch import BatchRunner
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.segments import SegmentEncoder
+    from src.utils.pipeline import PipelineStage
+    from src.utils.smartcut import SmartCutter
+    from src.utils.system import SystemUtils
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.batch import BatchRunner
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.segments import SegmentEncoder
+    from src.utils.pipeline import PipelineStage
+    from src.utils.smartcut import SmartCutter
+    from src.utils.system import SystemUtils
 
 class Watermarker:
-    def add_image_watermark(self, video_path: str, image_path: str, output_path: str, position="br"):
+    # FFmpeg coordinate logic
+    POSITIONS = {
+        "tl": "10:10",                                  # Top-Left
+        "tr": "main_w-overlay_w-10:10",                 # Top-Right
+        "bl": "10:main_h-overlay_h-10",                 # Bottom-Left
+        "br": "main_w-overlay_w-10:main_h-overlay_h-10",# Bottom-Right
+        "center": "(main_w-overlay_w)/2:(main_h-overlay_h)/2"
+    }
+    # Explicit encoder settings instead of FFmpeg's defaults
+    PRESETS = {
+        "fast": ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23'],
+        "balanced": ['-c:v', 'libx264', '-preset', 'medium', '-crf', '20'],
+        "quality": ['-c:v', 'libx264', '-preset', 'slow', '-crf', '18'],
+    }
+
+    def __init__(self):
+        self._render_locks = {}
+        self._locks_guard = threading.Lock()
+
+    def watermark_stage(self, image_path: str, position="br") -> PipelineStage:
+        """Logo overlay as a fusable pipeline stage."""
+        overlay_setting = self.POSITIONS.get(position, self.POSITIONS["br"])
+        return PipelineStage("watermark", "{in}{extra0}overlay=" + overlay_setting + "{out}",
+                             extra_inputs=[image_path])
+
+    def render_logo(self, image_path: str, video_height: int = None, scale: float = None,
+                    opacity: float = 1.0) -> str:
+        """
+        Pre-renders the logo once per (target height, opacity): resized to scale * video_height
+        with the opacity baked into its alpha channel. Cached in the VidFlow cache dir,
+        keyed by the logo's size + mtime, so every later encode just overlays a ready PNG.
+        """
+        height = max(2, round(video_height * scale)) if video_height and scale else None
+        st = os.stat(image_path)
+        key = f"{os.path.abspath(image_path)}|{st.st_size}|{st.st_mtime_ns}|{height}|{opacity:.3f}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        cached = os.path.join(SystemUtils.cache_dir(), 'logos', f"{digest}.png")
+
+        with self._locks_guard:
+            lock = self._render_locks.setdefault(digest, threading.Lock())
+        with lock:  # Parallel jobs at the same resolution wait for one render
+            if os.path.exists(cached):
+                return cached
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            filters = []
+            if height:
+                filters.append(f"scale=-1:{height}:flags=lanczos")
+            filters.append("format=rgba")
+            if opacity < 1.0:
+                filters.append(f"colorchannelmixer=aa={opacity:.3f}")
+            tmp = os.path.join(os.path.dirname(cached), f".{digest}.partial.png")
+            run_ffmpeg(['ffmpeg', '-i', image_path, '-vf', ','.join(filters), '-frames:v', '1', '-y', tmp])
+            os.replace(tmp, cached)
+        return cached
+
+    def _overlay(self, position: str, start: float = None, end: float = None) -> str:
+        overlay_setting = self.POSITIONS.get(position, self.POSITIONS["br"])
+        if start is None and end is None:
+            return f"overlay={overlay_setting}"
+        window = f"between(t,{start or 0:.3f},{end:.3f})" if end is not None else f"gte(t,{start:.3f})"
+        return f"overlay={overlay_setting}:enable='{window}'"
+
+    def add_image_watermark(self, video_path: str, image_path: str, output_path: str, position="br",
+                            segments: int = 0, scale: float = None, opacity: float = 1.0,
+                            start: float = None, end: float = None, preset: str = "balanced",
+                            threads: int = 0):
         """
         Overlays an image (logo) onto the video.
         position options: 'br' (bottom-right), 'tl' (top-left), 'tr', 'bl', 'center'
+        segments: >1 burns the logo into that many chunks in parallel.
+        scale: logo height as a fraction of the video height (e.g. 0.08); opacity: 0-1.
+        start/end: only show the logo in that window (seconds). For H.264/HEVC sources
+        just the GOPs covering the window are re-encoded and the rest is copied.
+        preset: 'fast', 'balanced' or 'quality' (see PRESETS).
         """
-        
-        # FFmpeg coordinate logic
-        coords = {
-            "tl": "10:10",                                  # Top-Left
-            "tr": "main_w-overlay_w-10:10",                 # Top-Right
-            "bl": "10:main_h-overlay_h-10",                 # Bottom-Left
-            "br": "main_w-overlay_w-10:main_h-overlay_h-10",# Bottom-Right
-            "center": "(main_w-overlay_w)/2:(main_h-overlay_h)/2"
-        }
-        
-        overlay_setting = coords.get(position, coords["br"])
-
-        command = [
-            'ffmpeg', '-i', video_path, '-i', image_path,
-            '-filter_complex', f"overlay={overlay_setting}",
-            '-c:a', 'copy', # Copy audio, re-encode video
-            '-y', output_path
-        ]
-
+        encoder_args = self.PRESETS.get(preset, self.PRESETS["balanced"])
+        info = get_probe().probe(video_path) if scale or start is not None or end is not None else None
         try:
+            if scale or opacity < 1.0:
+                image_path = self.render_logo(image_path, info.video.height if info and info.video else None,
+                                              scale, opacity)
+
+            if start is not None or end is not None:
+                window_start = start or 0.0
+                window_end = end if end is not None else (info.duration if info else None)
+                if window_end is not None and SmartCutter.can_splice(info):
+                    print(f"💧 Burning watermark for {window_start:.1f}s -> {window_end:.1f}s only...")
+                    # Times inside the re-encoded piece count from the piece's start
+                    return SmartCutter(threads).patch(
+                        video_path, output_path, window_start, window_end,
+                        lambda piece_start, _: "[1:v]" + self._overlay(
+                            position, max(0.0, window_start - piece_start), window_end - piece_start),
+                        extra_inputs=[image_path],
+                        encoder_options=encoder_args[2:]  # The preset's speed/quality, on the source's encoder
+                    )
+                overlay = self._overlay(position, start, end)
+            else:
+                overlay = self._overlay(position)
+
+                if segments > 1:
+                    print(f"💧 Burning watermark in {segments} parallel segments...")
+                    return SegmentEncoder(segments, overlap=0).encode(
+                        video_path, output_path, overlay, encoder_args, extra_inputs=[image_path]
+                    )
+
+            command = [
+                'ffmpeg', '-i', video_path, '-i', image_path,
+                '-filter_complex', overlay,
+                *encoder_args, *SystemUtils.thread_args(threads),
+                '-c:a', 'copy', # Copy audio, re-encode video
+                '-y', output_path
+            ]
             print("💧 Burning watermark (this re-encodes the video)...")
-            subprocess.run(command, check=True, capture_output=True)
+            run_ffmpeg(command)
             return True
         except subprocess.CalledProcessError as e:
             print(f"Error: {e.stderr.decode()}")
             return False
 
+    def brand_batch(self, videos: list, image_path: str, output_folder: str = None, position="br",
+                    scale: float = 0.08, opacity: float = 1.0, start: float = None, end: float = None,
+                    preset: str = "balanced", workers: int = 0) -> list:
+        """
+        Brands many videos across a worker pool. The logo is rendered once per distinct
+        video height (see render_logo) and each encode gets its share of the CPU threads.
+        Outputs are '<name>_branded<ext>' in output_folder (default: next to each video).
+        Returns the output paths that were written.
+        """
+        runner = BatchRunner(workers)
+        jobs = []
+        for video in videos:
+            stem, ext = os.path.splitext(os.path.basename(video))
+            folder = output_folder or os.path.dirname(video)
+            output_path = os.path.join(folder, f"{stem}_branded{ext}")
+            future = runner.submit(os.path.basename(video), self.add_image_watermark, video, image_path, output_path,
+                          position, scale=scale, opacity=opacity, start=start, end=end, preset=preset,
+                          threads=runner.threads_per_job)
+            jobs.append((future, output_path))
+        runner.wait()
+        runner.summary()
+        return [path for future, path in jobs if future.result().ok]
+
 # --- STANDALONE EXECUTION LOGIC ---
 if __name__ == "__main__":
     if len(sys.argv) < 4:
-        print("Usage: python watermark.py <video_path> <logo_path> <position:tl|tr|bl|br|center>")
+        print("Usage: python watermark.py <video_path|folder> <logo_path> <position:tl|tr|bl|br|center> "
+              "[scale=0.08] [opacity=0.8] [start=0] [end=10] [preset=fast|balanced|quality]")
         sys.exit(1)
 
     vid = sys.argv[1]
     img = sys.argv[2]
     pos = sys.argv[3]
-    
-    out = os.path.splitext(vid)[0] + "_branded.mp4"
-    
+    options = dict(arg.split("=", 1) for arg in sys.argv[4:] if "=" in arg)
+    settings = {
+        "scale": float(options["scale"]) if "scale" in options else None,
+        "opacity": float(options.get("opacity", 1.0)),
+        "start": float(options["start"]) if "start" in options else None,
+        "end": float(options["end"]) if "end" in options else None,
+        "preset": options.get("preset", "balanced"),
+    }
+
     wm = Watermarker()
-    if wm.add_image_watermark(vid, img, out, pos):
-        print(f"✅ Created: {out}")
+    if os.path.isdir(vid):
+        files = sorted(os.path.join(vid, f) for f in os.listdir(vid)
+                       if f.lower().endswith(('.mp4', '.mkv', '.mov', '.m4v')) and '_branded.' not in f)
+        settings["scale"] = settings["scale"] or 0.08
+        done = wm.brand_batch(files, img, position=pos, **settings)
+        print(f"✅ Branded {len(done)}/{len(files)} videos")
+    else:
+        # Same container as the source: subtitle tracks are copied along
+        stem, ext = os.path.splitext(vid)
+        out = f"{stem}_branded{ext}"
+        if wm.add_image_watermark(vid, img, out, pos, **settings):
+            print(f"✅ Created: {out}")
 
 # ==========================================
 # HOW TO USE THIS CODE (EXAMPLE)
 # ==========================================
 #
-# Syntax: python src/processors/watermark.py <Video> <LogoImage> <Position>
+# Syntax: python src/processors/watermark.py <Video|Folder> <LogoImage> <Position> [key=value ...]
 #
 # Example Command:
 # python src/processors/watermark.py "Video.mp4" "Logo.png" "br"
-# (Adds logo to Bottom-Right corner)
\ No newline at end of file
+# (Adds logo to Bottom-Right corner)
+#
+# Example 2 (Brand a whole season: logo 8% of the video height, 80% opaque,
+# first 10 seconds only - just the opening GOPs are re-encoded):
+# python src/processors/watermark.py "Season1/" "Logo.png" "tr" scale=0.08 opacity=0.8 start=0 end=10
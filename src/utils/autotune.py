@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.system import SystemUtils
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.probe import get_probe
+    from src.utils.system import SystemUtils
+
+# Fastest -> slowest; slower presets give smaller files at the same CRF
+X264_PRESETS = ['ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium', 'slow', 'slower']
+
+
+class PresetAutotuner:
+    """
+    Picks the slowest libx264 preset this machine can afford for a given input.
+
+    Encodes a few short samples of the real input (with the real filter chain) at
+    each preset / thread count, measures fps and output size, and keeps the slowest
+    preset that still meets the realtime factor or wall-clock deadline. Results
+    are cached per machine and content class, so the measurement runs once.
+
+    For segment mode (parallel > 1) each sample runs with one worker's share of
+    the threads and only has to reach its share of the target speed.
+    """
+
+    def __init__(self, presets: list = None, thread_counts: list = None, samples: int = 3,
+                 sample_seconds: float = 4.0, cache_path: str = None):
+        self.presets = presets or X264_PRESETS
+        self.thread_counts = thread_counts or [0]   # 0 = let x264 decide
+        self.samples = samples
+        self.sample_seconds = sample_seconds
+        self.cache_path = cache_path or os.path.join(SystemUtils.cache_dir(), 'autotune.json')
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def machine_key() -> str:
+        return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}cpu"
+
+    @staticmethod
+    def content_class(info, filter_chain: str, crf: int) -> str:
+        video = info.video
+        height = video.height or 0
+        bucket = next((b for b in (480, 720, 1080, 1440, 2160) if height <= b), 4320)
+        fps = round(video.fps or 0)
+        chain = hashlib.sha1((filter_chain or '').encode()).hexdigest()[:8]
+        return f"{video.codec_name}|{bucket}p|{fps}fps|crf{crf}|{chain}"
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache: dict):
+        tmp = self.cache_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp, self.cache_path)
+
+    def _measure(self, input_path, starts, filter_chain, crf, preset, threads) -> dict:
+        frames = 0
+        elapsed = 0.0
+        size = 0
+        with tempfile.TemporaryDirectory(prefix='vidflow_autotune_') as work_dir:
+            for i, start in enumerate(starts):
+                out = os.path.join(work_dir, f"sample_{i}.mkv")
+                command = ['ffmpeg', '-ss', f"{start:.3f}", '-t', f"{self.sample_seconds:.3f}", '-i', input_path]
+                if filter_chain:
+                    command.extend(['-vf', filter_chain])
+                command.extend([
+                    '-an', '-sn', '-c:v', 'libx264', '-preset', preset, '-crf', str(crf),
+                    *SystemUtils.thread_args(threads), '-y', out
+                ])
+                started = time.perf_counter()
+                progress = run_ffmpeg(command, label=f"autotune {preset}")
+                elapsed += time.perf_counter() - started
+                frames += progress.frame
+                size += os.path.getsize(out)
+        return {
+            'preset': preset,
+            'threads': threads,
+            'fps': frames / elapsed if elapsed else 0.0,
+            'bytes_per_sec': size / (self.sample_seconds * len(starts)),
+        }
+
+    def tune(self, input_path: str, filter_chain: str = None, crf: int = 23,
+             realtime: float = None, deadline: float = None, parallel: int = 1) -> dict:
+        """
+        realtime: required encode speed as a multiple of the source frame rate (1.0 = realtime).
+        deadline: alternatively, seconds the whole file may take.
+        parallel: number of encoders that will run side by side (segment mode).
+        Returns {'preset', 'threads', 'fps', 'bytes_per_sec'}.
+        """
+        info = get_probe().probe(input_path)
+        if info is None or info.video is None or not info.duration:
+            raise ValueError(f"Cannot autotune {input_path}: no video stream or duration")
+        source_fps = info.video.fps or 25.0
+        if deadline:
+            target_fps = info.duration * source_fps / deadline
+            target_key = f"deadline-fps{target_fps:.1f}"
+        else:
+            target_fps = source_fps * (realtime or 1.0)
+            target_key = f"realtime{realtime or 1.0:g}"
+        thread_counts = self.thread_counts
+        workers = min(max(1, parallel), os.cpu_count() or 1)
+        if workers > 1:
+            # Same split as BatchRunner: each segment worker gets cpu_count // workers threads
+            thread_counts = [max(1, (os.cpu_count() or 1) // workers)]
+            target_fps /= workers
+            target_key += f"|x{workers}"
+
+        machine = self.machine_key()
+        key = f"{self.content_class(info, filter_chain, crf)}|{target_key}"
+        with self._lock:
+            cache = self._load_cache()
+        cached = cache.get(machine, {}).get(key)
+        if cached:
+            return cached
+
+        # Evenly spaced samples away from the intro/credits
+        span = max(info.duration - self.sample_seconds, 0.0)
+        starts = [span * (i + 1) / (self.samples + 1) for i in range(self.samples)]
+
+        print(f"🔬 Autotuning x264 preset (target {target_fps:.1f} fps)...")
+        best = None
+        for preset in self.presets:
+            # Fewest threads that meets the target wins (leaves cores for parallel jobs)
+            candidates = [self._measure(input_path, starts, filter_chain, crf, preset, t) for t in thread_counts]
+            passing = [c for c in candidates if c['fps'] >= target_fps]
+            fastest = max(candidates, key=lambda c: c['fps'])
+            print(f"   {preset:<10} {fastest['fps']:7.1f} fps  {fastest['bytes_per_sec'] / 1000:8.0f} kB/s")
+            if not passing:
+                break  # Slower presets will only be slower
+            best = min(passing, key=lambda c: c['threads'] or os.cpu_count() or 1)
+
+        if best is None:
+            # Not even the fastest preset meets the target: it's still the best we can do
+            best = fastest
+        best = dict(best, target_fps=target_fps)
+
+        with self._lock:
+            cache = self._load_cache()
+            cache.setdefault(machine, {})[key] = best
+            self._save_cache(cache)
+        return best
+
+    def encoder_args(self, base_args: list, input_path: str, filter_chain: str = None,
+                     realtime: float = None, deadline: float = None, segments: int = 0) -> list:
+        """
+        Returns base_args (['-c:v', 'libx264', '-preset', ..., '-crf', N]) with the tuned preset/threads.
+        segments: >1 tunes per segment worker and leaves '-threads' to SegmentEncoder.
+        """
+        args = list(base_args)
+        crf = int(args[args.index('-crf') + 1]) if '-crf' in args else 23
+        try:
+            choice = self.tune(input_path, filter_chain, crf, realtime, deadline, parallel=segments)
+        except (ValueError, subprocess.CalledProcessError) as e:
+            print(f"⚠️  Autotune failed, keeping default preset: {e}")
+            return args
+        if '-preset' in args:
+            args[args.index('-preset') + 1] = choice['preset']
+        else:
+            args.extend(['-preset', choice['preset']])
+        print(f"🎛️  Using preset '{choice['preset']}' ({choice['fps']:.1f} fps measured)")
+        if segments > 1:
+            return args
+        return args + SystemUtils.thread_args(choice['threads'])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python autotune.py <video_file> [realtime_factor]")
+        sys.exit(1)
+
+    factor = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    print(PresetAutotuner().tune(sys.argv[1], realtime=factor))
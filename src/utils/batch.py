@@ -0,0 +1,102 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    from src.utils import tracing
+    from src.utils.operations import succeeded
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.operations import succeeded
+
+
+class BatchResult:
+    def __init__(self, name: str, ok: bool, elapsed: float, error: str = None, value=None):
+        self.name = name
+        self.ok = ok
+        self.elapsed = elapsed
+        self.error = error
+        self.value = value
+
+
+class BatchRunner:
+    """
+    Runs many FFmpeg jobs concurrently while sharing one CPU budget.
+    Each job is a plain callable (usually a processor method); the heavy
+    lifting happens in the ffmpeg child process, so a thread pool is enough
+    to keep every core (or the disks, for stream copies) busy.
+    """
+
+    def __init__(self, workers: int = 0, total_threads: int = 0, verbose: bool = True):
+        cpu_count = os.cpu_count() or 1
+        self.workers = max(1, workers or cpu_count)
+        self.total_threads = max(1, total_threads or cpu_count)
+        # Per-job '-threads' budget so N parallel encoders don't oversubscribe the CPU
+        self.threads_per_job = max(1, self.total_threads // self.workers)
+        self.verbose = verbose
+        self.results = []
+        self._lock = threading.Lock()
+        self._futures = []
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def submit(self, name: str, func, *args, **kwargs):
+        """Queues func(*args, **kwargs). A failure result (see operations.succeeded) or an exception counts as a failure."""
+        # Run in the caller's context so a supervising job (jobs.py) still owns the ffmpeg calls
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, self._run, name, func, args, kwargs, time.perf_counter())
+        self._futures.append(future)
+        return future
+
+    def _run(self, name, func, args, kwargs, queued: float) -> BatchResult:
+        start = time.perf_counter()
+        tracing.record_async('queue wait', 'queue', queued, start, job=name)
+        with tracing.span(name, 'job', op=getattr(func, '__qualname__', None)) as span:
+            try:
+                value = func(*args, **kwargs)
+                result = BatchResult(name, succeeded(value), time.perf_counter() - start, value=value)
+            except Exception as e:
+                result = BatchResult(name, False, time.perf_counter() - start, error=str(e))
+            span['ok'] = result.ok
+
+        with self._lock:
+            self.results.append(result)
+            if self.verbose:
+                icon = "✅" if result.ok else "❌"
+                print(f"{icon} [{len(self.results)}/{len(self._futures)}] {name} ({result.elapsed:.1f}s)")
+        return result
+
+    def wait(self) -> list:
+        """Blocks until every queued job has finished and returns all results."""
+        wait(self._futures)
+        self._executor.shutdown(wait=True)
+        return self.results
+
+    @property
+    def failures(self) -> list:
+        return [r for r in self.results if not r.ok]
+
+    def summary(self):
+        total = len(self.results)
+        failed = self.failures
+        busy = sum(r.elapsed for r in self.results)
+        print(f"\n📊 Batch finished: {total - len(failed)}/{total} succeeded "
+              f"({self.workers} workers, {self.threads_per_job} threads/job, {busy:.1f}s of job time)")
+        for r in failed:
+            reason = f": {r.error}" if r.error else ""
+            print(f"   ❌ {r.name}{reason}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for future in self._futures:
+                future.cancel()
+            self._executor.shutdown(wait=False)
+            return False
+        self.wait()
+        return False
@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: no rusage, CPU/RSS columns stay empty
+    resource = None
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+# Deterministic lavfi inputs: resolutions, codecs, short vs long GOP, multi-audio + subtitles
+FIXTURES = {
+    "short_gop_720p.mp4": {
+        "video": "testsrc2=size=1280x720:rate=30:duration=20",
+        "audio": ["sine=frequency=440:sample_rate=48000:duration=20"],
+        "args": ['-c:v', 'libx264', '-preset', 'veryfast', '-g', '30', '-c:a', 'aac', '-b:a', '192k'],
+    },
+    "long_gop_1080p.mkv": {
+        "video": "testsrc2=size=1920x1080:rate=25:duration=30",
+        "audio": ["sine=frequency=440:sample_rate=48000:duration=30",
+                  "sine=frequency=880:sample_rate=48000:duration=30"],
+        "args": ['-c:v', 'libx264', '-preset', 'veryfast', '-g', '250',
+                 '-c:a:0', 'aac', '-b:a:0', '128k', '-c:a:1', 'ac3', '-b:a:1', '448k',
+                 '-metadata:s:a:0', 'language=eng', '-metadata:s:a:1', 'language=jpn'],
+        "subtitles": True,
+    },
+    "sd_480p.avi": {
+        "video": "testsrc2=size=640x480:rate=25:duration=15",
+        "audio": ["sine=frequency=220:sample_rate=44100:duration=15"],
+        "args": ['-c:v', 'mpeg4', '-q:v', '4', '-c:a', 'libmp3lame', '-b:a', '192k'],
+    },
+}
+
+SUBTITLES = "".join(
+    f"{i + 1}\n00:00:{i * 3:02d},000 --> 00:00:{i * 3 + 2:02d},000\nBenchmark line {i + 1}\n\n" for i in range(9)
+)
+
+
+def make_fixtures(folder: str) -> str:
+    """Creates the synthetic inputs once (reused across runs)."""
+    os.makedirs(folder, exist_ok=True)
+    srt = os.path.join(folder, "subs.srt")
+    if not os.path.exists(srt):
+        with open(srt, "w", encoding="utf-8") as f:
+            f.write(SUBTITLES)
+
+    logo = os.path.join(folder, "logo.png")
+    if not os.path.exists(logo):
+        subprocess.run(['ffmpeg', '-f', 'lavfi', '-i', 'color=c=white@0.6:s=160x80,format=rgba',
+                        '-frames:v', '1', '-y', logo], check=True, capture_output=True)
+
+    for name, spec in FIXTURES.items():
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            continue
+        print(f"🧪 Generating fixture {name}...")
+        command = ['ffmpeg', '-f', 'lavfi', '-i', spec["video"]]
+        for audio in spec["audio"]:
+            command.extend(['-f', 'lavfi', '-i', audio])
+        if spec.get("subtitles"):
+            command.extend(['-i', srt])
+        command.extend(['-map', '0:v'])
+        for i in range(len(spec["audio"])):
+            command.extend(['-map', f'{i + 1}:a'])
+        if spec.get("subtitles"):
+            command.extend(['-map', f'{len(spec["audio"]) + 1}:s', '-c:s', 'srt'])
+        command.extend([*spec["args"], '-y', path])
+        subprocess.run(command, check=True, capture_output=True)
+    return folder
+
+
+def _copy(fixtures, name, work):
+    """Fresh copy so processors writing next to their input don't touch the fixtures."""
+    target = os.path.join(work, name)
+    shutil.copyfile(os.path.join(fixtures, name), target)
+    return target
+
+
+# --- CASES: each returns the list of output files it produced (or None on failure) ---
+
+def case_formats(fx, work):
+    from src.processors.formats import FormatMapper
+    result = FormatMapper().convert_video(_copy(fx, "long_gop_1080p.mkv", work), work, "mp4")
+    return [result["output_path"]] if result["status"] == "success" else None
+
+
+def case_tracks(fx, work):
+    from src.processors.tracks import TrackProcessor
+    out = os.path.join(work, "tracks.mkv")
+    ok = TrackProcessor().keep_multiple_tracks(os.path.join(fx, "long_gop_1080p.mkv"), out, [1], 'a')
+    return [out] if ok else None
+
+
+def case_compressor(fx, work):
+    from src.processors.compressor import VideoCompressor
+    out = os.path.join(work, "compressed.mkv")
+    result = VideoCompressor().compress_audio_maintain_video(os.path.join(fx, "long_gop_1080p.mkv"), out, "96k")
+    return [out] if result["status"] == "success" else None
+
+
+def case_shorts(fx, work):
+    from src.processors.editor import VideoEditor
+    out = os.path.join(work, "shorts.mp4")
+    ok = VideoEditor().convert_to_shorts_style(os.path.join(fx, "short_gop_720p.mp4"), out)
+    return [out] if ok else None
+
+
+def case_split_chunks(fx, work):
+    from src.processors.division import VideoDivider
+    src = _copy(fx, "short_gop_720p.mp4", work)
+    ok = VideoDivider().split_by_chunks(src, 5)
+    return [os.path.join(work, f) for f in os.listdir(work) if "_part" in f] if ok else None
+
+
+def case_intermission(fx, work):
+    from src.processors.division import VideoDivider
+    ok, p1, p2 = VideoDivider().split_at_intermission(_copy(fx, "long_gop_1080p.mkv", work), 12.0)
+    return [p1, p2] if ok else None
+
+
+def case_stitcher(fx, work):
+    from src.processors.stitcher import VideoStitcher
+    src = os.path.join(fx, "short_gop_720p.mp4")
+    out = os.path.join(work, "stitched.mp4")
+    return [out] if VideoStitcher().concat_videos([src, src, src], out) else None
+
+
+def case_watermark(fx, work):
+    from src.processors.watermark import Watermarker
+    out = os.path.join(work, "branded.mp4")
+    ok = Watermarker().add_image_watermark(os.path.join(fx, "short_gop_720p.mp4"), os.path.join(fx, "logo.png"), out)
+    return [out] if ok else None
+
+
+def case_gif(fx, work):
+    from src.processors.gif_maker import GifMaker
+    out = os.path.join(work, "clip.gif")
+    ok = GifMaker().create_high_quality_gif(os.path.join(fx, "short_gop_720p.mp4"), out, 2, 4)
+    return [out] if ok else None
+
+
+def case_gif_batch(fx, work):
+    from src.processors.gif_maker import GifMaker
+    clips = [(1, 2), (4, 2), (8, 3), (15, 2)]
+    return GifMaker().create_gif_batch(os.path.join(fx, "short_gop_720p.mp4"), clips, work) or None
+
+
+def case_remaster(fx, work):
+    from src.processors.remaster import VideoRemaster
+    out = os.path.join(work, "remastered.mp4")
+    return [out] if VideoRemaster().enhance_old_footage(os.path.join(fx, "sd_480p.avi"), out) else None
+
+
+def case_extract_audio(fx, work):
+    from src.processors.extractor import AudioExtractor
+    ok, out = AudioExtractor().extract_audio(_copy(fx, "short_gop_720p.mp4", work), "mp3")
+    return [out] if ok else None
+
+
+def case_batch_compress(fx, work):
+    from src.processors.compressor import VideoCompressor
+    from src.utils.batch import BatchRunner
+    compressor = VideoCompressor()
+    runner = BatchRunner(verbose=False)
+    outputs = []
+    for i in range(8):
+        out = os.path.join(work, f"batch_{i}.mkv")
+        outputs.append(out)
+        runner.submit(out, compressor.compress_audio_maintain_video, os.path.join(fx, "long_gop_1080p.mkv"),
+                      out, "96k", threads=runner.threads_per_job)
+    runner.wait()
+    return outputs if not runner.failures else None
+
+
+CASES = {name[5:]: func for name, func in sorted(globals().items()) if name.startswith("case_")}
+
+
+def _child_usage():
+    if resource is None:
+        return {}
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {"cpu_user": usage.ru_utime, "cpu_sys": usage.ru_stime, "peak_rss": usage.ru_maxrss * scale}
+
+
+def run_case_in_this_process(name: str, fixtures: str) -> dict:
+    """Runs one case; called inside a fresh interpreter so rusage covers only this case."""
+    work = tempfile.mkdtemp(prefix=f"vidflow_bench_{name}_")
+    os.environ["VIDFLOW_CACHE_DIR"] = os.path.join(work, ".cache")  # Cold probe cache every time
+    try:
+        start = time.perf_counter()
+        outputs = CASES[name](fixtures, work)
+        wall = time.perf_counter() - start
+        size = sum(os.path.getsize(p) for p in outputs or [] if p and os.path.exists(p))
+        return {"ok": outputs is not None, "wall": wall, "output_size": size, **_child_usage()}
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def run_case(name: str, fixtures: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", name, "--fixtures", fixtures],
+            capture_output=True, text=True, cwd=ROOT
+        )
+        lines = proc.stdout.strip().splitlines()
+        try:
+            runs.append(json.loads(lines[-1]))
+        except (IndexError, ValueError):
+            runs.append({"ok": False, "wall": 0.0, "error": proc.stderr[-500:]})
+    # Median run by wall time is the reported one
+    runs.sort(key=lambda r: r["wall"])
+    result = dict(runs[len(runs) // 2])
+    result["wall_runs"] = [round(r["wall"], 4) for r in runs]
+    result["ok"] = all(r["ok"] for r in runs)
+    return result
+
+
+def environment() -> dict:
+    try:
+        version = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True).stdout.splitlines()[0]
+    except (OSError, IndexError):
+        version = "unknown"
+    return {"host": platform.node(), "cpus": os.cpu_count(), "python": platform.python_version(),
+            "ffmpeg": version, "date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns the cases whose wall time grew by more than 'tolerance' (0.1 = 10%)."""
+    regressions = []
+    print(f"\n{'case':<16}{'baseline':>10}{'now':>10}{'change':>9}")
+    for name, now in results["cases"].items():
+        before = baseline.get("cases", {}).get(name)
+        if not before or not before.get("wall"):
+            print(f"{name:<16}{'-':>10}{now['wall']:>9.2f}s{'new':>9}")
+            continue
+        change = now["wall"] / before["wall"] - 1
+        flag = " ⚠️" if change > tolerance else ""
+        print(f"{name:<16}{before['wall']:>9.2f}s{now['wall']:>9.2f}s{change:>+8.0%}{flag}")
+        if change > tolerance or (before.get("ok") and not now.get("ok")):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VidFlow processor benchmarks")
+    parser.add_argument("--cases", help="comma separated subset (default: all)")
+    parser.add_argument("--fixtures", default=os.path.join(tempfile.gettempdir(), "vidflow_fixtures"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case_in_this_process(args.child, args.fixtures)))
+        return 0
+
+    names = args.cases.split(",") if args.cases else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        print(f"❌ Unknown case(s): {', '.join(unknown)}. Available: {', '.join(CASES)}")
+        return 2
+
+    make_fixtures(args.fixtures)
+    results = {"environment": environment(), "cases": {}}
+    for name in names:
+        result = run_case(name, args.fixtures, args.repeat)
+        results["cases"][name] = result
+        icon = "✅" if result["ok"] else "❌"
+        cpu = result.get("cpu_user", 0) + result.get("cpu_sys", 0)
+        rss = result.get("peak_rss", 0) / 2 ** 20
+        print(f"{icon} {name:<16} {result['wall']:7.2f}s wall  {cpu:7.2f}s cpu  {rss:7.1f} MiB rss  "
+              f"{result.get('output_size', 0) / 2 ** 20:7.1f} MiB out")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"📄 Results saved to {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"❌ Regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# ==========================================
+# HOW TO USE THIS CODE (EXAMPLE)
+# ==========================================
+#
+# Record a baseline:
+# python src/utils/benchmark.py --out baseline.json
+#
+# After a change, compare against it (exit code 1 on a >10% slowdown):
+# python src/utils/benchmark.py --out now.json --compare baseline.json
+#
+# Only a few processors, 5 runs each:
+# python src/utils/benchmark.py --cases shorts,remaster --repeat 5
@@ -0,0 +1,286 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    from src.utils import tracing
+    from src.utils.operations import succeeded
+    from src.utils.system import SystemUtils
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.operations import succeeded
+    from src.utils.system import SystemUtils
+
+# Linux FICLONE ioctl: copy-on-write clone on btrfs/XFS
+_FICLONE = 0x40049409
+
+
+def sampled_fingerprint(path: str, block_size: int = 1 << 20, samples: int = 8) -> str:
+    """
+    Fast content fingerprint: file size + the first/last blocks + 'samples' blocks spread
+    evenly in between (10 MB read at most with the defaults, whatever the file size). A rename or touch
+    keeps it; re-encoded or edited content changes it.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        if size <= block_size * (samples + 2):
+            digest.update(f.read())
+        else:
+            step = (size - block_size) // (samples + 1)
+            for i in range(samples + 2):
+                f.seek(min(i * step, size - block_size))
+                digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+
+_ffmpeg_version = None
+
+
+def ffmpeg_version() -> str:
+    """First line of 'ffmpeg -version', so an FFmpeg upgrade invalidates cached results."""
+    global _ffmpeg_version
+    if _ffmpeg_version is None:
+        try:
+            output = subprocess.check_output(['ffmpeg', '-version'], stderr=subprocess.DEVNULL)
+            _ffmpeg_version = output.decode(errors='replace').splitlines()[0].strip()
+        except (OSError, subprocess.CalledProcessError, IndexError):
+            _ffmpeg_version = 'unknown'
+    return _ffmpeg_version
+
+
+class ResultCache:
+    """
+    Content-addressed store of finished outputs.
+
+    A result is keyed by the sampled fingerprint of every input, the operation name,
+    its parameters and the FFmpeg version, so re-running the same GIF range or audio
+    extraction is served from the cache instead of being recomputed. Hits are placed
+    at the requested path as a reflink (copy-on-write), a hardlink if enabled, or a
+    plain copy, and the store is trimmed least-recently-used first once it grows
+    past max_bytes.
+
+    Hardlinks are opt-in (links=True): processors overwrite outputs in place with
+    '-y', which would rewrite every file sharing the inode. Linked objects are made
+    read-only so such an overwrite fails loudly instead.
+
+    The cache is opt-in: without reflinks every stored result is a full copy, so it
+    costs as much disk (and write time) as the outputs themselves. Turn it on with
+    VIDFLOW_RESULT_CACHE=1 (default folder under the VidFlow cache dir) or
+    VIDFLOW_RESULT_CACHE=<folder>; VIDFLOW_RESULT_CACHE_MB sets the size limit
+    (default 20480) and VIDFLOW_RESULT_CACHE_LINKS=1 serves hits as hardlinks.
+    Passing 'root' enables it regardless of the environment.
+    """
+
+    def __init__(self, root: str = None, max_bytes: int = None, links: bool = None):
+        setting = os.environ.get('VIDFLOW_RESULT_CACHE', '')
+        self.enabled = bool(root) or setting not in ('', '0')
+        self.links = links if links is not None else os.environ.get('VIDFLOW_RESULT_CACHE_LINKS') == '1'
+        folder = setting if setting not in ('', '0', '1') else None
+        self.root = root or folder or os.path.join(SystemUtils.cache_dir(), 'results')
+        self.max_bytes = max_bytes or int(os.environ.get('VIDFLOW_RESULT_CACHE_MB', '20480')) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self._db = None
+        if self.enabled:
+            os.makedirs(os.path.join(self.root, 'objects'), exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.root, 'index.sqlite'), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT, idx INTEGER, op TEXT, ext TEXT, size INTEGER, mtime_ns INTEGER, "
+                "created REAL, last_used REAL, PRIMARY KEY (key, idx))"
+            )
+            self._db.commit()
+
+    def fingerprint(self, path: str) -> str:
+        # Memoised per (size, mtime) so a batch doesn't re-read the same source
+        st = os.stat(path)
+        memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._fingerprints.get(memo_key)
+        if cached is None:
+            cached = sampled_fingerprint(path)
+            with self._lock:
+                self._fingerprints[memo_key] = cached
+        return cached
+
+    @tracing.traced('cache key', 'plan')
+    def key(self, op: str, inputs: list, params: dict = None):
+        """Cache key for op(inputs, params), or None when the cache is off or an input is missing."""
+        if not self.enabled:
+            return None
+        try:
+            fingerprints = [self.fingerprint(p) for p in inputs]
+        except OSError:
+            return None
+        raw = json.dumps({'op': op, 'inputs': fingerprints, 'params': params or {},
+                          'ffmpeg': ffmpeg_version()}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _object_path(self, key: str, idx: int, ext: str) -> str:
+        return os.path.join(self.root, 'objects', key[:2], f"{key}.{idx}{ext}")
+
+    @staticmethod
+    def _materialize(source: str, target: str, link: bool = False):
+        """reflink -> hardlink (if 'link') -> copy, via a temp name so the target appears atomically."""
+        folder, name = os.path.split(os.path.abspath(target))
+        temp = os.path.join(folder, f".{name}.cache-tmp")
+        if os.path.exists(temp):
+            os.remove(temp)
+        try:
+            import fcntl
+            with open(source, 'rb') as src, open(temp, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except (ImportError, OSError):
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            try:
+                if not link:
+                    raise OSError("hardlinks disabled")
+                os.chmod(source, 0o444)
+                os.link(source, temp)
+            except OSError:
+                shutil.copyfile(source, temp)
+        os.replace(temp, target)
+
+    def fetch(self, key: str, outputs: list) -> bool:
+        """Places a cached result at every path in 'outputs'. False on a miss."""
+        if key is None:
+            return False
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT idx, ext, size, mtime_ns FROM entries WHERE key = ? ORDER BY idx", (key,)
+            ).fetchall()
+        if len(rows) != len(outputs):
+            return False
+        objects = []
+        for idx, ext, size, mtime_ns in rows:
+            path = self._object_path(key, idx, ext)
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            # A hardlinked output that was later overwritten in place changed the object too
+            if st is None or st.st_size != size or st.st_mtime_ns != mtime_ns:
+                self._drop(key)
+                return False
+            objects.append(path)
+        try:
+            with tracing.span('cache fetch', 'finalize', outputs=len(outputs)):
+                for source, target in zip(objects, outputs):
+                    self._materialize(source, target, self.links)
+        except OSError:
+            return False
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return True
+
+    def store(self, key: str, op: str, outputs: list):
+        """Adds freshly produced outputs under 'key', then trims the cache to max_bytes."""
+        if key is None or not all(os.path.isfile(p) for p in outputs):
+            return
+        now = time.time()
+        rows = []
+        try:
+            with tracing.span('cache store', 'finalize', op=op):
+                for idx, output in enumerate(outputs):
+                    ext = os.path.splitext(output)[1]
+                    path = self._object_path(key, idx, ext)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    self._materialize(output, path)  # Never linked: the output stays independent
+                    st = os.stat(path)
+                    rows.append((key, idx, op, ext, st.st_size, st.st_mtime_ns, now, now))
+        except OSError as e:
+            print(f"⚠️  Result cache: could not store {op} ({e})")
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+        self.evict()
+
+    def _drop(self, key: str):
+        with self._lock:
+            rows = self._db.execute("SELECT idx, ext FROM entries WHERE key = ?", (key,)).fetchall()
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+        for idx, ext in rows:
+            try:
+                os.remove(self._object_path(key, idx, ext))
+            except OSError:
+                pass
+
+    def evict(self) -> int:
+        """Removes least-recently-used results until the cache fits max_bytes. Returns bytes freed."""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            victims = self._db.execute(
+                "SELECT key, SUM(size) FROM entries GROUP BY key ORDER BY MAX(last_used)"
+            ).fetchall()
+        freed = 0
+        for key, size in victims:
+            if total - freed <= self.max_bytes:
+                break
+            self._drop(key)
+            freed += size
+        return freed
+
+    def run(self, op: str, func, input_path: str, output_path: str, params: dict = None, **options):
+        """
+        Runs func(input_path, output_path, **params, **options) unless the same op/params
+        on the same content is cached. Returns func's result, or True on a hit.
+        """
+        key = self.key(op, [input_path], params)
+        if self.fetch(key, [output_path]):
+            print(f"⚡ Cached result: {os.path.basename(output_path)}")
+            return True
+        result = func(input_path, output_path, **(params or {}), **options)
+        if succeeded(result):
+            self.store(key, op, [output_path])
+        return result
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {'enabled': False}
+        with self._lock:
+            results, size = self._db.execute(
+                "SELECT COUNT(DISTINCT key), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {'enabled': True, 'root': self.root, 'results': results, 'bytes': size, 'max_bytes': self.max_bytes}
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Process-wide ResultCache used by the processors."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResultCache()
+        return _shared_cache
+
+
+if __name__ == "__main__":
+    cache = get_result_cache()
+    if len(sys.argv) > 1 and sys.argv[1] == "trim":
+        print(f"🧹 Freed {cache.evict() / 1e6:.1f} MB")
+    stats = cache.stats()
+    if stats['enabled']:
+        print(f"🗄️  Result cache: {stats['root']}")
+        print(f"   {stats['results']} results, {stats['bytes'] / 1e6:.1f} MB of {stats['max_bytes'] / 1e6:.0f} MB")
+    else:
+        print("🗄️  Result cache is off (opt in with VIDFLOW_RESULT_CACHE=1 or a folder path)")
@@ -0,0 +1,147 @@
+import argparse
+import inspect
+import json
+import os
+import sys
+import typing
+
+try:
+    from src.utils import operations, tracing
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import operations, tracing
+
+USAGE = """usage: python main.py [--trace trace.json] <command> [args]
+
+Commands:
+  <operation> ...          run one operation (see 'list'); '<operation> --help' shows its arguments
+  list                     list every operation and its arguments
+  run <manifest.json>      run a job manifest (dependencies, one shared worker pool)
+  serve                    start the HTTP job service (see src/utils/service.py)
+  farm <work|submit|split|status> <queue_dir> ...
+                           multi-host worker farm over a shared queue directory
+
+--trace writes a Chrome trace (chrome://tracing, ui.perfetto.dev) and prints a
+per-span summary on exit; VIDFLOW_TRACE=trace.json does the same for any entry point.
+
+Run 'python main.py' without arguments for the interactive menu."""
+
+
+def _value_type(annotation, default):
+    """Converter for one parameter: from its annotation, else its default, else a best guess."""
+    origin = getattr(annotation, '__origin__', None)
+    if annotation is list or origin in (list, typing.List):
+        args = getattr(annotation, '__args__', None) or (None,)
+        item = args[0] if args[0] in (int, float, str) else _auto
+        return lambda text: [item(v) for v in json.loads(text)] if text.startswith('[') \
+            else [item(v) for v in text.split(',')]
+    if annotation in (int, float, str):
+        return annotation
+    if isinstance(default, (int, float)) and not isinstance(default, bool):
+        return type(default)
+    return _auto
+
+
+def _auto(text: str):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except (TypeError, ValueError):
+            pass
+    return text
+
+
+def build_parser(name: str) -> argparse.ArgumentParser:
+    """Argument parser for one operation, built from its method signature (imports only that module)."""
+    method = operations.resolve(name)
+    doc = inspect.getdoc(method) or ""
+    parser = argparse.ArgumentParser(prog=f"main.py {name}", description=doc,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    for param in inspect.signature(method).parameters.values():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        convert = _value_type(param.annotation, None if param.default is param.empty else param.default)
+        if param.default is param.empty:
+            parser.add_argument(param.name, type=convert)
+        elif isinstance(param.default, bool):
+            flag = param.name.replace('_', '-')
+            parser.add_argument(f"--{flag}", dest=param.name, action='store_true', default=param.default)
+            parser.add_argument(f"--no-{flag}", dest=param.name, action='store_false')
+        else:
+            parser.add_argument(f"--{param.name.replace('_', '-')}", dest=param.name, type=convert,
+                                default=param.default, help=f"default: {param.default}")
+    return parser
+
+
+def report(result) -> int:
+    """Prints an operation's result; returns the process exit code."""
+    ok = operations.succeeded(result)
+    if isinstance(result, dict):
+        print(json.dumps(result, indent=2, default=str))
+        return 0 if ok else 1
+    if isinstance(result, tuple):
+        for item in result[1:]:
+            if item:
+                print(f"   {item}")
+    elif isinstance(result, list):
+        for item in result:
+            print(f"   {item}")
+    print("✅ Done." if ok else "❌ Failed.")
+    return 0 if ok else 1
+
+
+def list_operations():
+    for name in sorted(operations.OPERATIONS):
+        info = operations.describe(name)
+        optional = " ".join(f"[--{k.replace('_', '-')}]" for k in info['optional'])
+        print(f"  {name:<14} {' '.join(info['required'])} {optional}".rstrip())
+
+
+def main(argv: list = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if len(argv) >= 2 and argv[0] == '--trace':
+        tracing.start(argv[1])
+        argv = argv[2:]
+    if not argv or argv[0] in ('-h', '--help', 'help'):
+        print(USAGE)
+        return 0
+
+    command, rest = argv[0], argv[1:]
+    if command == 'list':
+        list_operations()
+        return 0
+    if command == 'run':
+        from src.utils.manifest import main as run_manifest
+        return run_manifest(rest)
+    if command == 'farm':
+        from src.utils.farm import main as farm
+        return farm(rest)
+    if command == 'serve':
+        from src.utils.service import main as serve
+        serve(rest)
+        return 0
+    if command not in operations.OPERATIONS:
+        print(f"❌ Unknown command: {command}\n")
+        print(USAGE)
+        return 2
+
+    args = vars(build_parser(command).parse_args(rest))
+    with tracing.span(command, 'op', **{k: v for k, v in args.items() if isinstance(v, (str, int, float))}):
+        result = operations.resolve(command)(**args)
+    return report(result)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# ==========================================
+# HOW TO USE THIS CODE (EXAMPLE)
+# ==========================================
+#
+# python main.py list
+# python main.py remaster "Old.mp4" "Old_HD.mp4" --segments 4
+# python main.py split "Movie.mp4" 30 --accurate
+# python main.py gif "Movie.mp4" "Clip.gif" --start-time 12 --duration 4
+# python main.py run "nightly.json" --workers 8
+# python main.py farm work /mnt/nas/queue --slots 2
+# python main.py --trace trace.json run "nightly.json"
@@ -0,0 +1,411 @@
+import argparse
+import importlib
+import json
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+import uuid
+
+try:
+    from src.utils import operations, tracing
+    from src.utils.operations import succeeded
+    from src.utils.segments import SegmentEncoder
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import operations, tracing
+    from src.utils.operations import succeeded
+    from src.utils.segments import SegmentEncoder
+
+# Operations whose encode can be cut into keyframe-aligned segments for several nodes:
+# op -> (module, class, filter attribute, overlap seconds for temporal filters)
+SEGMENTABLE = {
+    'remaster': ('src.processors.remaster', 'VideoRemaster', 'FILTER_CHAIN', 1.0),
+    'shorts': ('src.processors.editor', 'VideoEditor', 'SHORTS_FILTER', 0.0),
+}
+
+
+def _write_json(path: str, data: dict):
+    """Atomic on the shared filesystem too: readers see the old file or the new one, never half."""
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class FarmQueue:
+    """
+    Job queue in a directory on shared storage (NAS), usable from any number of hosts.
+
+        jobs/<id>.json     job spec: {"id", "op", "args", "after": [...], "attempts"}
+        leases/<id>.json   who is running it; created with O_EXCL, refreshed by heartbeat
+        done/<id>.json     result record (the job is finished)
+        failed/<id>.json   gave up after max_attempts (or a dependency failed)
+
+    A lease whose file hasn't been touched for lease_ttl seconds belongs to a dead
+    worker: the next worker renames it away (only one rename can win), checks that
+    what it renamed is still that stale lease, and takes the job over. A takeover
+    counts as an attempt, so a job that keeps killing its worker ends up in failed/.
+    Every node must see the media under the same paths; hosts need
+    roughly synchronised clocks (NTP) for lease expiry.
+    """
+
+    def __init__(self, root: str, lease_ttl: float = 60.0, max_attempts: int = 3):
+        self.root = os.path.abspath(root)
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        for folder in ('jobs', 'leases', 'done', 'failed'):
+            os.makedirs(os.path.join(self.root, folder), exist_ok=True)
+
+    def _path(self, folder: str, job_id: str) -> str:
+        return os.path.join(self.root, folder, f"{job_id}.json")
+
+    @staticmethod
+    def new_id() -> str:
+        # Time-ordered, so workers pick up jobs roughly first-in first-out
+        return f"{int(time.time() * 1000):012x}-{uuid.uuid4().hex[:8]}"
+
+    def submit(self, op: str, args: dict, after: list = None, job_id: str = None) -> str:
+        """Queues operations.OPERATIONS[op](**args). Paths in args must be valid on every node."""
+        if op not in operations.OPERATIONS:
+            raise KeyError(f"Unknown operation: {op}")
+        operations.check_args(op, args)
+        job_id = job_id or self.new_id()
+        _write_json(self._path('jobs', job_id), {
+            'id': job_id, 'op': op, 'args': args, 'after': list(after or []),
+            'attempts': 0, 'created': time.time(),
+        })
+        return job_id
+
+    def submit_segmented(self, op: str, input_path: str, output_path: str, segments: int = 0,
+                         min_segment: float = 20.0) -> list:
+        """
+        Splits one long encode (see SEGMENTABLE) into keyframe-aligned segment jobs that
+        any node can take, plus a join job that runs once they are all done.
+        Returns the job ids, join job last.
+        """
+        module_name, class_name, filter_attr, overlap = SEGMENTABLE[op]
+        processor = getattr(importlib.import_module(module_name), class_name)
+        encoder = SegmentEncoder(segments or 16, overlap=overlap, min_segment=min_segment)
+        ranges = encoder.plan(input_path)
+        if not ranges:
+            raise ValueError(f"cannot probe {input_path}")
+
+        input_path, output_path = os.path.abspath(input_path), os.path.abspath(output_path)
+        group = self.new_id()
+        work_dir = os.path.join(os.path.dirname(output_path), f".vidflow_farm_{group}")
+        os.makedirs(work_dir, exist_ok=True)
+        ids, parts = [], []
+        for i, (start, end) in enumerate(ranges):
+            part = os.path.join(work_dir, f"segment_{i:04d}.mkv")
+            parts.append(part)
+            ids.append(self.submit('encode_segment', {
+                'input_path': input_path, 'output_path': part, 'start': start, 'end': end,
+                'filter_graph': getattr(processor, filter_attr), 'encoder_args': processor.ENCODER_ARGS,
+                'overlap': overlap,
+            }, job_id=f"{group}-seg{i:04d}"))
+        ids.append(self.submit('join_segments', {'parts': parts, 'input_path': input_path, 'output_path': output_path},
+                               after=ids, job_id=f"{group}-join"))
+        print(f"🧩 Queued {op} of {os.path.basename(input_path)} as {len(ranges)} segments + join")
+        return ids
+
+    def _lease_expired(self, lease_path: str) -> bool:
+        try:
+            return time.time() - os.stat(lease_path).st_mtime > self.lease_ttl
+        except OSError:
+            return False
+
+    def claim(self, worker_id: str):
+        """Takes the oldest runnable job. Returns its spec, or None if nothing can run now."""
+        done = {name[:-5] for name in os.listdir(os.path.join(self.root, 'done'))}
+        failed = {name[:-5] for name in os.listdir(os.path.join(self.root, 'failed'))}
+        for name in sorted(os.listdir(os.path.join(self.root, 'jobs'))):
+            if not name.endswith('.json'):
+                continue
+            job_id = name[:-5]
+            if job_id in done or job_id in failed:
+                continue
+            job = _read_json(self._path('jobs', job_id))
+            if job is None:
+                continue
+            if any(dep in failed for dep in job['after']):
+                self._fail(job, f"dependency failed: {', '.join(d for d in job['after'] if d in failed)}")
+                continue
+            if not all(dep in done for dep in job['after']):
+                continue
+            if self._acquire(job, worker_id):
+                # Another worker may have run (and retried or finished) it since we read the spec:
+                # re-read under the lease so attempts aren't counted from a stale copy
+                job = _read_json(self._path('jobs', job_id))
+                if (job is None or os.path.exists(self._path('done', job_id))
+                        or os.path.exists(self._path('failed', job_id))):
+                    self.release(job_id)
+                    continue
+                return job
+        return None
+
+    def _lease_stamp(self, path: str):
+        """(owner, mtime) of a lease file, or None if it is gone."""
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        lease = _read_json(path) or {}
+        return lease.get('worker'), mtime
+
+    def _reclaim(self, job: dict, worker_id: str) -> bool:
+        """Takes an expired lease away from a dead worker. False if it isn't (or is no longer) stale."""
+        lease_path = self._path('leases', job['id'])
+        seen = self._lease_stamp(lease_path)
+        if seen is None or time.time() - seen[1] <= self.lease_ttl:
+            return False
+        stale_path = f"{lease_path}.stale-{worker_id}"
+        try:
+            # Only one worker's rename succeeds; everyone else sees the lease vanish
+            os.rename(lease_path, stale_path)
+        except OSError:
+            return False
+        # Between the check and the rename another worker may have reclaimed the job and
+        # written a fresh lease; if that is what we moved, put it back untouched
+        if self._lease_stamp(stale_path) != seen:
+            try:
+                os.link(stale_path, lease_path)
+            except OSError:
+                pass  # Someone else holds the job now; the one we moved was superseded
+            os.remove(stale_path)
+            return False
+        os.remove(stale_path)
+
+        job.update(_read_json(self._path('jobs', job['id'])) or {})  # Count from the latest attempts
+        job['attempts'] = job.get('attempts', 0) + 1
+        job['last_error'] = f"worker {seen[0]} stopped responding"
+        if job['attempts'] >= self.max_attempts:
+            print(f"❌ {job['id']} lost its worker {job['attempts']} times, giving up")
+            self._fail(job, job['last_error'])
+            return False
+        print(f"♻️  Reclaiming {job['id']} from a dead worker (attempt {job['attempts'] + 1})")
+        _write_json(self._path('jobs', job['id']), job)
+        return True
+
+    def _acquire(self, job: dict, worker_id: str) -> bool:
+        lease_path = self._path('leases', job['id'])
+        if os.path.exists(lease_path) and not self._reclaim(job, worker_id):
+            return False
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'worker': worker_id, 'host': socket.gethostname(), 'pid': os.getpid(),
+                       'claimed': time.time()}, f)
+        return True
+
+    def owns(self, job_id: str, worker_id: str) -> bool:
+        lease = _read_json(self._path('leases', job_id))
+        return bool(lease) and lease.get('worker') == worker_id
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Refreshes the lease. False means it was lost (expired and taken over)."""
+        if not self.owns(job_id, worker_id):
+            return False
+        try:
+            os.utime(self._path('leases', job_id), None)
+            return True
+        except OSError:
+            return False
+
+    def release(self, job_id: str):
+        try:
+            os.remove(self._path('leases', job_id))
+        except OSError:
+            pass
+
+    def complete(self, job: dict, worker_id: str, ok: bool, elapsed: float, error: str = None):
+        if not self.owns(job['id'], worker_id):
+            print(f"⚠️  Lost the lease on {job['id']} while running it; result dropped")
+            return
+        record = {'id': job['id'], 'op': job['op'], 'worker': worker_id, 'host': socket.gethostname(),
+                  'elapsed': round(elapsed, 3), 'finished': time.time(), 'error': error}
+        if ok:
+            _write_json(self._path('done', job['id']), record)
+        else:
+            job['attempts'] = job.get('attempts', 0) + 1
+            job['last_error'] = error
+            if job['attempts'] >= self.max_attempts:
+                _write_json(self._path('failed', job['id']), record)
+            else:
+                _write_json(self._path('jobs', job['id']), job)  # Back in the queue for another try
+        self.release(job['id'])
+
+    def _fail(self, job: dict, error: str):
+        _write_json(self._path('failed', job['id']), {'id': job['id'], 'op': job['op'], 'error': error,
+                                                      'finished': time.time()})
+
+    def status(self) -> dict:
+        def names(folder):
+            return {n[:-5] for n in os.listdir(os.path.join(self.root, folder)) if n.endswith('.json')}
+        jobs, done, failed = names('jobs'), names('done'), names('failed')
+        leases = names('leases') - done - failed
+        running = {j for j in leases if not self._lease_expired(self._path('leases', j))}
+        return {'jobs': len(jobs), 'done': len(done & jobs), 'failed': len(failed & jobs),
+                'running': len(running), 'stale': len(leases - running),
+                'pending': len(jobs - done - failed - leases)}
+
+
+class FarmWorker:
+    """
+    One VidFlow process serving a FarmQueue: claims a job, keeps its lease alive from
+    a heartbeat thread while the processor runs, records the result, repeats.
+    'slots' jobs run at once on this node (e.g. 2 encodes on a 32-core box).
+    """
+
+    def __init__(self, queue: FarmQueue, slots: int = 1, poll: float = 2.0, worker_id: str = None):
+        self.queue = queue
+        self.slots = max(1, slots)
+        self.poll = poll
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.completed = 0
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.queue.lease_ttl / 3):
+            with self._lock:
+                held = list(self._held)
+            for job_id in held:
+                if not self.queue.heartbeat(job_id, self.worker_id):
+                    print(f"⚠️  Lease on {job_id} lost")
+
+    def _run_job(self, job: dict):
+        print(f"⚙️  [{self.worker_id}] {job['id']} ({job['op']})")
+        start = time.perf_counter()
+        # 'created' is wall-clock (possibly another host's): shift it onto this process's clock
+        tracing.record_async('queue wait', 'queue', start - max(0.0, time.time() - job.get('created', time.time())),
+                             start, job=job['id'])
+        error = None
+        try:
+            with tracing.span(job['id'], 'job', op=job['op'], worker=self.worker_id):
+                result = operations.resolve(job['op'])(**job['args'])
+            ok = succeeded(result)
+            if not ok:
+                error = "processor reported failure"
+        except Exception as e:
+            ok, error = False, str(e) or type(e).__name__
+        self.queue.complete(job, self.worker_id, ok, time.perf_counter() - start, error)
+        if ok and job['op'] == 'join_segments':
+            shutil.rmtree(os.path.dirname(job['args']['parts'][0]), ignore_errors=True)
+        with self._lock:
+            self._held.discard(job['id'])
+            self.completed += 1
+        print(f"{'✅' if ok else '❌'} [{self.worker_id}] {job['id']} ({time.perf_counter() - start:.1f}s)")
+
+    def _slot_loop(self, exit_when_idle: bool):
+        while not self._stop.is_set():
+            job = self.queue.claim(self.worker_id)
+            if job is None:
+                if exit_when_idle:
+                    status = self.queue.status()
+                    if status['pending'] == 0 and status['running'] == 0 and status['stale'] == 0:
+                        return
+                self._stop.wait(self.poll)
+                continue
+            with self._lock:
+                self._held.add(job['id'])
+            self._run_job(job)
+
+    def run(self, exit_when_idle: bool = False):
+        """Serves the queue until stopped (Ctrl+C), or until it's drained with exit_when_idle."""
+        print(f"🚜 Worker {self.worker_id} on {self.queue.root} ({self.slots} slot(s))")
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat.start()
+        slots = [threading.Thread(target=self._slot_loop, args=(exit_when_idle,), daemon=True)
+                 for _ in range(self.slots)]
+        for thread in slots:
+            thread.start()
+        try:
+            for thread in slots:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping (running jobs keep their lease until they expire)...")
+        finally:
+            self._stop.set()
+        return self.completed
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="main.py farm", description="Shared-directory worker farm")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    work = commands.add_parser("work", help="serve the queue")
+    work.add_argument("queue")
+    work.add_argument("--slots", type=int, default=1, help="jobs run at once on this node")
+    work.add_argument("--lease-ttl", type=float, default=60.0)
+    work.add_argument("--poll", type=float, default=2.0)
+    work.add_argument("--exit-when-idle", action="store_true")
+
+    submit = commands.add_parser("submit", help="queue the jobs of a manifest (see manifest.py)")
+    submit.add_argument("queue")
+    submit.add_argument("manifest")
+
+    split = commands.add_parser("split", help="queue one long encode as segments for many nodes")
+    split.add_argument("queue")
+    split.add_argument("op", choices=sorted(SEGMENTABLE))
+    split.add_argument("input_path")
+    split.add_argument("output_path")
+    split.add_argument("--segments", type=int, default=0)
+
+    status = commands.add_parser("status")
+    status.add_argument("queue")
+    options = parser.parse_args(argv)
+
+    queue = FarmQueue(options.queue, lease_ttl=getattr(options, 'lease_ttl', 60.0))
+    if options.command == "work":
+        FarmWorker(queue, options.slots, options.poll).run(options.exit_when_idle)
+    elif options.command == "submit":
+        from src.utils.manifest import load_manifest
+        entries = load_manifest(options.manifest).get('jobs', [])
+        # Manifest ids are local names; prefix them so resubmitting doesn't collide
+        prefix = queue.new_id()
+        local = {str(e.get('id', i)): f"{prefix}-{e.get('id', i)}" for i, e in enumerate(entries)}
+        for i, entry in enumerate(entries):
+            after = entry.get('after', [])
+            after = [after] if isinstance(after, str) else after
+            queue.submit(entry['op'], entry.get('args', {}), [local[str(a)] for a in after],
+                         job_id=local[str(entry.get('id', i))])
+        print(f"📥 Queued {len(entries)} jobs")
+    elif options.command == "split":
+        queue.submit_segmented(options.op, options.input_path, options.output_path, options.segments)
+    print(f"📊 {queue.status()}")
+    return 0
+
+
+# --- STANDALONE EXECUTION LOGIC ---
+if __name__ == "__main__":
+    sys.exit(main())
+
+# ==========================================
+# HOW TO USE THIS CODE (EXAMPLE)
+# ==========================================
+#
+# On any machine (queue and media on the shared NAS, same mount path everywhere):
+# python main.py farm split /mnt/nas/queue remaster "/mnt/nas/Old.avi" "/mnt/nas/Old_HD.mp4" --segments 24
+# python main.py farm submit /mnt/nas/queue nightly.json
+#
+# On every encode node:
+# python main.py farm work /mnt/nas/queue --slots 2
+#
+# Try it locally with several workers on one box:
+# python main.py farm split /tmp/q remaster Old.avi Old_HD.mp4 --segments 8
+# for i in 1 2 3; do python main.py farm work /tmp/q --exit-when-idle --lease-ttl 10 & done; wait
@@ -0,0 +1,255 @@
+import contextvars
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    from src.utils import tracing
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+
+# Callbacks that receive every FFmpegProgress from every run (e.g. a dashboard)
+progress_listeners = []
+_metrics_lock = threading.Lock()
+# Lets a job supervisor (see jobs.py) take over every run_ffmpeg call made in its context
+runner_override = contextvars.ContextVar('vidflow_ffmpeg_runner', default=None)
+# Same for ffprobe calls (run_probe), so a cancelled or timed-out job takes its probes down too
+probe_override = contextvars.ContextVar('vidflow_probe_runner', default=None)
+# Process-wide admission control for every run (see scheduler.ResourceGate); None = unlimited
+_resource_gate = None
+
+
+class FFmpegStalled(subprocess.CalledProcessError):
+    """Raised when FFmpeg stops reporting progress for longer than 'stall_timeout'."""
+
+
+class ProbeTimeout(subprocess.CalledProcessError):
+    """Raised when an ffprobe call runs longer than its timeout (hung network mount, broken file)."""
+
+
+class FFmpegProgress:
+    def __init__(self, label: str):
+        self.label = label
+        self.frame = 0
+        self.fps = 0.0
+        self.speed = 0.0
+        self.out_time = 0.0       # Seconds of output written so far
+        self.bitrate = None       # kbit/s
+        self.total_size = 0
+        self.elapsed = 0.0
+        self.eta = None           # Seconds left (only when the duration is known)
+        self.done = False
+        self.benchmark = {}       # utime/stime/rtime/maxrss_kb when run with -benchmark (tracing)
+        self._fields = {}
+
+    def feed(self, raw: bytes, started: float, duration: float = None) -> bool:
+        """Consumes one '-progress' line; returns True when a full block was parsed."""
+        key, _, value = raw.decode(errors='replace').strip().partition('=')
+        self._fields[key] = value
+        if key != 'progress':
+            return False
+        self.update(self._fields, started, duration)
+        self._fields = {}
+        return True
+
+    def update(self, fields: dict, started: float, duration: float = None):
+        self.frame = int(fields.get('frame', self.frame) or 0)
+        self.fps = _number(fields.get('fps'), self.fps)
+        self.speed = _number(fields.get('speed', '').rstrip('x'), self.speed)
+        out_us = fields.get('out_time_us') or fields.get('out_time_ms')
+        if out_us not in (None, 'N/A'):
+            self.out_time = _number(out_us, 0.0) / 1_000_000
+        bitrate = fields.get('bitrate', '')
+        if bitrate.endswith('kbits/s'):
+            self.bitrate = _number(bitrate[:-7], None)
+        self.total_size = int(_number(fields.get('total_size'), self.total_size))
+        self.elapsed = time.monotonic() - started
+        self.done = fields.get('progress') == 'end'
+        if duration and self.speed > 0:
+            self.eta = max(0.0, (duration - self.out_time) / self.speed)
+
+    def as_dict(self) -> dict:
+        return {
+            'label': self.label, 'frame': self.frame, 'fps': self.fps, 'speed': self.speed,
+            'out_time': round(self.out_time, 3), 'bitrate': self.bitrate,
+            'total_size': self.total_size, 'elapsed': round(self.elapsed, 3),
+            'eta': None if self.eta is None else round(self.eta, 1), 'done': self.done,
+        }
+
+
+def _number(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _write_metrics(path: str, record: dict):
+    line = json.dumps(record, separators=(',', ':'))
+    with _metrics_lock:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+def progress_command(command: list) -> list:
+    # While tracing, ffmpeg reports its own CPU time and peak memory on exit
+    benchmark = ['-benchmark'] if tracing.enabled() else []
+    return [command[0], '-nostats', '-progress', 'pipe:1', *benchmark, *command[1:]]
+
+
+def notify_progress(progress: FFmpegProgress, on_progress=None, metrics_path: str = None):
+    for callback in ([on_progress] if on_progress else []) + progress_listeners:
+        callback(progress)
+    if metrics_path:
+        _write_metrics(metrics_path, {'ts': time.time(), **progress.as_dict()})
+
+
+def finish_run(command: list, progress: FFmpegProgress, returncode: int, tail, started: float,
+               metrics_path: str = None, stalled: bool = False, stall_timeout: float = None) -> FFmpegProgress:
+    """Shared epilogue of the sync and async runners: final metrics record + error mapping."""
+    progress.elapsed = time.monotonic() - started
+    if metrics_path:
+        _write_metrics(metrics_path, {'ts': time.time(), **progress.as_dict(), 'returncode': returncode})
+
+    if tracing.enabled():
+        progress.benchmark = tracing.parse_benchmark(tail)
+    stderr = b''.join(tail)
+    if stalled:
+        raise FFmpegStalled(returncode, command, output=None,
+                            stderr=stderr + f"\n[vidflow] no progress for {stall_timeout}s, job killed\n".encode())
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, output=None, stderr=stderr)
+    return progress
+
+
+def set_resource_gate(gate):
+    """Installs 'gate' (enter(command) -> (command, slot), leave(slot)); returns the previous one."""
+    global _resource_gate
+    previous, _resource_gate = _resource_gate, gate
+    return previous
+
+
+def run_ffmpeg(command: list, on_progress=None, label: str = None, duration: float = None,
+               stall_timeout: float = None, metrics_path: str = None, stderr_lines: int = 200) -> FFmpegProgress:
+    """
+    Drop-in replacement for subprocess.run(command, check=True, capture_output=True).
+
+    Runs FFmpeg with '-progress pipe:1 -nostats' and parses frame/fps/speed/out_time/
+    bitrate as they arrive. Only the last 'stderr_lines' lines of stderr are kept.
+    On failure raises CalledProcessError whose .stderr holds that tail, exactly like
+    subprocess.run did, so existing error handling keeps working.
+
+    on_progress: callable(FFmpegProgress) invoked for every progress block.
+    duration: total output seconds, enables the ETA estimate.
+    stall_timeout: kill the job if no progress arrives for this many seconds.
+    metrics_path: JSON-lines sink (defaults to the VIDFLOW_METRICS env var).
+    """
+    gate = _resource_gate
+    if gate is None:
+        return _run(command, on_progress, label, duration, stall_timeout, metrics_path, stderr_lines)
+    waited = time.perf_counter()
+    command, slot = gate.enter(command)
+    tracing.record('resource wait', 'queue', waited, time.perf_counter())
+    try:
+        return _run(command, on_progress, label, duration, stall_timeout, metrics_path, stderr_lines)
+    finally:
+        gate.leave(slot)
+
+
+def run_probe(command: list, timeout: float) -> bytes:
+    """
+    Runs an ffprobe command and returns its stdout. The process is killed after
+    'timeout' seconds (ProbeTimeout); a non-zero exit raises CalledProcessError.
+    Inside a JobManager job the call is supervised like run_ffmpeg.
+    """
+    override = probe_override.get()
+    if override is not None:
+        return override(command, timeout)
+    try:
+        result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, timeout=timeout)
+    except subprocess.TimeoutExpired as e:
+        raise ProbeTimeout(-9, command, output=e.output,
+                           stderr=(e.stderr or b'') + f"\n[vidflow] ffprobe timed out after {timeout}s\n".encode())
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, command, output=result.stdout, stderr=result.stderr)
+    return result.stdout
+
+
+def trace_category(command: list) -> str:
+    """Trace category of a run: its resource class, 'copy', 'audio' or 'encode' (see scheduler.classify)."""
+    from src.utils.scheduler import classify  # scheduler imports this module
+    return classify(command)
+
+
+def _run(command, on_progress, label, duration, stall_timeout, metrics_path, stderr_lines) -> FFmpegProgress:
+    override = runner_override.get()
+    if override is not None:
+        return override(command, on_progress=on_progress, label=label, duration=duration,
+                        stall_timeout=stall_timeout, metrics_path=metrics_path, stderr_lines=stderr_lines)
+
+    label = label or os.path.basename(command[-1])
+    with tracing.span('ffmpeg', trace_category(command), label=label) as span:
+        progress = _run_process(command, on_progress, label, duration, stall_timeout, metrics_path, stderr_lines)
+        span.update(progress.benchmark)
+    return progress
+
+
+def _run_process(command, on_progress, label, duration, stall_timeout, metrics_path, stderr_lines) -> FFmpegProgress:
+    metrics_path = metrics_path or os.environ.get('VIDFLOW_METRICS')
+
+    started = time.monotonic()
+    spawn = time.perf_counter()
+    process = subprocess.Popen(progress_command(command), stdin=subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    tracing.record('spawn', 'spawn', spawn, time.perf_counter(), pid=process.pid)
+    tail = deque(maxlen=stderr_lines)
+    stderr_reader = threading.Thread(target=lambda: tail.extend(process.stderr), daemon=True)
+    stderr_reader.start()
+
+    progress = FFmpegProgress(label)
+    last_seen = [time.monotonic()]
+    stalled = threading.Event()
+    finished = threading.Event()
+
+    def watchdog():
+        while not finished.wait(1.0):
+            if time.monotonic() - last_seen[0] > stall_timeout:
+                stalled.set()
+                process.kill()
+                return
+
+    if stall_timeout:
+        threading.Thread(target=watchdog, daemon=True).start()
+
+    try:
+        for raw in process.stdout:
+            last_seen[0] = time.monotonic()
+            if progress.feed(raw, started, duration):
+                notify_progress(progress, on_progress, metrics_path)
+        returncode = process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        finished.set()
+        stderr_reader.join()
+        process.stdout.close()
+        process.stderr.close()
+
+    return finish_run(command, progress, returncode, tail, started, metrics_path,
+                      stalled.is_set(), stall_timeout)
+
+
+def console_progress(progress: FFmpegProgress):
+    """on_progress callback that keeps one live status line in the terminal."""
+    eta = f", ETA {progress.eta:.0f}s" if progress.eta is not None else ""
+    end = "\n" if progress.done else ""
+    print(f"\r   ⏱️  {progress.out_time:.1f}s encoded | {progress.fps:.1f} fps | {progress.speed:.2f}x{eta}   ",
+          end=end, flush=True)
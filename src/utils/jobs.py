@@ -0,0 +1,339 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src.utils import tracing
+    from src.utils.operations import succeeded
+    from src.utils.ffmpeg import (FFmpegProgress, ProbeTimeout, finish_run, notify_progress,
+                                  progress_command, probe_override, runner_override, trace_category)
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.operations import succeeded
+    from src.utils.ffmpeg import (FFmpegProgress, ProbeTimeout, finish_run, notify_progress,
+                                  progress_command, probe_override, runner_override, trace_category)
+
+# FFmpeg gets its own process group so cancelling kills it and anything it spawned
+if os.name == 'posix':
+    _GROUP_KWARGS = {'start_new_session': True}
+else:
+    _GROUP_KWARGS = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker thread when the job is cancelled or times out."""
+
+
+async def terminate_process_group(process, grace: float = 5.0):
+    """SIGTERM the whole group (lets FFmpeg finish its trailer), SIGKILL after 'grace' seconds."""
+    if process.returncode is not None:
+        return
+    try:
+        if os.name == 'posix':
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            process.terminate()
+    except ProcessLookupError:
+        return
+    try:
+        await asyncio.wait_for(process.wait(), grace)
+    except asyncio.TimeoutError:
+        try:
+            if os.name == 'posix':
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+
+
+async def run_ffmpeg_async(command: list, on_progress=None, label: str = None, duration: float = None,
+                           stall_timeout: float = None, metrics_path: str = None,
+                           stderr_lines: int = 200) -> FFmpegProgress:
+    """asyncio twin of run_ffmpeg(): same progress parsing, errors and metrics, but cancellable."""
+    label = label or os.path.basename(command[-1])
+    metrics_path = metrics_path or os.environ.get('VIDFLOW_METRICS')
+
+    started = time.monotonic()
+    spawn = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *progress_command(command), stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, **_GROUP_KWARGS
+    )
+    # Concurrent spawns overlap on the loop thread, so each child gets its own trace row
+    tracing.record('spawn', 'spawn', spawn, time.perf_counter(),
+                   tid=process.pid, thread_name=f"ffmpeg {process.pid}")
+    tail = deque(maxlen=stderr_lines)
+
+    async def drain_stderr():
+        async for line in process.stderr:
+            tail.append(line)
+
+    stderr_task = asyncio.ensure_future(drain_stderr())
+    progress = FFmpegProgress(label)
+    stalled = False
+    try:
+        while True:
+            try:
+                raw = await asyncio.wait_for(process.stdout.readline(), stall_timeout)
+            except asyncio.TimeoutError:
+                stalled = True
+                await terminate_process_group(process)
+                break
+            if not raw:
+                break
+            if progress.feed(raw, started, duration):
+                notify_progress(progress, on_progress, metrics_path)
+        returncode = await process.wait()
+        await stderr_task
+    except asyncio.CancelledError:
+        await terminate_process_group(process)
+        stderr_task.cancel()
+        raise
+
+    return finish_run(command, progress, returncode, tail, started, metrics_path, stalled, stall_timeout)
+
+
+def _traced_job(name: str, func, *args, **kwargs):
+    with tracing.span(name, 'job', op=getattr(func, '__qualname__', None)):
+        return func(*args, **kwargs)
+
+
+class JobHandle:
+    """Awaitable handle for one submitted job: await it, cancel it, or poll its state/progress."""
+
+    def __init__(self, job_id: int, name: str, timeout: float = None, stall_timeout: float = None):
+        self.id = job_id
+        self.name = name
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.state = 'queued'     # queued -> running -> done | failed | cancelled | timeout
+        self.progress = None      # Last FFmpegProgress of the running ffmpeg
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._task = None
+        self._ffmpeg_tasks = set()
+        self._stopping = False
+
+    def __await__(self):
+        return self._task.__await__()
+
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    def cancel(self):
+        """Cancels the job (call from the event loop thread; see JobManager.cancel otherwise)."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    def _settle(self, task):
+        # A job cancelled before its coroutine ever ran never reaches _run's handlers
+        if task.cancelled() and self.state == 'queued':
+            self.state = 'cancelled'
+            self.finished = time.time()
+
+    def _stop(self):
+        self._stopping = True
+        for task in list(self._ffmpeg_tasks):
+            task.cancel()
+
+    def as_dict(self) -> dict:
+        return {
+            'id': self.id, 'name': self.name, 'state': self.state,
+            'progress': self.progress.as_dict() if self.progress else None,
+            'result': self.result if isinstance(self.result, (bool, int, float, str, list, tuple, dict, type(None))) else repr(self.result),
+            'error': self.error, 'created': self.created, 'started': self.started, 'finished': self.finished,
+        }
+
+
+class JobManager:
+    """
+    Supervises many processor jobs from one asyncio event loop.
+
+    Each job runs an ordinary (blocking) processor method on a worker thread, but
+    every run_ffmpeg() call it makes is redirected to the loop and executed with
+    asyncio.create_subprocess_exec in its own process group. That gives each job
+    cancellation, a wall-clock timeout and stall detection without rewriting
+    the processors.
+    """
+
+    def __init__(self, max_concurrent: int = 0, stall_timeout: float = None):
+        self.max_concurrent = max(1, max_concurrent or os.cpu_count() or 1)
+        self.stall_timeout = stall_timeout
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._semaphore = None
+        self._loop = None
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='vidflow-job')
+
+    def submit(self, func, *args, name: str = None, timeout: float = None,
+               stall_timeout: float = None, **kwargs) -> JobHandle:
+        """Queues func(*args, **kwargs). Must be called from inside the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        handle = JobHandle(next(self._ids), name or getattr(func, '__qualname__', repr(func)),
+                           timeout, stall_timeout or self.stall_timeout)
+        self.jobs[handle.id] = handle
+        handle._task = asyncio.ensure_future(self._run(handle, func, args, kwargs))
+        handle._task.add_done_callback(handle._settle)
+        return handle
+
+    def cancel(self, job_id: int) -> bool:
+        """Thread-safe cancel by id (usable from HTTP handlers or other threads)."""
+        handle = self.jobs.get(job_id)
+        if handle is None or handle.done() or self._loop is None:
+            return False
+        self._loop.call_soon_threadsafe(handle.cancel)
+        return True
+
+    def wrap(self, processor) -> '_AsyncProcessor':
+        """Async view of a processor: every method call returns a JobHandle."""
+        return _AsyncProcessor(self, processor)
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, handle: JobHandle):
+        """Holds one of the max_concurrent slots; a job cancelled while waiting for it ends as 'cancelled'."""
+        try:
+            await self._semaphore.acquire()
+        except asyncio.CancelledError:
+            handle.state = 'cancelled'
+            handle.finished = time.time()
+            raise
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+    async def _run(self, handle: JobHandle, func, args, kwargs):
+        queued = time.perf_counter()
+        async with self._slot(handle):
+            tracing.record_async('queue wait', 'queue', queued, time.perf_counter(), job=handle.name)
+            loop = asyncio.get_running_loop()
+            handle.state = 'running'
+            handle.started = time.time()
+
+            def supervised_ffmpeg(command, **options):
+                if handle._stopping:
+                    raise JobCancelled(handle.name)
+                # Timed on the worker thread so the encode nests under the job's span
+                with tracing.span('ffmpeg', trace_category(command), label=options.get('label') or os.path.basename(command[-1])) as span:
+                    future = asyncio.run_coroutine_threadsafe(self._ffmpeg(handle, command, **options), loop)
+                    progress = future.result()
+                    span.update(progress.benchmark)
+                return progress
+
+            def supervised_probe(command, timeout):
+                if handle._stopping:
+                    raise JobCancelled(handle.name)
+                return asyncio.run_coroutine_threadsafe(self._probe(handle, command, timeout), loop).result()
+
+            context = contextvars.copy_context()
+            context.run(runner_override.set, supervised_ffmpeg)
+            context.run(probe_override.set, supervised_probe)
+            worker = loop.run_in_executor(self._executor, functools.partial(context.run, _traced_job, handle.name,
+                                                                            func, *args, **kwargs))
+            try:
+                result = await asyncio.wait_for(asyncio.shield(worker), handle.timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+                handle.state = 'timeout' if isinstance(e, asyncio.TimeoutError) else 'cancelled'
+                handle._stop()
+                try:
+                    await worker  # Let the worker thread unwind once its ffmpeg is gone
+                except BaseException:
+                    pass
+                handle.finished = time.time()
+                raise
+            except Exception as e:
+                handle.state = 'failed'
+                handle.error = str(e) or type(e).__name__
+                handle.finished = time.time()
+                raise
+
+            handle.result = result
+            handle.state = 'done' if succeeded(result) else 'failed'
+            handle.finished = time.time()
+            return result
+
+    async def _ffmpeg(self, handle: JobHandle, command: list, on_progress=None, stall_timeout=None, **options):
+        task = asyncio.current_task()
+        handle._ffmpeg_tasks.add(task)
+
+        def track(progress):
+            handle.progress = progress
+            if on_progress:
+                on_progress(progress)
+
+        try:
+            return await run_ffmpeg_async(command, on_progress=track,
+                                          stall_timeout=stall_timeout or handle.stall_timeout, **options)
+        finally:
+            handle._ffmpeg_tasks.discard(task)
+
+    async def _probe(self, handle: JobHandle, command: list, timeout: float) -> bytes:
+        """ffprobe in its own process group, killed on timeout or when the job is cancelled."""
+        task = asyncio.current_task()
+        handle._ffmpeg_tasks.add(task)
+        process = await asyncio.create_subprocess_exec(
+            *command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **_GROUP_KWARGS
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await terminate_process_group(process, grace=0)
+            raise ProbeTimeout(-9, command, output=None,
+                               stderr=f"[vidflow] ffprobe timed out after {timeout}s\n".encode())
+        except asyncio.CancelledError:
+            await terminate_process_group(process, grace=0)
+            raise
+        finally:
+            handle._ffmpeg_tasks.discard(task)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command, output=stdout, stderr=stderr)
+        return stdout
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class _AsyncProcessor:
+    def __init__(self, manager: JobManager, processor):
+        self._manager = manager
+        self._processor = processor
+
+    def __getattr__(self, method_name: str):
+        method = getattr(self._processor, method_name)
+        label = f"{type(self._processor).__name__}.{method_name}"
+
+        def submit(*args, timeout: float = None, stall_timeout: float = None, **kwargs) -> JobHandle:
+            return self._manager.submit(method, *args, name=label, timeout=timeout,
+                                        stall_timeout=stall_timeout, **kwargs)
+        return submit
+
+# ==========================================
+# HOW TO USE THIS CODE (EXAMPLE)
+# ==========================================
+#
+# async def main():
+#     jobs = JobManager(max_concurrent=8, stall_timeout=120)
+#     remaster = jobs.wrap(VideoRemaster())
+#     handles = [remaster.enhance_old_footage(src, dst, timeout=4 * 3600) for src, dst in work]
+#     handles[3].cancel()                      # kills that ffmpeg's process group
+#     results = await asyncio.gather(*handles, return_exceptions=True)
+#
+# asyncio.run(main())
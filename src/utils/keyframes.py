@@ -0,0 +1,143 @@
+import bisect
+import hashlib
+import json
+import os
+import sys
+import threading
+from typing import List, Optional
+
+try:
+    from src.utils import tracing
+    from src.utils.ffmpeg import run_probe
+    from src.utils.probe import MediaProbe
+    from src.utils.system import SystemUtils
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.ffmpeg import run_probe
+    from src.utils.probe import MediaProbe
+    from src.utils.system import SystemUtils
+
+
+class KeyframeIndex:
+    """
+    Keyframe timestamps of a file's first video stream, read once with ffprobe
+    (packet flags only, no decoding) and kept in a JSON sidecar.
+
+    The sidecar lives in the VidFlow cache dir (named after the file's path), so
+    users' media folders stay untouched. It's keyed by size + mtime, so an edited
+    file is re-indexed automatically.
+    """
+    # Reads every packet header of the file, so allow much longer than a plain probe
+    SCAN_TIMEOUT = 600.0
+
+    def __init__(self, sidecar: bool = True):
+        self.sidecar = sidecar
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path: str):
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+
+    @staticmethod
+    def sidecar_path(input_path: str) -> str:
+        digest = hashlib.sha1(os.path.abspath(input_path).encode('utf-8')).hexdigest()
+        return os.path.join(SystemUtils.cache_dir(), 'keyframes', f"{digest}.json")
+
+    def _read_sidecar(self, input_path: str, stamp) -> Optional[List[float]]:
+        try:
+            with open(self.sidecar_path(input_path), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data['keyframes'] if data.get('stamp') == stamp else None
+
+    def _write_sidecar(self, input_path: str, stamp, keyframes: List[float]):
+        path = self.sidecar_path(input_path)
+        data = json.dumps({'stamp': stamp, 'keyframes': keyframes}, separators=(',', ':'))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️  Could not cache keyframes: {e}")  # The index still works from memory
+
+    @classmethod
+    def _scan(cls, input_path: str) -> List[float]:
+        # Packet times are absolute; -ss counts from the file's start_time (non-zero for TS)
+        start = run_probe([
+            'ffprobe', '-v', 'error', '-show_entries', 'format=start_time', '-of', 'csv=p=0', input_path
+        ], MediaProbe.TIMEOUT).decode().strip()
+        offset = float(start) if start not in ('', 'N/A') else 0.0
+        cmd = [
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,flags',
+            '-of', 'csv=p=0', input_path
+        ]
+        output = run_probe(cmd, cls.SCAN_TIMEOUT).decode()
+        keyframes = []
+        for line in output.splitlines():
+            pts, _, flags = line.partition(',')
+            if 'K' in flags and pts not in ('', 'N/A'):
+                keyframes.append(round(float(pts) - offset, 6))
+        return sorted(keyframes)
+
+    def keyframes(self, input_path: str) -> List[float]:
+        """Sorted keyframe timestamps (seconds). Raises CalledProcessError if ffprobe fails or times out."""
+        path = os.path.abspath(input_path)
+        stamp = self._stamp(path)
+        with self._lock:
+            cached = self._memory.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        keyframes = self._read_sidecar(path, stamp) if self.sidecar else None
+        if keyframes is None:
+            with tracing.span('keyframe scan', 'probe', file=os.path.basename(path)):
+                keyframes = self._scan(path)
+            if self.sidecar:
+                self._write_sidecar(path, stamp, keyframes)
+        with self._lock:
+            self._memory[path] = (stamp, keyframes)
+        return keyframes
+
+    def at_or_after(self, input_path: str, t: float, tolerance: float = 0.001) -> Optional[float]:
+        """First keyframe at or after t (None if there is none)."""
+        keyframes = self.keyframes(input_path)
+        i = bisect.bisect_left(keyframes, t - tolerance)
+        return keyframes[i] if i < len(keyframes) else None
+
+    def at_or_before(self, input_path: str, t: float, tolerance: float = 0.001) -> Optional[float]:
+        """Last keyframe at or before t (None if there is none)."""
+        keyframes = self.keyframes(input_path)
+        i = bisect.bisect_right(keyframes, t + tolerance)
+        return keyframes[i - 1] if i else None
+
+
+_shared_index = None
+_shared_lock = threading.Lock()
+
+
+def get_keyframe_index() -> KeyframeIndex:
+    """Process-wide KeyframeIndex shared by the splitters and the segment encoder."""
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = KeyframeIndex()
+        return _shared_index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python keyframes.py <video_file>")
+        sys.exit(1)
+
+    frames = get_keyframe_index().keyframes(sys.argv[1])
+    gaps = [b - a for a, b in zip(frames, frames[1:])]
+    print(f"🔑 {len(frames)} keyframes")
+    if gaps:
+        print(f"   GOP: avg {sum(gaps) / len(gaps):.2f}s, max {max(gaps):.2f}s")
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+try:
+    from src.utils import tracing
+    from src.utils.operations import succeeded
+    from src.utils.system import SystemUtils
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.operations import succeeded
+    from src.utils.system import SystemUtils
+
+RUNNING, DONE, SKIPPED, FAILED, INTERRUPTED = 'running', 'done', 'skipped', 'failed', 'interrupted'
+
+
+def partial_path(output_path: str) -> str:
+    """Hidden temp name next to the output, keeping the extension so FFmpeg picks the same muxer."""
+    folder, name = os.path.split(output_path)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(folder, f".{stem}.partial{ext}")
+
+
+class JobLedger:
+    """
+    Durable record of batch jobs (SQLite): inputs, parameters, input fingerprint,
+    state, timings and output path.
+
+    run() writes every output to a hidden temp file and renames it into place only
+    on success, so a crash never leaves a half-written file under the real name.
+    On restart, jobs already done for an unchanged input are skipped and jobs that
+    were running when the process died are re-run.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.environ.get('VIDFLOW_LEDGER') or os.path.join(SystemUtils.cache_dir(), 'ledger.sqlite')
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "key TEXT PRIMARY KEY, op TEXT, input_path TEXT, output_path TEXT, params TEXT, "
+            "fingerprint TEXT, state TEXT, attempts INTEGER DEFAULT 0, input_size INTEGER, "
+            "pid INTEGER, started REAL, finished REAL, elapsed REAL, error TEXT)"
+        )
+        self._db.commit()
+        self.recover()
+
+    @staticmethod
+    def job_key(op: str, input_path: str, output_path: str) -> str:
+        raw = f"{op}|{os.path.abspath(input_path)}|{os.path.abspath(output_path)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def fingerprint(input_path: str, params: dict) -> str:
+        """Input size + mtime + parameters: any change means the job must run again."""
+        st = os.stat(input_path)
+        raw = f"{st.st_size}|{st.st_mtime_ns}|{json.dumps(params or {}, sort_keys=True, default=str)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def recover(self) -> int:
+        """Marks jobs left 'running' by a dead process as interrupted and removes their temp files."""
+        with self._lock:
+            rows = [(key, output_path) for key, output_path, pid in self._db.execute(
+                "SELECT key, output_path, pid FROM jobs WHERE state = ?", (RUNNING,)
+            ).fetchall() if not self._alive(pid)]
+            for key, output_path in rows:
+                try:
+                    os.remove(partial_path(output_path))
+                except OSError:
+                    pass
+                self._db.execute("UPDATE jobs SET state = ? WHERE key = ?", (INTERRUPTED, key))
+            self._db.commit()
+        if rows:
+            print(f"♻️  Ledger: {len(rows)} interrupted job(s) will be re-run")
+        return len(rows)
+
+    @staticmethod
+    def _alive(pid) -> bool:
+        """Another live process (e.g. a watcher sharing this ledger) may still own the job."""
+        if not pid or pid == os.getpid() or os.name != 'posix':
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def is_done(self, op: str, input_path: str, output_path: str, params: dict = None) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state, fingerprint FROM jobs WHERE key = ?", (self.job_key(op, input_path, output_path),)
+            ).fetchone()
+        if not row or row[0] not in (DONE, SKIPPED):
+            return False
+        try:
+            if row[1] != self.fingerprint(input_path, params):
+                return False
+        except OSError:
+            return False
+        # A deleted output means the work has to be redone ('skipped' jobs never wrote one)
+        return row[0] == SKIPPED or os.path.exists(output_path)
+
+    def _start(self, key, op, input_path, output_path, params, fingerprint, size):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (key, op, input_path, output_path, params, fingerprint, state, attempts, "
+                "input_size, pid, started) VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET params = excluded.params, fingerprint = excluded.fingerprint, "
+                "state = excluded.state, attempts = attempts + 1, input_size = excluded.input_size, pid = excluded.pid, "
+                "started = excluded.started, finished = NULL, elapsed = NULL, error = NULL",
+                (key, op, os.path.abspath(input_path), os.path.abspath(output_path),
+                 json.dumps(params or {}, sort_keys=True, default=str), fingerprint, RUNNING, size, os.getpid(), time.time()),
+            )
+            self._db.commit()
+
+    def _finish(self, key: str, state: str, elapsed: float, error: str = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET state = ?, finished = ?, elapsed = ?, error = ? WHERE key = ?",
+                (state, time.time(), elapsed, error, key),
+            )
+            self._db.commit()
+
+    def run(self, op: str, func, input_path: str, output_path: str, params: dict = None, **options):
+        """
+        Runs func(input_path, <temp output>, **params, **options) unless the ledger
+        already has it done for this exact input and params. 'params' are part of
+        the job's identity; 'options' (threads, ...) only affect how it runs.
+        Returns func's result, or True when the job was already done.
+        """
+        with tracing.span('ledger check', 'plan', op=op):
+            if self.is_done(op, input_path, output_path, params):
+                print(f"⏭️  Already done: {os.path.basename(output_path)}")
+                return True
+
+            key = self.job_key(op, input_path, output_path)
+            temp_path = partial_path(output_path)
+            self._start(key, op, input_path, output_path, params,
+                        self.fingerprint(input_path, params), os.path.getsize(input_path))
+        start = time.perf_counter()
+        try:
+            result = func(input_path, temp_path, **(params or {}), **options)
+        except BaseException as e:
+            self._finish(key, FAILED, time.perf_counter() - start, str(e) or type(e).__name__)
+            self._discard(temp_path)
+            raise
+
+        elapsed = time.perf_counter() - start
+        if not succeeded(result):
+            self._finish(key, FAILED, elapsed, "processor reported failure")
+            self._discard(temp_path)
+        elif os.path.exists(temp_path):
+            with tracing.span('commit output', 'finalize', file=os.path.basename(output_path)):
+                os.replace(temp_path, output_path)
+                self._finish(key, DONE, elapsed)
+        else:
+            # Processor decided there was nothing to do (e.g. a no-op compress)
+            self._finish(key, SKIPPED, elapsed)
+        return result
+
+    @staticmethod
+    def _discard(temp_path: str):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+    def history(self, op: str = None) -> list:
+        """Per-operation timing stats from completed jobs, for capacity planning."""
+        query = ("SELECT op, COUNT(*), SUM(elapsed), SUM(input_size), MAX(elapsed) FROM jobs "
+                 "WHERE state = ? AND elapsed > 0")
+        args = [DONE]
+        if op:
+            query += " AND op = ?"
+            args.append(op)
+        with self._lock:
+            rows = self._db.execute(query + " GROUP BY op", args).fetchall()
+        return [{
+            'op': name, 'jobs': count, 'avg_seconds': total / count, 'max_seconds': longest,
+            'mb_per_second': (size or 0) / total / 1e6 if total else 0.0,
+        } for name, count, total, size, longest in rows]
+
+    def summary(self) -> dict:
+        with self._lock:
+            return dict(self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+
+if __name__ == "__main__":
+    ledger = JobLedger(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"📒 Ledger: {ledger.db_path}")
+    print(f"   Jobs by state: {ledger.summary()}")
+    for row in ledger.history():
+        print(f"   {row['op']:<40} {row['jobs']:>5} jobs  avg {row['avg_seconds']:.1f}s  "
+              f"max {row['max_seconds']:.1f}s  {row['mb_per_second']:.1f} MB/s")
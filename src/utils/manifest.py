@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    from src.utils import operations
+    from src.utils.batch import BatchRunner
+    from src.utils.scheduler import ResourceGate
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import operations
+    from src.utils.batch import BatchRunner
+    from src.utils.scheduler import ResourceGate
+
+PENDING, DONE, FAILED, SKIPPED = 'pending', 'done', 'failed', 'skipped'
+
+
+class ManifestError(ValueError):
+    """The manifest is malformed: unknown operation, bad arguments, missing or cyclic dependencies."""
+
+
+class ManifestJob:
+    def __init__(self, job_id: str, op: str, args: dict, after: list):
+        self.id = job_id
+        self.op = op
+        self.args = args
+        self.after = after
+        self.dependents = []
+        self.waiting = len(after)
+        self.state = PENDING
+        self.error = None
+        self.elapsed = None
+
+
+def load_manifest(path: str) -> dict:
+    """
+    Reads a manifest: {"workers": 8, "jobs": [{"id": ..., "op": ..., "args": {...}, "after": [ids]}]}
+    (a bare list of jobs is accepted too). 'id' defaults to the job's position.
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {'jobs': data} if isinstance(data, list) else data
+
+
+class ManifestRunner:
+    """
+    Runs every job of a manifest in this one process through one shared worker pool.
+
+    All jobs are validated up front (operation exists, arguments bind, dependencies
+    exist and have no cycles), so a typo in job 2,999 fails before job 1 starts. A job
+    is queued as soon as everything in its 'after' list is done; if one fails, the jobs
+    depending on it are skipped and everything else carries on.
+    """
+
+    def __init__(self, workers: int = 0, gate: ResourceGate = None):
+        self.workers = workers
+        self.gate = gate
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._finished = threading.Event()
+
+    def load(self, entries: list):
+        jobs = {}
+        for position, entry in enumerate(entries):
+            job_id = str(entry.get('id', position))
+            if job_id in jobs:
+                raise ManifestError(f"duplicate job id: {job_id}")
+            op = entry.get('op')
+            if op not in operations.OPERATIONS:
+                raise ManifestError(f"job {job_id}: unknown operation '{op}'")
+            args = entry.get('args', {})
+            try:
+                operations.check_args(op, args)
+            except TypeError as e:
+                raise ManifestError(f"job {job_id}: {e}")
+            after = entry.get('after', [])
+            jobs[job_id] = ManifestJob(job_id, op, args, [str(a) for a in ([after] if isinstance(after, str) else after)])
+
+        for job in jobs.values():
+            for dependency in job.after:
+                if dependency not in jobs:
+                    raise ManifestError(f"job {job.id}: depends on unknown job '{dependency}'")
+                jobs[dependency].dependents.append(job)
+        self._check_cycles(jobs)
+        self.jobs = jobs
+        return self
+
+    @staticmethod
+    def _check_cycles(jobs: dict):
+        # Kahn's algorithm: whatever can't be ordered sits on a cycle
+        waiting = {job_id: len(job.after) for job_id, job in jobs.items()}
+        ready = [job_id for job_id, count in waiting.items() if count == 0]
+        ordered = 0
+        while ready:
+            job = jobs[ready.pop()]
+            ordered += 1
+            for dependent in job.dependents:
+                waiting[dependent.id] -= 1
+                if waiting[dependent.id] == 0:
+                    ready.append(dependent.id)
+        if ordered != len(jobs):
+            stuck = sorted(job_id for job_id, count in waiting.items() if count > 0)
+            raise ManifestError(f"dependency cycle among: {', '.join(stuck[:10])}")
+
+    def _submit(self, runner: BatchRunner, job: ManifestJob):
+        future = runner.submit(f"{job.id} ({job.op})", operations.resolve(job.op), **job.args)
+        future.add_done_callback(lambda f: self._complete(runner, job, f.result()))
+
+    def _complete(self, runner: BatchRunner, job: ManifestJob, result):
+        ready = []
+        with self._lock:
+            job.state = DONE if result.ok else FAILED
+            job.error = result.error
+            job.elapsed = result.elapsed
+            resolved = 1
+            if result.ok:
+                for dependent in job.dependents:
+                    dependent.waiting -= 1
+                    if dependent.waiting == 0 and dependent.state == PENDING:
+                        ready.append(dependent)
+            else:
+                resolved += self._skip_dependents(job)
+            self._remaining -= resolved
+            if self._remaining == 0:
+                self._finished.set()
+        for dependent in ready:
+            self._submit(runner, dependent)
+
+    def _skip_dependents(self, job: ManifestJob) -> int:
+        skipped = 0
+        stack = list(job.dependents)
+        while stack:
+            dependent = stack.pop()
+            if dependent.state == PENDING:
+                dependent.state = SKIPPED
+                dependent.error = f"dependency '{job.id}' failed"
+                skipped += 1
+                stack.extend(dependent.dependents)
+        return skipped
+
+    def run(self) -> dict:
+        """Runs all jobs; returns counts per final state."""
+        if not self.jobs:
+            return {}
+        self._remaining = len(self.jobs)
+        self._finished.clear()
+        if self.gate:
+            self.gate.install()
+        runner = BatchRunner(self.workers)
+        started = time.monotonic()
+        try:
+            for job in [j for j in self.jobs.values() if not j.after]:
+                self._submit(runner, job)
+            self._finished.wait()
+        finally:
+            runner.wait()
+            if self.gate:
+                self.gate.uninstall()
+
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.state] = counts.get(job.state, 0) + 1
+        print(f"\n📋 Manifest finished in {time.monotonic() - started:.1f}s: "
+              + ", ".join(f"{count} {state}" for state, count in sorted(counts.items())))
+        for job in self.jobs.values():
+            if job.state in (FAILED, SKIPPED):
+                print(f"   {'❌' if job.state == FAILED else '⏭️ '} {job.id}: {job.error or 'processor reported failure'}")
+        return counts
+
+    def report(self) -> list:
+        return [{'id': j.id, 'op': j.op, 'state': j.state, 'elapsed': j.elapsed, 'error': j.error}
+                for j in self.jobs.values()]
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="main.py run", description="Run a VidFlow job manifest")
+    parser.add_argument("manifest")
+    parser.add_argument("--workers", type=int, default=None, help="parallel jobs (default: manifest or CPU count)")
+    parser.add_argument("--core-budget", type=int, default=0, help="cores shared by encodes (default: all)")
+    parser.add_argument("--io-per-device", type=int, default=2, help="concurrent stream copies per disk")
+    parser.add_argument("--check", action="store_true", help="validate the manifest without running it")
+    parser.add_argument("--report", help="write per-job results to this JSON file")
+    options = parser.parse_args(argv)
+
+    data = load_manifest(options.manifest)
+    workers = options.workers if options.workers is not None else data.get('workers', 0)
+    runner = ManifestRunner(workers, ResourceGate(options.core_budget, options.io_per_device))
+    try:
+        runner.load(data.get('jobs', []))
+    except ManifestError as e:
+        print(f"❌ Invalid manifest: {e}")
+        return 2
+    if options.check:
+        print(f"✅ Manifest OK: {len(runner.jobs)} jobs")
+        return 0
+
+    counts = runner.run()
+    if options.report:
+        with open(options.report, 'w', encoding='utf-8') as f:
+            json.dump(runner.report(), f, indent=2)
+    return 0 if counts.get(FAILED, 0) == 0 and counts.get(SKIPPED, 0) == 0 else 1
+
+
+# --- STANDALONE EXECUTION LOGIC ---
+if __name__ == "__main__":
+    sys.exit(main())
+
+# ==========================================
+# HOW TO USE THIS CODE (EXAMPLE)
+# ==========================================
+#
+# nightly.json:
+# {
+#   "workers": 8,
+#   "jobs": [
+#     {"id": "ep1-clean", "op": "keep_tracks",
+#      "args": {"input_path": "ep1.mkv", "output_path": "ep1_clean.mkv", "track_indices": [0]}},
+#     {"id": "ep1-brand", "op": "watermark", "after": ["ep1-clean"],
+#      "args": {"video_path": "ep1_clean.mkv", "image_path": "logo.png", "output_path": "ep1_final.mkv"}},
+#     {"id": "ep1-gif", "op": "gif", "after": "ep1-clean",
+#      "args": {"input_path": "ep1_clean.mkv", "output_path": "ep1.gif", "start_time": 60}}
+#   ]
+# }
+#
+# python main.py run nightly.json --report results.json
+# python main.py run nightly.json --check      (validate only)
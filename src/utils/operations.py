@@ -0,0 +1,78 @@
+import importlib
+import inspect
+import threading
+
+# Operation name -> (module, class, method). Modules are imported on first use,
+# so listing or dispatching one operation never pays for importing all of them.
+OPERATIONS = {
+    'convert': ('src.processors.formats', 'FormatMapper', 'convert_video'),
+    'keep_tracks': ('src.processors.tracks', 'TrackProcessor', 'keep_multiple_tracks'),
+    'mux_subtitles': ('src.processors.merger', 'StreamMerger', 'mux_subtitles'),
+    'merge_audio': ('src.processors.merger', 'StreamMerger', 'merge_video_audio'),
+    'compress': ('src.processors.compressor', 'VideoCompressor', 'compress_audio_maintain_video'),
+    'shorts': ('src.processors.editor', 'VideoEditor', 'convert_to_shorts_style'),
+    'split': ('src.processors.division', 'VideoDivider', 'split_by_chunks'),
+    'split_points': ('src.processors.division', 'VideoDivider', 'split_at_points'),
+    'divide': ('src.processors.division', 'VideoDivider', 'split_at_intermission'),
+    'stitch': ('src.processors.stitcher', 'VideoStitcher', 'stitch'),
+    'watermark': ('src.processors.watermark', 'Watermarker', 'add_image_watermark'),
+    'gif': ('src.processors.gif_maker', 'GifMaker', 'create_high_quality_gif'),
+    'remaster': ('src.processors.remaster', 'VideoRemaster', 'enhance_old_footage'),
+    'extract_audio': ('src.processors.extractor', 'AudioExtractor', 'extract_audio'),
+    'cut': ('src.utils.smartcut', 'SmartCutter', 'cut'),
+    'brand': ('src.processors.watermark', 'Watermarker', 'brand_batch'),
+    # Building blocks of a segmented encode spread over farm nodes (see farm.py)
+    'encode_segment': ('src.utils.segments', 'SegmentEncoder', 'encode_segment'),
+    'join_segments': ('src.utils.segments', 'SegmentEncoder', 'join'),
+}
+
+_instances = {}
+_lock = threading.Lock()
+
+
+def resolve(name: str):
+    """Returns the bound processor method for an operation (one processor instance per class)."""
+    if name not in OPERATIONS:
+        raise KeyError(f"Unknown operation: {name}")
+    module_name, class_name, method_name = OPERATIONS[name]
+    with _lock:
+        instance = _instances.get((module_name, class_name))
+        if instance is None:
+            module = importlib.import_module(module_name)
+            instance = getattr(module, class_name)()
+            _instances[(module_name, class_name)] = instance
+    return getattr(instance, method_name)
+
+
+def describe(name: str) -> dict:
+    """Parameter names/defaults of an operation, for listings and argument checks."""
+    required, optional = [], {}
+    for param in inspect.signature(resolve(name)).parameters.values():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        if param.default is param.empty:
+            required.append(param.name)
+        else:
+            optional[param.name] = param.default
+    return {'name': name, 'processor': OPERATIONS[name][1], 'method': OPERATIONS[name][2],
+            'required': required, 'optional': optional}
+
+
+def succeeded(result) -> bool:
+    """
+    Whether a processor result means success. Processors report failure as False,
+    a tuple starting with False ((False, []), (False, None, None)), None, or a dict
+    whose 'status' is 'error'/'failed' or whose 'failed' count is non-zero.
+    """
+    if isinstance(result, dict):
+        return result.get('status') not in ('error', 'failed') and not result.get('failed', 0)
+    if isinstance(result, tuple):
+        return bool(result) and result[0] is not False
+    if isinstance(result, list):
+        return True
+    return result is not False and result is not None
+
+
+def check_args(name: str, args: dict):
+    """Raises TypeError if 'args' can't be passed to the operation as keyword arguments."""
+    inspect.signature(resolve(name)).bind(**args)
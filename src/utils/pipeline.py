@@ -0,0 +1,198 @@
+import os
+import re
+import subprocess
+import sys
+
+try:
+    from src.utils.ffmpeg import console_progress, run_ffmpeg
+    from src.utils.planning import subtitle_args
+    from src.utils.probe import get_probe
+    from src.utils.segments import SegmentEncoder
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.ffmpeg import console_progress, run_ffmpeg
+    from src.utils.planning import subtitle_args
+    from src.utils.probe import get_probe
+    from src.utils.segments import SegmentEncoder
+
+_LABEL = re.compile(r'\[([A-Za-z_]\w*)\]')
+
+
+class PipelineStage:
+    """
+    One step of a fused pipeline, contributed by a processor.
+
+    filter_graph: filtergraph fragment using '{in}' / '{out}' for the main picture
+    and '{extra0}', '{extra1}', ... for this stage's extra inputs. Internal pad
+    labels such as [bg] are renamed per stage, so fragments never collide.
+    None means the stage doesn't touch the picture (stream copy friendly).
+    maps: stream-mapping decision for non-video streams (e.g. ['0:a:0', '0:a:2']).
+    Selections are merged per stream type across stages; '0:a?' style entries
+    only keep a whole type and never override another stage's explicit choice.
+    """
+
+    def __init__(self, name: str, filter_graph: str = None, extra_inputs: list = None,
+                 encoder_args: list = None, maps: list = None):
+        self.name = name
+        self.filter_graph = filter_graph
+        self.extra_inputs = extra_inputs or []
+        self.encoder_args = encoder_args
+        self.maps = maps
+
+    @classmethod
+    def from_chain(cls, name: str, chain: str, **kwargs) -> 'PipelineStage':
+        """Wraps a simple '-vf' style chain (one input, one output)."""
+        return cls(name, "{in}" + chain + "{out}", **kwargs)
+
+    @property
+    def needs_encode(self) -> bool:
+        return self.filter_graph is not None
+
+
+class Pipeline:
+    """
+    Chains processor stages into ONE FFmpeg run: every filter fragment is fused
+    into a single -filter_complex, so remaster -> watermark -> shorts costs one
+    decode and one encode instead of three, with no intermediate files.
+    If no stage needs the picture, the whole pipeline is a pure stream copy.
+    """
+    DEFAULT_ENCODER = ['-c:v', 'libx264', '-preset', 'medium', '-crf', '20']
+
+    def __init__(self, input_path: str, encoder_args: list = None):
+        self.input_path = input_path
+        self.encoder_args = encoder_args
+        self.stages = []
+
+    def add(self, stage: PipelineStage) -> 'Pipeline':
+        self.stages.append(stage)
+        return self
+
+    @property
+    def needs_encode(self) -> bool:
+        return any(s.needs_encode for s in self.stages)
+
+    def build_filter_graph(self, final_label: str = '[vout]'):
+        """Returns (filter_complex, extra_inputs). final_label='' leaves the output unlabelled."""
+        filter_stages = [s for s in self.stages if s.needs_encode]
+        extra_inputs = []
+        parts = []
+        current = '[0:v]'
+        for n, stage in enumerate(filter_stages):
+            labels = {}
+            for k, extra in enumerate(stage.extra_inputs):
+                extra_inputs.append(extra)
+                labels[f'extra{k}'] = f'[{len(extra_inputs)}:v]'
+            out = final_label if n == len(filter_stages) - 1 else f'[p{n}]'
+            fragment = _LABEL.sub(lambda m: f'[s{n}_{m.group(1)}]', stage.filter_graph)
+            parts.append(fragment.format_map({'in': current, 'out': out, **labels}))
+            current = out
+        return ';'.join(parts), extra_inputs
+
+    def _encoder_args(self) -> list:
+        if self.encoder_args:
+            return self.encoder_args
+        for stage in reversed(self.stages):
+            if stage.encoder_args:
+                return stage.encoder_args
+        return self.DEFAULT_ENCODER
+
+    def _maps(self) -> list:
+        """Non-video -map specs: per stream type, the last stage that picked specific tracks wins."""
+        order, chosen = [], {}
+        for stage in self.stages:
+            for spec in stage.maps or []:
+                parts = spec.rstrip('?').split(':')
+                kind = parts[1] if len(parts) > 1 else spec
+                if kind not in order:
+                    order.append(kind)
+            picked = {}
+            for spec in stage.maps or []:
+                parts = spec.rstrip('?').split(':')
+                if len(parts) > 2:  # '0:a:1' is a specific track, '0:a?' the whole type
+                    picked.setdefault(parts[1], []).append(spec)
+            chosen.update(picked)
+        if not order:
+            return ['0:a?']
+        return [spec for kind in order for spec in chosen.get(kind, [f'0:{kind}?'])]
+
+    def build_command(self, output_path: str) -> list:
+        maps = [arg for m in self._maps() for arg in ('-map', m)]
+        subtitles = subtitle_args(output_path)
+        if not self.needs_encode:
+            return ['ffmpeg', '-i', self.input_path, '-map', '0:v?', *maps, '-c', 'copy', *subtitles,
+                    '-y', output_path]
+
+        graph, extra_inputs = self.build_filter_graph()
+        command = ['ffmpeg', '-i', self.input_path]
+        for extra in extra_inputs:
+            command.extend(['-i', extra])
+        command.extend([
+            '-filter_complex', graph,
+            '-map', '[vout]', *maps,
+            *self._encoder_args(), '-c:a', 'copy', *subtitles,
+            '-y', output_path
+        ])
+        return command
+
+    def run(self, output_path: str, segments: int = 0) -> bool:
+        names = " -> ".join(s.name for s in self.stages) or "copy"
+        mode = "1 encode" if self.needs_encode else "stream copy"
+        print(f"🔀 Pipeline: {names} ({mode})")
+
+        if segments > 1 and self.needs_encode:
+            graph, extra_inputs = self.build_filter_graph(final_label='')
+            return SegmentEncoder(segments).encode(self.input_path, output_path, graph,
+                                                   self._encoder_args(), extra_inputs=extra_inputs)
+        try:
+            info = get_probe().probe(self.input_path)
+            run_ffmpeg(self.build_command(output_path), on_progress=console_progress,
+                       duration=info.duration if info else None)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
+
+
+# --- STANDALONE EXECUTION LOGIC ---
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Usage: python pipeline.py <input> <output> <stage> [stage ...]")
+        print("Stages: remaster | shorts | watermark:<logo>:<position>")
+        sys.exit(1)
+
+    from src.processors.editor import VideoEditor
+    from src.processors.remaster import VideoRemaster
+    from src.processors.watermark import Watermarker
+
+    pipeline = Pipeline(sys.argv[1])
+    for spec in sys.argv[3:]:
+        name, *args = spec.split(':')
+        if name == "remaster":
+            pipeline.add(VideoRemaster().remaster_stage())
+        elif name == "shorts":
+            pipeline.add(VideoEditor().shorts_stage())
+        elif name == "watermark":
+            # Logo paths may contain ':' (C:\Logo.png), so the position is taken from the right
+            logo, position = ':'.join(args), "br"
+            if args[-1] in Watermarker.POSITIONS:
+                logo, position = ':'.join(args[:-1]), args[-1]
+            pipeline.add(Watermarker().watermark_stage(logo, position))
+        else:
+            print(f"❌ Unknown stage: {name}")
+            sys.exit(1)
+
+    if pipeline.run(sys.argv[2]):
+        print(f"✅ Created: {sys.argv[2]}")
+    else:
+        print("❌ Failed.")
+
+# ==========================================
+# HOW TO USE THIS CODE (EXAMPLE)
+# ==========================================
+#
+# Syntax: python src/utils/pipeline.py <Input> <Output> <Stage1> <Stage2> ...
+#
+# Example Command:
+# python src/utils/pipeline.py "Old.avi" "Old_short.mp4" remaster watermark:Logo.png:br shorts
+#
+# (Remasters, brands and reframes the video in ONE decode/encode pass)
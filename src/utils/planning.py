@@ -0,0 +1,184 @@
+import os
+import sys
+
+try:
+    from src.utils import tracing
+    from src.utils.probe import MediaInfo, StreamInfo
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.probe import MediaInfo, StreamInfo
+
+COPY, TRANSCODE, DROP = 'copy', 'transcode', 'drop'
+
+IMAGE_SUBS = {'hdmv_pgs_subtitle', 'dvd_subtitle', 'dvb_subtitle', 'dvb_teletext', 'xsub'}
+
+# What each container family can hold without re-encoding (None = anything)
+CONTAINERS = {
+    'matroska': {'video': None, 'audio': None, 'subtitle': None},
+    # WebM is a Matroska subset that only allows the royalty-free codecs
+    'webm': {
+        'video': {'vp8', 'vp9', 'av1'},
+        'audio': {'opus', 'vorbis'},
+        'subtitle': {'webvtt'},
+    },
+    'mov': {
+        'video': {'h264', 'hevc', 'mpeg4', 'av1', 'vp9', 'mpeg2video', 'mpeg1video', 'mjpeg', 'prores', 'png'},
+        'audio': {'aac', 'mp3', 'ac3', 'eac3', 'alac', 'opus', 'flac', 'mp2'},
+        'subtitle': {'mov_text'},
+    },
+    'avi': {
+        'video': {'h264', 'mpeg4', 'msmpeg4v3', 'mjpeg', 'mpeg2video', 'mpeg1video', 'hevc'},
+        'audio': {'mp3', 'ac3', 'mp2', 'aac', 'pcm_s16le'},
+        'subtitle': set(),
+    },
+}
+
+# Fallback encoders when a stream has to be converted for the target container
+TRANSCODE_TO = {
+    'matroska': {'subtitle': ['srt']},
+    'webm': {'video': ['libvpx-vp9', '-crf', '32', '-b:v', '0'], 'audio': ['libopus', '-b:a', '128k'],
+             'subtitle': ['webvtt']},
+    'mov': {'video': ['libx264', '-crf', '20'], 'audio': ['aac', '-b:a', '192k'], 'subtitle': ['mov_text']},
+    'avi': {'video': ['libx264', '-crf', '20'], 'audio': ['libmp3lame', '-b:a', '192k']},
+}
+
+EXTENSION_FAMILY = {
+    'mkv': 'matroska', 'mka': 'matroska', 'webm': 'webm',
+    'mp4': 'mov', 'm4v': 'mov', 'mov': 'mov', 'm4a': 'mov',
+    'avi': 'avi',
+}
+
+
+def extension(path: str) -> str:
+    return os.path.splitext(path)[1].lstrip('.').lower()
+
+
+def container_family(path: str) -> str:
+    ext = extension(path)
+    return EXTENSION_FAMILY.get(ext, ext)
+
+
+def subtitle_args(output_path: str) -> list:
+    """Copy subtitles where the container takes anything, else convert to its text format."""
+    family = container_family(output_path)
+    if CONTAINERS.get(family, {}).get('subtitle') is None:
+        return ['-c:s', 'copy']
+    codec = TRANSCODE_TO.get(family, {}).get('subtitle')
+    return ['-c:s', *codec] if codec else ['-sn']
+
+
+def source_family(info: MediaInfo) -> str:
+    names = (info.format_name or '').split(',')
+    if 'matroska' in names or 'webm' in names:
+        return 'matroska'
+    if 'mov' in names or 'mp4' in names:
+        return 'mov'
+    return names[0] if names else ''
+
+
+def parse_bitrate(value) -> int:
+    """'384k' -> 384000"""
+    value = str(value).strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * scale)
+
+
+class StreamDecision:
+    def __init__(self, stream: StreamInfo, action: str, codec_args: list = None, reason: str = ""):
+        self.stream = stream
+        self.action = action
+        self.codec_args = codec_args or []   # e.g. ['aac', '-b:a', '128k'] for TRANSCODE
+        self.reason = reason
+
+
+class StreamPlan:
+    """Per-stream copy / transcode / drop decisions for one input -> output job."""
+
+    def __init__(self, info: MediaInfo, output_path: str, decisions: list):
+        self.info = info
+        self.output_path = output_path
+        self.decisions = decisions
+
+    @property
+    def is_noop(self) -> bool:
+        """
+        True when the output would be equivalent to the input: all copies into the same
+        format. Compared by extension, not family: mkv -> webm or mp4 -> mov still remux.
+        """
+        return (all(d.action == COPY for d in self.decisions)
+                and extension(self.info.path) == extension(self.output_path))
+
+    @property
+    def needs_encode(self) -> bool:
+        return any(d.action == TRANSCODE for d in self.decisions)
+
+    def ffmpeg_args(self) -> list:
+        """-map / -c arguments that implement the plan (output stream order = input order)."""
+        args = []
+        kept = [d for d in self.decisions if d.action != DROP]
+        for d in kept:
+            args.extend(['-map', f'0:{d.stream.index}'])
+        for out_index, d in enumerate(kept):
+            if d.action == COPY:
+                args.extend([f'-c:{out_index}', 'copy'])
+            else:
+                codec, *options = d.codec_args
+                args.extend([f'-c:{out_index}', codec])
+                # Per-stream options like -b:a apply to this output stream only
+                for i in range(0, len(options), 2):
+                    args.extend([f"{options[i].split(':')[0]}:{out_index}", options[i + 1]])
+        return args
+
+    def describe(self) -> str:
+        lines = []
+        for d in self.decisions:
+            s = d.stream
+            label = f"#{s.index} {s.codec_type}:{s.codec_name or '?'}"
+            if s.language:
+                label += f" ({s.language})"
+            reason = f" - {d.reason}" if d.reason else ""
+            lines.append(f"   {d.action.upper():<9} {label}{reason}")
+        return "\n".join(lines)
+
+
+@tracing.traced('stream plan', 'plan')
+def plan_streams(info: MediaInfo, output_path: str, audio_rule=None) -> StreamPlan:
+    """
+    Decides per stream between copy, transcode and drop for the output container.
+    audio_rule: optional callable(StreamInfo) -> StreamDecision that overrides the
+    default "copy if the container allows it" choice for audio streams.
+    """
+    family = container_family(output_path)
+    allowed = CONTAINERS.get(family, {})
+    fallback = TRANSCODE_TO.get(family, {})
+    decisions = []
+
+    for stream in info.streams:
+        kind = stream.codec_type
+        if kind == 'audio' and audio_rule:
+            decision = audio_rule(stream)
+            supported = allowed.get('audio')
+            if decision.action == COPY and supported is not None and stream.codec_name not in supported:
+                decision = StreamDecision(stream, TRANSCODE, fallback.get('audio'), f"not allowed in {family}")
+            decisions.append(decision)
+            continue
+
+        if kind not in ('video', 'audio', 'subtitle'):
+            if family == 'matroska' and kind == 'attachment':
+                decisions.append(StreamDecision(stream, COPY))
+            else:
+                decisions.append(StreamDecision(stream, DROP, reason=f"{kind} stream"))
+            continue
+
+        supported = allowed.get(kind)
+        if supported is None or stream.codec_name in supported:
+            decisions.append(StreamDecision(stream, COPY))
+        elif kind == 'subtitle' and stream.codec_name in IMAGE_SUBS:
+            decisions.append(StreamDecision(stream, DROP, reason=f"image subtitles can't go in {family}"))
+        elif fallback.get(kind):
+            decisions.append(StreamDecision(stream, TRANSCODE, fallback[kind], f"not allowed in {family}"))
+        else:
+            decisions.append(StreamDecision(stream, DROP, reason=f"not supported by {family}"))
+
+    return StreamPlan(info, output_path, decisions)
@@ -0,0 +1,263 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+try:
+    from src.utils import tracing
+    from src.utils.ffmpeg import run_probe
+    from src.utils.system import SystemUtils
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.ffmpeg import run_probe
+    from src.utils.system import SystemUtils
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _stream_bit_rate(raw: dict, tags: dict) -> Optional[int]:
+    """
+    Stream bitrate from ffprobe, else from mkvmerge's statistics tags (BPS, or
+    NUMBER_OF_BYTES over DURATION); MKV audio rarely has a bit_rate of its own.
+    """
+    rate = _to_int(raw.get('bit_rate') or tags.get('BPS') or tags.get('BPS-eng'))
+    if rate:
+        return rate
+    size = _to_int(tags.get('NUMBER_OF_BYTES') or tags.get('NUMBER_OF_BYTES-eng'))
+    duration = _parse_duration(tags.get('DURATION') or tags.get('DURATION-eng'))
+    if size and duration:
+        return int(size * 8 / duration)
+    return None
+
+
+def _parse_duration(value) -> Optional[float]:
+    """'01:23:45.678000000' -> seconds"""
+    try:
+        hours, minutes, seconds = str(value).split(':')
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_rate(rate) -> Optional[float]:
+    """'30000/1001' -> 29.97"""
+    if not rate or rate == '0/0':
+        return None
+    num, _, den = str(rate).partition('/')
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+@dataclass
+class StreamInfo:
+    index: int                 # Absolute stream index (0:N)
+    type_index: int            # Index among streams of the same type (0:a:N)
+    codec_type: str
+    codec_name: Optional[str] = None
+    language: Optional[str] = None
+    title: Optional[str] = None
+    bit_rate: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    pix_fmt: Optional[str] = None
+    fps: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    disposition: List[str] = field(default_factory=list)
+
+    def as_track(self) -> dict:
+        """Same shape as the old ffprobe '-show_entries stream=index:stream_tags' output."""
+        tags = {}
+        if self.language:
+            tags['language'] = self.language
+        if self.title:
+            tags['title'] = self.title
+        return {'index': self.index, 'tags': tags}
+
+
+@dataclass
+class MediaInfo:
+    path: str
+    size: int
+    format_name: Optional[str] = None
+    duration: Optional[float] = None
+    bit_rate: Optional[int] = None
+    streams: List[StreamInfo] = field(default_factory=list)
+
+    def streams_of(self, stream_type: str) -> List[StreamInfo]:
+        """stream_type uses FFmpeg specifiers: 'v', 'a', 's'."""
+        kind = {'v': 'video', 'a': 'audio', 's': 'subtitle'}.get(stream_type, stream_type)
+        return [s for s in self.streams if s.codec_type == kind]
+
+    @property
+    def video(self) -> Optional[StreamInfo]:
+        videos = [s for s in self.streams_of('v') if 'attached_pic' not in s.disposition]
+        return videos[0] if videos else None
+
+    @property
+    def audio(self) -> List[StreamInfo]:
+        return self.streams_of('a')
+
+    @property
+    def subtitles(self) -> List[StreamInfo]:
+        return self.streams_of('s')
+
+    @classmethod
+    def from_ffprobe(cls, path: str, size: int, data: dict) -> 'MediaInfo':
+        fmt = data.get('format', {})
+        streams = []
+        counters = {}
+        for raw in data.get('streams', []):
+            kind = raw.get('codec_type', 'data')
+            tags = raw.get('tags', {})
+            streams.append(StreamInfo(
+                index=raw.get('index', len(streams)),
+                type_index=counters.get(kind, 0),
+                codec_type=kind,
+                codec_name=raw.get('codec_name'),
+                language=tags.get('language'),
+                title=tags.get('title'),
+                bit_rate=_stream_bit_rate(raw, tags),
+                width=_to_int(raw.get('width')),
+                height=_to_int(raw.get('height')),
+                pix_fmt=raw.get('pix_fmt'),
+                fps=_parse_rate(raw.get('avg_frame_rate')) or _parse_rate(raw.get('r_frame_rate')),
+                sample_rate=_to_int(raw.get('sample_rate')),
+                channels=_to_int(raw.get('channels')),
+                disposition=[k for k, v in raw.get('disposition', {}).items() if v],
+            ))
+            counters[kind] = counters.get(kind, 0) + 1
+
+        return cls(
+            path=path,
+            size=size,
+            format_name=fmt.get('format_name'),
+            duration=_to_float(fmt.get('duration')),
+            bit_rate=_to_int(fmt.get('bit_rate')),
+            streams=streams,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MediaInfo':
+        data = dict(data)
+        data['streams'] = [StreamInfo(**s) for s in data.get('streams', [])]
+        return cls(**data)
+
+
+class MediaProbe:
+    """
+    One full 'ffprobe -show_format -show_streams' per file, cached in memory and
+    in a SQLite store keyed by path + size + mtime. A re-scan of an unchanged
+    library costs one stat() per file instead of one subprocess per question.
+    """
+    TIMEOUT = 60.0  # Seconds before a hanging ffprobe is killed
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.path.join(SystemUtils.cache_dir(), 'probe.sqlite')
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS probes ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, info TEXT)"
+        )
+        self._db.commit()
+
+    def probe(self, input_path: str) -> Optional[MediaInfo]:
+        """Returns cached MediaInfo for the file, probing only when it changed."""
+        path = os.path.abspath(input_path)
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            print(f"Error reading media info: {e}")
+            return None
+        stamp = (st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            cached = self._memory.get(path)
+            if cached and cached[0] == stamp:
+                return cached[1]
+            row = self._db.execute(
+                "SELECT size, mtime_ns, info FROM probes WHERE path = ?", (path,)
+            ).fetchone()
+        if row and (row[0], row[1]) == stamp:
+            info = MediaInfo.from_dict(json.loads(row[2]))
+        else:
+            with tracing.span('ffprobe', 'probe', file=os.path.basename(path)):
+                info = self._run_ffprobe(path, st.st_size)
+            if info is None:
+                return None
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO probes (path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                    (path, stamp[0], stamp[1], json.dumps(asdict(info), separators=(',', ':'))),
+                )
+                self._db.commit()
+
+        with self._lock:
+            self._memory[path] = (stamp, info)
+        return info
+
+    def invalidate(self, input_path: str):
+        path = os.path.abspath(input_path)
+        with self._lock:
+            self._memory.pop(path, None)
+            self._db.execute("DELETE FROM probes WHERE path = ?", (path,))
+            self._db.commit()
+
+    def _run_ffprobe(self, path: str, size: int) -> Optional[MediaInfo]:
+        # Header probe only: anything slower is a hung mount or a broken file
+        cmd = [
+            'ffprobe', '-v', 'error',
+            '-show_format', '-show_streams',
+            '-of', 'json',
+            path
+        ]
+        try:
+            output = run_probe(cmd, self.TIMEOUT)
+            return MediaInfo.from_ffprobe(path, size, json.loads(output))
+        except Exception as e:
+            print(f"Error reading media info: {e}")
+            return None
+
+
+_shared_probe = None
+_shared_lock = threading.Lock()
+
+
+def get_probe() -> MediaProbe:
+    """Process-wide MediaProbe shared by every processor."""
+    global _shared_probe
+    with _shared_lock:
+        if _shared_probe is None:
+            _shared_probe = MediaProbe()
+        return _shared_probe
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python probe.py <video_file> [video_file ...]")
+        sys.exit(1)
+
+    for path in sys.argv[1:]:
+        info = get_probe().probe(path)
+        if info:
+            print(json.dumps(asdict(info), indent=2))
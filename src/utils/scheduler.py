@@ -0,0 +1,316 @@
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    from src.utils.batch import BatchRunner
+    from src.utils.ffmpeg import run_ffmpeg, set_resource_gate
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils.batch import BatchRunner
+    from src.utils.ffmpeg import run_ffmpeg, set_resource_gate
+
+# Resource classes
+COPY = 'copy'      # Stream copy / remux: bound by the disks
+AUDIO = 'audio'    # Audio-only encode: about one core
+ENCODE = 'encode'  # Video encode or video filtering: bound by the CPUs
+
+_FILTER_FLAGS = ('-vf', '-filter:v', '-filter_complex', '-lavfi')
+_AUDIO_FILTER_FLAGS = ('-af', '-filter:a')
+# Encoders named through an output index ('-c:1 aac', as planning emits) are typed by name
+_AUDIO_ENCODERS = {'aac', 'libfdk_aac', 'libmp3lame', 'libopus', 'opus', 'libvorbis', 'vorbis', 'flac', 'alac',
+                   'ac3', 'eac3', 'mp2', 'pcm_s16le', 'pcm_s24le', 'pcm_f32le'}
+_SUBTITLE_ENCODERS = {'mov_text', 'srt', 'subrip', 'webvtt', 'ass', 'ssa', 'dvdsub', 'dvbsub'}
+
+
+def _stream_type(flag: str):
+    """'-c:v' -> 'v', '-c' -> '*', '-c:1' -> '#', '-vcodec' -> 'v', anything that isn't a codec flag -> None."""
+    if flag == '-vcodec':
+        return 'v'
+    if flag == '-acodec':
+        return 'a'
+    name, _, spec = flag.partition(':')
+    if name not in ('-c', '-codec'):
+        return None
+    if spec[:1].isdigit():
+        return '#'
+    return spec[:1] or '*'
+
+
+def _encoder_type(codec: str):
+    """'aac' -> 'a', 'mov_text' -> 's', any other encoder -> 'v'."""
+    if codec in _AUDIO_ENCODERS or codec.startswith('pcm_'):
+        return 'a'
+    return 's' if codec in _SUBTITLE_ENCODERS else 'v'
+
+
+def classify(command: list) -> str:
+    """
+    Resource class of an ffmpeg command, from its arguments alone:
+    COPY when every codec is 'copy', AUDIO when only audio is encoded, ENCODE otherwise
+    (including commands that name no codec, since ffmpeg then transcodes by default).
+    """
+    video = audio = None
+    video_filter = audio_filter = False
+    for flag, value in zip(command, command[1:]):
+        stream = _stream_type(flag)
+        if stream == '#':
+            # The stream's type isn't in the flag: a copy fills in for either, an encoder counts by its name
+            if value == 'copy':
+                video = video or value
+                audio = audio or value
+                continue
+            stream = _encoder_type(value)
+        if stream in ('v', '*'):
+            video = value
+        if stream in ('a', '*'):
+            audio = value
+        if flag in _FILTER_FLAGS:
+            video_filter = True
+        elif flag in _AUDIO_FILTER_FLAGS:
+            audio_filter = True
+
+    if video == 'copy' or '-vn' in command:
+        video_work = False
+    elif video is not None or video_filter:
+        video_work = True
+    else:
+        # No video codec named: an audio-only job (e.g. extraction) if audio was, a default transcode if not
+        video_work = audio is None
+    if video_work:
+        return ENCODE
+    if (audio is not None and audio != 'copy') or audio_filter or (video == 'copy' and video_filter):
+        return AUDIO
+    return COPY
+
+
+def _requested_threads(command: list) -> int:
+    threads = 0
+    for flag, value in zip(command, command[1:]):
+        if flag == '-threads' and value.isdigit():
+            threads = int(value)
+    return threads
+
+
+def _device(path: str):
+    """st_dev of the file, or of its nearest existing parent for outputs not written yet."""
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+def devices_of(command: list) -> tuple:
+    """Storage devices a command reads from (-i) and writes to (the last argument)."""
+    paths = [value for flag, value in zip(command, command[1:]) if flag == '-i'] + [command[-1]]
+    devices = {_device(p) for p in paths if p not in ('-', '/dev/null') and '://' not in p
+               and not p.startswith('pipe:')}
+    devices.discard(None)
+    return tuple(sorted(devices))
+
+
+class ResourceGate:
+    """
+    Admission control for every ffmpeg run in the process (hooked into run_ffmpeg).
+
+    Copy jobs hold one slot on each storage device they touch (io_per_device per
+    device); encode jobs hold 'threads' cores out of core_budget, and get a '-threads'
+    flag if they didn't ask for one. The two limits are independent, so a disk-bound
+    remux never waits behind a CPU-bound encode or the other way round.
+    """
+
+    def __init__(self, core_budget: int = 0, io_per_device: int = 2, encode_threads: int = 0):
+        self.core_budget = max(1, core_budget or os.cpu_count() or 1)
+        self.io_per_device = max(1, io_per_device)
+        # x264/x265 gain little past ~8 threads; more, narrower encodes keep every core busy
+        self.encode_threads = min(self.core_budget, encode_threads or max(2, min(8, self.core_budget // 2)))
+        self._cond = threading.Condition()
+        self._cores_used = 0
+        self._device_slots = {}
+        self._cpu_queue = deque()  # FIFO so a wide encode isn't starved by narrow ones
+        self.busy = {COPY: 0.0, AUDIO: 0.0, ENCODE: 0.0}
+        self.counts = {COPY: 0, AUDIO: 0, ENCODE: 0}
+        self.running = {COPY: 0, AUDIO: 0, ENCODE: 0}
+        self._previous = None
+
+    def enter(self, command: list):
+        """Blocks until the command's resources are free. Returns (command to run, slot for leave())."""
+        kind = classify(command)
+        devices = ()
+        cores = 0
+        if kind == COPY:
+            devices = devices_of(command)
+        elif kind == AUDIO:
+            cores = 1
+        else:
+            cores = min(self.core_budget, _requested_threads(command) or self.encode_threads)
+            if not _requested_threads(command):
+                command = command[:-1] + ['-threads', str(cores), command[-1]]
+
+        with self._cond:
+            if cores:
+                ticket = object()
+                self._cpu_queue.append(ticket)
+                self._cond.wait_for(lambda: self._cpu_queue[0] is ticket
+                                    and self._cores_used + cores <= self.core_budget)
+                self._cpu_queue.popleft()
+                self._cores_used += cores
+            else:
+                self._cond.wait_for(lambda: all(self._device_slots.get(d, 0) < self.io_per_device
+                                                for d in devices))
+                for device in devices:
+                    self._device_slots[device] = self._device_slots.get(device, 0) + 1
+            self.running[kind] += 1
+            self._cond.notify_all()  # The next CPU ticket may fit too
+        return command, (kind, cores, devices, time.monotonic())
+
+    def leave(self, slot):
+        kind, cores, devices, started = slot
+        with self._cond:
+            self._cores_used -= cores
+            for device in devices:
+                self._device_slots[device] -= 1
+            self.running[kind] -= 1
+            self.counts[kind] += 1
+            self.busy[kind] += time.monotonic() - started
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'core_budget': self.core_budget, 'cores_used': self._cores_used,
+                'io_per_device': self.io_per_device, 'running': dict(self.running),
+                'finished': dict(self.counts), 'busy_seconds': {k: round(v, 1) for k, v in self.busy.items()},
+            }
+
+    def install(self):
+        """Makes every run_ffmpeg call in this process go through the gate."""
+        self._previous = set_resource_gate(self)
+        return self
+
+    def uninstall(self):
+        set_resource_gate(self._previous)
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.uninstall()
+
+
+class JobScheduler:
+    """
+    Runs a mixed queue of processor calls with copy jobs and encode jobs in separate
+    pools, so disks and CPUs are saturated at the same time and a nightly queue takes
+    about max(I/O time, CPU time) rather than their sum.
+
+    The pool a job waits in comes from its processor (COPY_PROCESSORS, or the format
+    for audio extraction) or 'resource='; the ResourceGate then admits each ffmpeg run
+    by the class of its actual arguments, so e.g. a stitch that has to re-encode an
+    outlier still counts against the cores. The gate is installed from the first
+    submit() until wait() returns, then the previously installed one is restored.
+    """
+    COPY_PROCESSORS = {'FormatMapper', 'TrackProcessor', 'StreamMerger', 'VideoDivider',
+                       'VideoStitcher'}
+
+    def __init__(self, core_budget: int = 0, io_per_device: int = 2, encode_threads: int = 0,
+                 copy_workers: int = 0):
+        self.gate = ResourceGate(core_budget, io_per_device, encode_threads)
+        encode_workers = self.gate.core_budget // self.gate.encode_threads + 1
+        self.copy = BatchRunner(copy_workers or io_per_device * 4, verbose=True)
+        self.encode = BatchRunner(encode_workers, total_threads=self.gate.core_budget, verbose=True)
+        self._started = time.monotonic()
+        self._installed = False
+
+    @staticmethod
+    def _extraction_formats(func, args: tuple, kwargs: dict) -> list:
+        """Output formats an AudioExtractor call will write ('original' = stream copy)."""
+        try:
+            bound = inspect.signature(func).bind(*args, **kwargs)
+        except TypeError:
+            return []
+        bound.apply_defaults()
+        if 'output_format' in bound.arguments:
+            return [bound.arguments['output_format']]
+        return [target[1] for target in bound.arguments.get('targets') or []]
+
+    def resource_of(self, func, args: tuple = (), kwargs: dict = None) -> str:
+        owner = getattr(func, '__self__', None)
+        name = type(owner).__name__ if owner is not None else None
+        if name == 'AudioExtractor':
+            # Only 'original' copies the stream; mp3/aac/flac... are audio encodes
+            formats = self._extraction_formats(func, args, kwargs or {})
+            return COPY if formats and all(f == 'original' for f in formats) else AUDIO
+        if name in self.COPY_PROCESSORS:
+            return COPY
+        return ENCODE
+
+    def submit(self, name: str, func, *args, resource: str = None, **kwargs):
+        """Queues func(*args, **kwargs) in the copy or encode pool (audio encodes share the latter)."""
+        if not self._installed:
+            self.gate.install()
+            self._installed = True
+        resource = resource or self.resource_of(func, args, kwargs)
+        runner = self.copy if resource == COPY else self.encode
+        return runner.submit(name, func, *args, **kwargs)
+
+    def submit_command(self, name: str, command: list):
+        """Queues a raw ffmpeg command, pooled by the class of its arguments."""
+        return self.submit(name, run_ffmpeg, command, resource=classify(command))
+
+    def wait(self) -> list:
+        try:
+            return self.copy.wait() + self.encode.wait()
+        finally:
+            if self._installed:
+                self.gate.uninstall()
+                self._installed = False
+
+    @property
+    def failures(self) -> list:
+        return self.copy.failures + self.encode.failures
+
+    def summary(self):
+        wall = time.monotonic() - self._started
+        stats = self.gate.stats()
+        busy = stats['busy_seconds']
+        total = len(self.copy.results) + len(self.encode.results)
+        print(f"\n📊 Scheduled {total} jobs in {wall:.1f}s "
+              f"({len(self.failures)} failed, {self.gate.core_budget} cores, {self.gate.io_per_device} copies/disk)")
+        print(f"   💽 copy: {stats['finished'][COPY]} runs, {busy[COPY]:.1f}s busy | "
+              f"🧮 encode: {stats['finished'][ENCODE] + stats['finished'][AUDIO]} runs, "
+              f"{busy[ENCODE] + busy[AUDIO]:.1f}s busy")
+        for r in self.failures:
+            reason = f": {r.error}" if r.error else ""
+            print(f"   ❌ {r.name}{reason}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python scheduler.py ffmpeg <args...>")
+        sys.exit(1)
+
+    args = sys.argv[1:]
+    print(f"🏷️  {classify(args)}  (devices: {devices_of(args)})")
+
+# ==========================================
+# HOW TO USE THIS CODE (EXAMPLE)
+# ==========================================
+#
+# Classify a command:
+# python src/utils/scheduler.py ffmpeg -i "Movie.mkv" -c copy "Movie.mp4"        -> copy
+# python src/utils/scheduler.py ffmpeg -i "Movie.mkv" -vf scale=1280:-2 "Small.mp4" -> encode
+#
+# From Python (remuxes and encodes of a nightly queue run side by side):
+# scheduler = JobScheduler()
+# scheduler.submit("remux", FormatMapper().convert_video, "A.mkv", "out/", "mp4")
+# scheduler.submit("brand", Watermarker().add_image_watermark, "B.mp4", "Logo.png", "B_branded.mp4")
+# scheduler.wait(); scheduler.summary()
@@ -0,0 +1,148 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import List
+
+try:
+    from src.utils import tracing
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.batch import BatchRunner
+    from src.utils.keyframes import get_keyframe_index
+    from src.utils.probe import get_probe
+    from src.utils.system import SystemUtils
+    from src.processors.stitcher import VideoStitcher
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.batch import BatchRunner
+    from src.utils.keyframes import get_keyframe_index
+    from src.utils.probe import get_probe
+    from src.utils.system import SystemUtils
+    from src.processors.stitcher import VideoStitcher
+
+
+class SegmentEncoder:
+    """
+    Chunked re-encode: splits the source at keyframes into N segments, runs the
+    same filter graph + encoder on every segment in parallel, then joins the
+    pieces losslessly with the concat demuxer and copies the original audio back.
+
+    Each segment starts decoding 'overlap' seconds early and trims that lead-in
+    after filtering, so temporal filters (hqdn3d) are warmed up at the boundary.
+    """
+
+    def __init__(self, segments: int = 0, overlap: float = 1.0, min_segment: float = 20.0, workers: int = 0):
+        self.segments = segments or (os.cpu_count() or 1)
+        self.overlap = overlap
+        self.min_segment = min_segment
+        self.workers = workers
+
+    def get_keyframes(self, input_path: str) -> List[float]:
+        """Keyframe timestamps of the first video stream (cached sidecar index)."""
+        return get_keyframe_index().keyframes(input_path)
+
+    @tracing.traced('segment plan', 'plan')
+    def plan(self, input_path: str) -> List[tuple]:
+        """Returns [(start, end), ...] with every inner boundary on a keyframe."""
+        info = get_probe().probe(input_path)
+        if info is None or not info.duration:
+            return []
+        duration = info.duration
+        count = int(min(self.segments, duration // self.min_segment))
+        if count < 2:
+            return [(0.0, duration)]
+
+        keyframes = self.get_keyframes(input_path)
+        cuts = []
+        for i in range(1, count):
+            target = duration * i / count
+            nearest = min(keyframes, key=lambda k: abs(k - target), default=None)
+            if nearest and nearest not in cuts and 0 < nearest < duration:
+                cuts.append(nearest)
+        bounds = [0.0] + sorted(cuts) + [duration]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def encode_segment(self, input_path: str, output_path: str, start: float, end: float, filter_graph: str,
+                       encoder_args: list, extra_inputs: list = None, threads: int = 0,
+                       overlap: float = None) -> bool:
+        """Encodes [start, end) of the source into one video-only segment (usable on its own, e.g. by a farm node)."""
+        lead = min(self.overlap if overlap is None else overlap, start)
+        graph = filter_graph
+        if lead > 0:
+            graph += f",trim=start={lead:.6f},setpts=PTS-STARTPTS"
+
+        command = [
+            'ffmpeg', '-ss', f"{start - lead:.6f}", '-t', f"{end - start + lead:.6f}",
+            '-i', input_path
+        ]
+        for extra in extra_inputs or []:
+            command.extend(['-i', extra])
+        command.extend([
+            '-filter_complex', graph,
+            '-an', '-sn', '-dn',
+            *encoder_args, *SystemUtils.thread_args(threads),
+            '-y', output_path
+        ])
+        try:
+            run_ffmpeg(command)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
+
+    @tracing.traced('join segments', 'finalize')
+    def join(self, parts: list, input_path: str, output_path: str) -> bool:
+        """Concatenates encoded segments losslessly and copies the source's audio back in."""
+        try:
+            joined = os.path.join(os.path.dirname(os.path.abspath(parts[0])), "joined.mkv")
+            if not VideoStitcher().concat_videos(parts, joined):
+                return False
+
+            # Put the untouched audio back next to the new video
+            command = [
+                'ffmpeg', '-i', joined, '-i', input_path,
+                '-map', '0:v', '-map', '1:a:0?',
+                '-c', 'copy', '-y', output_path
+            ]
+            run_ffmpeg(command)
+            os.remove(joined)
+            return True
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
+
+    def encode(self, input_path: str, output_path: str, filter_graph: str,
+               encoder_args: list, extra_inputs: list = None) -> bool:
+        """
+        filter_graph: filtergraph whose unlabelled input is the source video and
+        whose unlabelled output is the final picture (extra inputs are [1:v], ...).
+        """
+        extra_inputs = extra_inputs or []
+        try:
+            ranges = self.plan(input_path)
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
+        if not ranges:
+            return False
+
+        work_dir = tempfile.mkdtemp(prefix=".vidflow_segments_", dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            runner = BatchRunner(self.workers or len(ranges), verbose=False)
+            parts = []
+            print(f"🧩 Encoding {len(ranges)} segments in parallel ({runner.workers} workers)...")
+            for i, (start, end) in enumerate(ranges):
+                part = os.path.join(work_dir, f"segment_{i:04d}.mkv")
+                parts.append(part)
+                runner.submit(f"segment {i}", self.encode_segment, input_path, part, start, end,
+                              filter_graph, encoder_args, extra_inputs, runner.threads_per_job)
+            runner.wait()
+            if runner.failures:
+                runner.summary()
+                return False
+            return self.join(parts, input_path, output_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    from src.utils import operations
+    from src.utils.jobs import JobManager
+    from src.utils.probe import get_probe
+    from src.utils.scheduler import ResourceGate
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import operations
+    from src.utils.jobs import JobManager
+    from src.utils.probe import get_probe
+    from src.utils.scheduler import ResourceGate
+
+ACTIVE_STATES = ('queued', 'running')
+
+
+class JobService:
+    """
+    Long-running VidFlow process: a JobManager on a background event loop,
+    fronted by a small JSON-over-HTTP API (stdlib only).
+
+    One warm interpreter keeps the shared probe cache and imported processors,
+    so thousands of small remux jobs don't each pay for a Python start-up.
+
+        GET    /health                  queue counters
+        GET    /operations              available operations and their parameters
+        GET    /probe?path=...          cached media info
+        POST   /jobs                    {"op": "compress", "args": {...}, "timeout": 600}
+        GET    /jobs[?state=running]    list jobs
+        GET    /jobs/<id>               status, progress and result
+        DELETE /jobs/<id>               cancel (also POST /jobs/<id>/cancel)
+    """
+
+    def __init__(self, workers: int = 0, max_queued: int = 1000, keep_finished: int = 5000,
+                 stall_timeout: float = None, gate: 'ResourceGate' = None):
+        self.manager = JobManager(workers, stall_timeout=stall_timeout)
+        # Remuxes and encodes share the queue; the gate keeps disks and cores each at their own limit
+        self.gate = gate.install() if gate else None
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='vidflow-loop', daemon=True)
+        self._thread.start()
+
+    def _call(self, func, *args):
+        """Runs func on the event loop thread and returns its result."""
+        async def call():
+            return func(*args)
+        return asyncio.run_coroutine_threadsafe(call(), self.loop).result()
+
+    def counts(self) -> dict:
+        counts = {}
+        for handle in list(self.manager.jobs.values()):
+            counts[handle.state] = counts.get(handle.state, 0) + 1
+        return counts
+
+    def submit(self, op: str, args: dict, timeout: float = None, stall_timeout: float = None) -> dict:
+        """Validates and queues one job. Raises KeyError/TypeError on bad input, OverflowError when full."""
+        operations.check_args(op, args)
+        if self.counts().get('queued', 0) >= self.max_queued:
+            raise OverflowError(f"Queue is full ({self.max_queued} jobs waiting)")
+        method = operations.resolve(op)
+
+        def start():
+            handle = self.manager.submit(method, name=op, timeout=timeout, stall_timeout=stall_timeout, **args)
+            # The HTTP client polls instead of awaiting, so consume the outcome here
+            handle._task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._prune()
+            return handle.as_dict()
+        return self._call(start)
+
+    def _prune(self):
+        finished = [h for h in self.manager.jobs.values() if h.state not in ACTIVE_STATES]
+        for handle in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.manager.jobs[handle.id]
+
+    def get(self, job_id: int):
+        handle = self.manager.jobs.get(job_id)
+        return handle.as_dict() if handle else None
+
+    def list(self, state: str = None) -> list:
+        return [h.as_dict() for h in list(self.manager.jobs.values()) if state in (None, h.state)]
+
+    def cancel(self, job_id: int) -> bool:
+        return self.manager.cancel(job_id)
+
+    def serve(self, host: str = '127.0.0.1', port: int = 8765):
+        server = ThreadingHTTPServer((host, port), _handler_for(self))
+        server.daemon_threads = True
+        print(f"🛰️  VidFlow service on http://{host}:{port} ({self.manager.max_concurrent} workers)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n🛑 Shutting down...")
+        finally:
+            server.server_close()
+            for job_id in [h.id for h in self.manager.jobs.values() if h.state in ACTIVE_STATES]:
+                self.manager.cancel(job_id)
+            self.manager.shutdown()
+            if self.gate:
+                self.gate.uninstall()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def _handler_for(service: JobService):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass  # Job progress is what matters on the console, not access logs
+
+        def _send(self, status: int, payload):
+            body = json.dumps(payload, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _job_id(self, part: str):
+            return int(part) if part.isdigit() else None
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split('/') if p]
+            query = parse_qs(url.query)
+            if parts == ['health']:
+                health = {'ok': True, 'jobs': service.counts()}
+                if service.gate:
+                    health['resources'] = service.gate.stats()
+                self._send(200, health)
+            elif parts == ['operations']:
+                self._send(200, [operations.describe(name) for name in operations.OPERATIONS])
+            elif parts == ['probe'] and 'path' in query:
+                info = get_probe().probe(query['path'][0])
+                self._send(200, asdict(info)) if info else self._send(404, {'error': 'cannot probe file'})
+            elif parts == ['jobs']:
+                self._send(200, service.list(query.get('state', [None])[0]))
+            elif len(parts) == 2 and parts[0] == 'jobs' and self._job_id(parts[1]) is not None:
+                job = service.get(self._job_id(parts[1]))
+                self._send(200, job) if job else self._send(404, {'error': 'no such job'})
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            parts = [p for p in urlparse(self.path).path.split('/') if p]
+            if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+                return self._cancel(parts[1])
+            if parts != ['jobs']:
+                return self._send(404, {'error': 'not found'})
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                request = json.loads(self.rfile.read(length) or b'{}')
+                job = service.submit(request['op'], request.get('args') or {},
+                                     request.get('timeout'), request.get('stall_timeout'))
+            except OverflowError as e:
+                return self._send(503, {'error': str(e)})
+            except KeyError as e:
+                return self._send(400, {'error': f"missing or unknown: {e.args[0]}"})
+            except (ValueError, TypeError) as e:
+                return self._send(400, {'error': str(e)})
+            self._send(202, job)
+
+        def do_DELETE(self):
+            parts = [p for p in urlparse(self.path).path.split('/') if p]
+            if len(parts) == 2 and parts[0] == 'jobs':
+                return self._cancel(parts[1])
+            self._send(404, {'error': 'not found'})
+
+        def _cancel(self, part: str):
+            job_id = self._job_id(part)
+            if job_id is None or service.get(job_id) is None:
+                return self._send(404, {'error': 'no such job'})
+            self._send(200, {'id': job_id, 'cancelled': service.cancel(job_id)})
+
+    return Handler
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="VidFlow HTTP job service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=0, help="concurrent jobs (default: one per CPU core)")
+    parser.add_argument("--max-queued", type=int, default=1000)
+    parser.add_argument("--stall-timeout", type=float, default=None, help="kill ffmpeg after N silent seconds")
+    parser.add_argument("--core-budget", type=int, default=0, help="cores shared by encodes (default: all)")
+    parser.add_argument("--io-per-device", type=int, default=2, help="concurrent stream copies per disk")
+    options = parser.parse_args(argv)
+
+    gate = ResourceGate(options.core_budget, options.io_per_device)
+    JobService(options.workers, options.max_queued, stall_timeout=options.stall_timeout,
+               gate=gate).serve(options.host, options.port)
+
+
+# --- STANDALONE EXECUTION LOGIC ---
+if __name__ == "__main__":
+    main()
+
+# ==========================================
+# HOW TO USE THIS CODE (EXAMPLE)
+# ==========================================
+#
+# Start:   python main.py serve --workers 8 --stall-timeout 120
+#          (or python src/utils/service.py ...)
+#
+# Submit:  curl -X POST localhost:8765/jobs -d '{"op": "compress",
+#               "args": {"input_path": "/media/Movie.mkv", "output_path": "/media/Movie_small.mkv"}}'
+# Status:  curl localhost:8765/jobs/1
+# Cancel:  curl -X DELETE localhost:8765/jobs/1
@@ -0,0 +1,219 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+try:
+    from src.utils import tracing
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.keyframes import get_keyframe_index
+    from src.utils.planning import subtitle_args
+    from src.utils.probe import get_probe
+    from src.utils.system import SystemUtils
+    from src.processors.stitcher import VideoStitcher
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+    from src.utils import tracing
+    from src.utils.ffmpeg import run_ffmpeg
+    from src.utils.keyframes import get_keyframe_index
+    from src.utils.planning import subtitle_args
+    from src.utils.probe import get_probe
+    from src.utils.system import SystemUtils
+    from src.processors.stitcher import VideoStitcher
+
+
+class SmartCutter:
+    """
+    Frame-accurate cuts without a full re-encode.
+
+    Only the partial GOPs at each end of the range are re-encoded (matching the
+    source codec, size and pixel format); everything from the first keyframe inside
+    the range to the last one is stream-copied. The pieces are joined as MPEG-TS
+    (parameter sets travel in-band, so the re-encoded and copied GOPs can follow
+    each other) and the source audio/subtitles for the exact range are muxed back.
+    """
+    # Codecs whose copied GOPs can be spliced with freshly encoded ones
+    ANNEXB_FILTERS = VideoStitcher.ANNEXB_FILTERS
+    ENCODERS = {
+        'h264': ['libx264', '-preset', 'medium', '-crf', '16'],
+        'hevc': ['libx265', '-preset', 'medium', '-crf', '18'],
+    }
+
+    def __init__(self, threads: int = 0):
+        self.threads = threads
+
+    @tracing.traced('smart-cut plan', 'plan')
+    def plan(self, input_path: str, start: float, end: float) -> list:
+        """
+        Returns [(kind, start, end), ...] with kind 'encode' or 'copy'.
+        A range that doesn't contain two keyframes is one 'encode' piece.
+        """
+        index = get_keyframe_index()
+        first = index.at_or_after(input_path, start)
+        last = index.at_or_before(input_path, end)
+        if first is None or last is None or first >= last:
+            return [('encode', start, end)]
+        pieces = []
+        if first - start > 0.001:
+            pieces.append(('encode', start, first))
+        pieces.append(('copy', first, last))
+        if end - last > 0.001:
+            pieces.append(('encode', last, end))
+        return pieces
+
+    @classmethod
+    def can_splice(cls, info) -> bool:
+        return info is not None and info.video is not None and info.video.codec_name in cls.ANNEXB_FILTERS
+
+    def _piece_command(self, input_path, kind, start, end, video, output_path,
+                       filter_graph: str = None, extra_inputs: list = None,
+                       encoder_options: list = None) -> list:
+        command = ['ffmpeg', '-ss', f"{start:.6f}", '-i', input_path]
+        for extra in extra_inputs or []:
+            command.extend(['-i', extra])
+        command.extend(['-t', f"{end - start:.6f}"])
+        if filter_graph:
+            command.extend(['-filter_complex', f"[0:v]{filter_graph}[vout]", '-map', '[vout]'])
+        else:
+            command.extend(['-map', '0:v:0'])
+        command.extend(['-an', '-sn', '-dn'])
+        if kind == 'copy':
+            command.extend(['-c:v', 'copy', '-bsf:v', self.ANNEXB_FILTERS[video.codec_name]])
+        else:
+            encoder = self.ENCODERS[video.codec_name]
+            command.extend(['-c:v', encoder[0], *(encoder_options or encoder[1:])])
+            if video.pix_fmt:
+                command.extend(['-pix_fmt', video.pix_fmt])
+            command.extend(SystemUtils.thread_args(self.threads))
+        command.extend(['-f', 'mpegts', '-y', output_path])
+        return command
+
+    def _render(self, input_path, output_path, pieces, video, start=0.0, end=None,
+                filter_graph=None, extra_inputs=None, encoder_options=None) -> bool:
+        """Writes each (kind, start, end) piece as MPEG-TS, joins them and muxes the source audio back."""
+        work_dir = tempfile.mkdtemp(prefix=".vidflow_smartcut_", dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            parts = []
+            for i, (kind, piece_start, piece_end) in enumerate(pieces):
+                part = os.path.join(work_dir, f"piece_{i}.ts")
+                graph = filter_graph(piece_start, piece_end) if filter_graph and kind == 'encode' else None
+                run_ffmpeg(self._piece_command(input_path, kind, piece_start, piece_end, video, part,
+                                               graph, extra_inputs if graph else None, encoder_options))
+                parts.append(part)
+
+            with tracing.span('join pieces', 'finalize', pieces=len(parts)):
+                joined = os.path.join(work_dir, "video.ts")
+                if not VideoStitcher().concat_videos(parts, joined):
+                    return False
+
+                # Audio/subtitles are cut packet-accurately without re-encoding
+                command = ['ffmpeg', '-i', joined]
+                if start > 0 or end is not None:
+                    command.extend(['-ss', f"{start:.6f}"])
+                if end is not None:
+                    command.extend(['-t', f"{end - start:.6f}"])
+                command.extend([
+                    '-i', input_path,
+                    '-map', '0:v', '-map', '1:a?', '-map', '1:s?',
+                    '-c', 'copy', *subtitle_args(output_path), '-y', output_path
+                ])
+                run_ffmpeg(command)
+            return True
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _full_encode(self, input_path, output_path, start, end) -> bool:
+        """Fallback for codecs that can't be spliced: accurate seek + re-encode of the range only."""
+        command = [
+            'ffmpeg', '-ss', f"{start:.6f}", '-i', input_path, '-t', f"{end - start:.6f}",
+            '-map', '0:v:0', '-map', '0:a?', '-map', '0:s?',
+            '-c:v', 'libx264', '-preset', 'medium', '-crf', '18', '-c:a', 'copy', *subtitle_args(output_path),
+            *SystemUtils.thread_args(self.threads), '-y', output_path
+        ]
+        run_ffmpeg(command)
+        return True
+
+    def cut(self, input_path: str, output_path: str, start: float, end: float = None) -> bool:
+        """Writes [start, end) of input_path to output_path (end=None means to the end)."""
+        info = get_probe().probe(input_path)
+        if info is None or info.video is None:
+            print("❌ No video stream to cut.")
+            return False
+        if end is None or (info.duration and end > info.duration):
+            end = info.duration
+        if end is None or end <= start:
+            print("Error: cut range is empty.")
+            return False
+
+        video = info.video
+        try:
+            if video.codec_name not in self.ANNEXB_FILTERS:
+                print(f"ℹ️  {video.codec_name} can't be smart-cut, re-encoding the range")
+                return self._full_encode(input_path, output_path, start, end)
+
+            pieces = self.plan(input_path, start, end)
+            encoded = sum(e - s for kind, s, e in pieces if kind == 'encode')
+            print(f"✂️  Smart cut {start:.3f}s -> {end:.3f}s (re-encoding {encoded:.1f}s of {end - start:.1f}s)")
+
+            return self._render(input_path, output_path, pieces, video, start, end)
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
+
+    def patch(self, input_path: str, output_path: str, start: float, end: float,
+              filter_graph, extra_inputs: list = None, encoder_options: list = None) -> bool:
+        """
+        Applies a filter to [start, end) of the picture only: the GOPs covering that
+        span are re-encoded, the rest of the file is stream-copied.
+        filter_graph: callable(piece_start, piece_end) -> graph for the re-encoded
+        piece (input [0:v], extras [1:v]...; times inside it start at 0).
+        encoder_options: rate-control args (e.g. ['-preset', 'slow', '-crf', '18']) for
+        the source codec's encoder instead of the ENCODERS defaults.
+        Returns False for codecs that can't be spliced (see can_splice()).
+        """
+        info = get_probe().probe(input_path)
+        if not self.can_splice(info) or not info.duration:
+            return False
+        index = get_keyframe_index()
+        first = index.at_or_before(input_path, start) or 0.0
+        last = index.at_or_after(input_path, end) if end < info.duration else None
+        last = last if last and last < info.duration else info.duration
+
+        pieces = []
+        if first > 0:
+            pieces.append(('copy', 0.0, first))
+        pieces.append(('encode', first, last))
+        if last < info.duration:
+            pieces.append(('copy', last, info.duration))
+        print(f"🩹 Re-encoding {last - first:.1f}s of {info.duration:.1f}s, copying the rest")
+        try:
+            return self._render(input_path, output_path, pieces, info.video,
+                                filter_graph=filter_graph, extra_inputs=extra_inputs,
+                                encoder_options=encoder_options)
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e.stderr.decode()}")
+            return False
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Usage: python smartcut.py <input> <output> <start_seconds> [end_seconds]")
+        sys.exit(1)
+
+    cut_end = float(sys.argv[4]) if len(sys.argv) > 4 else None
+    if SmartCutter().cut(sys.argv[1], sys.argv[2], float(sys.argv[3]), cut_end):
+        print(f"✅ Created: {sys.argv[2]}")
+    else:
+        print("❌ Failed.")
+
+# ==========================================
+# HOW TO USE THIS CODE (EXAMPLE)
+# ==========================================
+#
+# Syntax: python src/utils/smartcut.py <Input> <Output> <Start> [End]
+#
+# Example Command:
+# python src/utils/smartcut.py "Movie.mkv" "Scene.mkv" 3712.48 3801.2
+#
+# (Only the few seconds around each cut are re-encoded; the rest is copied)
@@ -0,0 +1,148 @@
+import os
+import sys
+
+VIDEO_EXTENSIONS = ('.mkv', '.mp4', '.avi', '.mov', '.m4v', '.webm')
+SUB_EXTENSIONS = ('.srt', '.ass', '.ssa', '.vtt')
+SUB_FOLDERS = ('subs', 'subtitles')
+
+# Filename language codes -> ISO 639-2 (what Matroska/MP4 language tags expect)
+LANGUAGES = {
+    'en': 'eng', 'fr': 'fre', 'de': 'ger', 'es': 'spa', 'it': 'ita', 'pt': 'por', 'nl': 'dut',
+    'sv': 'swe', 'no': 'nor', 'da': 'dan', 'fi': 'fin', 'pl': 'pol', 'cs': 'cze', 'hu': 'hun',
+    'ro': 'rum', 'el': 'gre', 'tr': 'tur', 'ru': 'rus', 'uk': 'ukr', 'ar': 'ara', 'he': 'heb',
+    'hi': 'hin', 'bn': 'ben', 'mr': 'mar', 'ta': 'tam', 'te': 'tel', 'ja': 'jpn', 'ko': 'kor',
+    'zh': 'chi', 'th': 'tha', 'vi': 'vie', 'id': 'ind', 'ms': 'may',
+}
+ISO_639_2 = set(LANGUAGES.values()) | {'fra', 'deu', 'nld', 'ces', 'ron', 'ell', 'zho', 'msa', 'und'}
+# ISO 639-2/T -> 639-2/B, so 'fra' and 'fre' compare equal
+_TERMINOLOGY = {'fra': 'fre', 'deu': 'ger', 'nld': 'dut', 'ces': 'cze', 'ron': 'rum', 'ell': 'gre',
+                'zho': 'chi', 'msa': 'may'}
+FORCED_TAGS = {'forced', 'foreign'}
+SDH_TAGS = {'sdh', 'cc', 'hi'}
+DEFAULT_TAGS = {'default'}
+
+
+class SubtitleTrack:
+    """One external subtitle file and the tags parsed from its name (Movie.en.forced.srt)."""
+
+    def __init__(self, path: str, language: str = None, forced: bool = False, sdh: bool = False,
+                 default: bool = False):
+        self.path = path
+        self.language = language
+        self.forced = forced
+        self.sdh = sdh
+        self.default = default
+
+    @property
+    def label(self) -> str:
+        parts = [self.language or 'und']
+        if self.forced:
+            parts.append('forced')
+        if self.sdh:
+            parts.append('SDH')
+        return ' '.join(parts)
+
+    @property
+    def disposition(self) -> str:
+        flags = [name for name, on in (('default', self.default), ('forced', self.forced),
+                                       ('hearing_impaired', self.sdh)) if on]
+        return '+'.join(flags) or '0'
+
+
+def normalize_language(code: str) -> str:
+    """'en' / 'EN' / 'eng' -> 'eng'; 'fra' -> 'fre'; None/'' -> 'und'."""
+    code = (code or 'und').strip().lower()
+    code = LANGUAGES.get(code, code)
+    return _TERMINOLOGY.get(code, code)
+
+
+def parse_subtitle_name(name: str):
+    """'Movie.en.forced.srt' -> ('movie', 'eng', True, False, False): (stem, language, forced, sdh, default)."""
+    stem = os.path.splitext(name)[0]
+    parts = stem.split('.')
+    language, forced, sdh, default = None, False, False, False
+    # Peel recognised tags off the end; anything else belongs to the video's name
+    while len(parts) > 1:
+        tag = parts[-1].lower()
+        if tag in FORCED_TAGS:
+            forced = True
+        elif tag == 'hi' and language is None and parts[-2].lower() not in LANGUAGES.keys() | ISO_639_2:
+            language = 'hin'  # Movie.hi.srt is Hindi; Movie.en.hi.srt is hearing-impaired English
+        elif tag in SDH_TAGS:
+            sdh = True
+        elif tag in DEFAULT_TAGS:
+            default = True
+        elif language is None and tag in LANGUAGES:
+            language = LANGUAGES[tag]
+        elif language is None and tag in ISO_639_2:
+            language = tag
+        else:
+            break
+        parts.pop()
+    return '.'.join(parts).lower(), language, forced, sdh, default
+
+
+class SubtitleMatcher:
+    """
+    Pairs videos with external subtitles across a whole library in ONE directory walk.
+
+    Subtitles match a video when they share its name (case-insensitive), either next
+    to it or in a 'Subs'/'Subtitles' folder beside it, with optional language and
+    flag suffixes: Movie.srt, Movie.en.srt, Movie.fr.forced.ass, Movie.eng.sdh.srt.
+    """
+
+    def __init__(self, video_extensions=VIDEO_EXTENSIONS, sub_extensions=SUB_EXTENSIONS):
+        self.video_extensions = tuple(e.lower() for e in video_extensions)
+        self.sub_extensions = tuple(e.lower() for e in sub_extensions)
+
+    def index(self, root: str):
+        """Walks the tree once. Returns (videos, subs) where subs maps (folder, stem) -> [SubtitleTrack]."""
+        videos = []
+        subs = {}
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                name = entry.name.lower()
+                if name.endswith(self.video_extensions) and not name.startswith('.'):
+                    videos.append(entry.path)
+                elif name.endswith(self.sub_extensions):
+                    stem, language, forced, sdh, default = parse_subtitle_name(entry.name)
+                    owner = folder
+                    # Subs/Movie.en.srt belongs to videos in the parent folder
+                    if os.path.basename(folder).lower() in SUB_FOLDERS:
+                        owner = os.path.dirname(folder)
+                    track = SubtitleTrack(entry.path, language, forced, sdh, default)
+                    subs.setdefault((owner, stem), []).append(track)
+        return videos, subs
+
+    def match(self, root: str) -> list:
+        """Returns [(video_path, [SubtitleTrack, ...])] for every video that has subtitles."""
+        videos, subs = self.index(root)
+        matches = []
+        for video in sorted(videos):
+            folder, name = os.path.split(video)
+            tracks = subs.get((folder, os.path.splitext(name)[0].lower()))
+            if tracks:
+                # Full subtitles before forced ones, then by language, for a stable track order
+                tracks = sorted(tracks, key=lambda t: (t.forced, t.sdh, t.language or 'zzz', t.path))
+                matches.append((video, tracks))
+        return matches
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python subtitles.py <library_folder>")
+        sys.exit(1)
+
+    for video, tracks in SubtitleMatcher().match(sys.argv[1]):
+        print(f"🎬 {video}")
+        for track in tracks:
+            print(f"   💬 {track.label:<16} {os.path.basename(track.path)}")
@@ -1,7 +1,23 @@
+import os
 import shutil
 
 class SystemUtils:
     @staticmethod
     def check_ffmpeg_availability() -> bool:
         """Verifies if FFmpeg is installed and accessible."""
-        return shutil.which("ffmpeg") is not None
\ No newline at end of file
+        return shutil.which("ffmpeg") is not None
+
+    @staticmethod
+    def thread_args(threads: int = 0) -> list:
+        """FFmpeg '-threads' flag for a per-job CPU budget (0 lets FFmpeg decide)."""
+        return ['-threads', str(threads)] if threads else []
+
+    @staticmethod
+    def cache_dir() -> str:
+        """Folder for VidFlow's persistent caches (override with VIDFLOW_CACHE_DIR)."""
+        path = os.environ.get("VIDFLOW_CACHE_DIR") or os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+            "vidflow"
+        )
+        os.makedirs(path, exist_ok=True)
+        return path
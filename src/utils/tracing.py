@@ -0,0 +1,322 @@
+import atexit
+import functools
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# ffmpeg -benchmark prints these on stderr when it exits
+_BENCH_TIMES = re.compile(rb'bench:\s*utime=([\d.]+)s\s+stime=([\d.]+)s\s+rtime=([\d.]+)s')
+_BENCH_RSS = re.compile(rb'bench:\s*maxrss=(\d+)\s*(KiB|kB|KB)')
+
+
+def parse_benchmark(tail) -> dict:
+    """utime/stime/rtime (s) and maxrss (kB) from the stderr lines of an 'ffmpeg -benchmark' run."""
+    bench = {}
+    for line in tail:
+        match = _BENCH_TIMES.search(line)
+        if match:
+            bench['utime'], bench['stime'], bench['rtime'] = (float(v) for v in match.groups())
+            continue
+        match = _BENCH_RSS.search(line)
+        if match:
+            bench['maxrss_kb'] = int(match.group(1))
+    return bench
+
+
+class Tracer:
+    """
+    Collects timed spans from every thread and writes them in the Chrome trace
+    event format, so a whole batch can be opened in chrome://tracing or
+    ui.perfetto.dev: one row per worker thread, with probe, plan, queue wait,
+    spawn, ffmpeg and finalise spans nested under each job.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.events = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._threads = set()
+        self._ids = itertools.count(1)
+
+    def _us(self, t: float) -> float:
+        return round((t - self._origin) * 1e6, 1)
+
+    def record(self, name: str, cat: str, start: float, end: float, args: dict = None,
+               tid: int = None, thread_name: str = None):
+        """Adds a finished span; start/end are time.perf_counter() values. 'tid' picks another row."""
+        if tid is None:
+            tid, thread_name = threading.get_ident(), threading.current_thread().name
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'pid': self._pid, 'tid': tid,
+                 'ts': self._us(start), 'dur': self._us(end) - self._us(start)}
+        if args:
+            event['args'] = args
+        with self._lock:
+            if tid not in self._threads:
+                self._threads.add(tid)
+                self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': tid,
+                                    'args': {'name': thread_name or str(tid)}})
+            self.events.append(event)
+
+    def record_async(self, name: str, cat: str, start: float, end: float, args: dict = None):
+        """
+        Adds a span that may overlap others on the same thread (e.g. jobs waiting in a
+        queue); viewers draw these on their own async tracks instead of nesting them.
+        """
+        span_id = next(self._ids)
+        begin = {'name': name, 'cat': cat, 'ph': 'b', 'id': span_id, 'pid': self._pid,
+                 'tid': threading.get_ident(), 'ts': self._us(start)}
+        if args:
+            begin['args'] = args
+        finish = dict(begin, ph='e', ts=self._us(end))
+        finish.pop('args', None)
+        with self._lock:
+            self.events.extend((begin, finish))
+
+    @contextmanager
+    def span(self, name: str, cat: str, **args):
+        """Times the block; the yielded dict can be filled with results to attach to the span."""
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args['error'] = type(e).__name__
+            raise
+        finally:
+            self.record(name, cat, start, time.perf_counter(), args)
+
+    def spans(self) -> list:
+        with self._lock:
+            return [e for e in self.events if e['ph'] in ('X', 'b', 'e')]
+
+    def save(self, path: str = None) -> str:
+        path = path or self.path
+        with self._lock:
+            data = {'traceEvents': list(self.events), 'displayTimeUnit': 'ms',
+                    'otherData': {'summary': summarize(self.events)}}
+        temp = f"{path}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'), default=str)
+        os.replace(temp, path)
+        return path
+
+
+def _complete_spans(events: list) -> list:
+    """'X' events plus matched async 'b'/'e' pairs turned into spans with a 'dur'."""
+    spans, begins = [], {}
+    for event in events:
+        phase = event.get('ph')
+        if phase == 'X':
+            spans.append(event)
+        elif phase == 'b':
+            begins[(event['cat'], event['id'])] = event
+        elif phase == 'e' and (event['cat'], event['id']) in begins:
+            begin = begins.pop((event['cat'], event['id']))
+            spans.append(dict(begin, ph='X', dur=event['ts'] - begin['ts'], tid=None))
+    return spans
+
+
+def _parents(spans: list) -> list:
+    """Index of each span's enclosing span on the same thread (None at the top)."""
+    parents = [None] * len(spans)
+    rows = {}
+    for i, span in enumerate(spans):
+        if span['tid'] is not None:
+            rows.setdefault(span['tid'], []).append(i)
+    for indexes in rows.values():
+        indexes.sort(key=lambda i: (spans[i]['ts'], -spans[i]['dur']))
+        stack = []
+        for i in indexes:
+            end = spans[i]['ts'] + spans[i]['dur']
+            # 1 us of slack for the rounding of ts/dur
+            while stack and spans[stack[-1]]['ts'] + spans[stack[-1]]['dur'] + 1 < end:
+                stack.pop()
+            parents[i] = stack[-1] if stack else None
+            stack.append(i)
+    return parents
+
+
+def summarize(events: list) -> dict:
+    """
+    'spans': count, total, mean and max (ms) per category/name, with the summed
+    ffmpeg -benchmark CPU time and peak memory for ffmpeg spans, which are filed
+    under their resource class (copy/audio/encode; CPU well below wall time means
+    the run was waiting on I/O, not computing).
+
+    'operations': per operation (job spans), where its wall time went: exclusive
+    time of every span nested in its jobs, by category, plus 'other' for untraced
+    Python work and the time its jobs sat in a queue.
+    """
+    spans = _complete_spans(events)
+    summary = {}
+    for event in spans:
+        key = f"{event['cat']}/{event['name']}"
+        row = summary.setdefault(key, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        ms = event['dur'] / 1000
+        row['count'] += 1
+        row['total_ms'] += ms
+        row['max_ms'] = max(row['max_ms'], ms)
+        args = event.get('args') or {}
+        if 'utime' in args:
+            row['cpu_ms'] = row.get('cpu_ms', 0.0) + (args['utime'] + args.get('stime', 0.0)) * 1000
+            row['maxrss_kb'] = max(row.get('maxrss_kb', 0), args.get('maxrss_kb', 0))
+    for row in summary.values():
+        row['mean_ms'] = row['total_ms'] / row['count']
+
+    parents = _parents(spans)
+    exclusive = [span['dur'] for span in spans]
+    for i, parent in enumerate(parents):
+        if parent is not None:
+            exclusive[parent] -= spans[i]['dur']
+
+    operations = {}
+    job_ops = {}
+    for i, span in enumerate(spans):
+        if span['cat'] == 'job':
+            op = (span.get('args') or {}).get('op') or span['name']
+            job_ops[span['name']] = op
+            row = operations.setdefault(op, {'jobs': 0, 'total_ms': 0.0, 'breakdown_ms': {}})
+            row['jobs'] += 1
+            row['total_ms'] += span['dur'] / 1000
+    for i, span in enumerate(spans):
+        owner = i
+        while owner is not None and spans[owner]['cat'] != 'job':
+            owner = parents[owner]
+        if owner is not None:
+            op = (spans[owner].get('args') or {}).get('op') or spans[owner]['name']
+            category = 'other' if owner == i else span['cat']
+            breakdown = operations[op]['breakdown_ms']
+            breakdown[category] = breakdown.get(category, 0.0) + exclusive[i] / 1000
+        elif span['cat'] == 'queue' and (span.get('args') or {}).get('job') in job_ops:
+            breakdown = operations[job_ops[span['args']['job']]]['breakdown_ms']
+            breakdown['queue'] = breakdown.get('queue', 0.0) + span['dur'] / 1000
+
+    for row in list(summary.values()) + list(operations.values()):
+        for field in ('total_ms', 'max_ms', 'mean_ms', 'cpu_ms'):
+            if field in row:
+                row[field] = round(row[field], 2)
+        if 'breakdown_ms' in row:
+            row['breakdown_ms'] = {k: round(v, 2) for k, v in row['breakdown_ms'].items()}
+    return {'spans': summary, 'operations': operations}
+
+
+def print_summary(summary: dict):
+    spans = summary['spans']
+    print(f"\n🔬 Trace summary ({len(spans)} span types)")
+    print(f"   {'span':<32} {'count':>6} {'total s':>9} {'mean ms':>9} {'max ms':>9}  cpu")
+    for key, row in sorted(spans.items(), key=lambda kv: -kv[1]['total_ms']):
+        cpu = ""
+        if 'cpu_ms' in row:
+            cpu = f"{row['cpu_ms'] / 1000:.1f}s cpu, {row['maxrss_kb'] / 1024:.0f} MB peak"
+        print(f"   {key:<32} {row['count']:>6} {row['total_ms'] / 1000:>9.2f} "
+              f"{row['mean_ms']:>9.1f} {row['max_ms']:>9.1f}  {cpu}")
+
+    if summary['operations']:
+        print("\n   Per operation (share of job time; queue is extra)")
+    for op, row in sorted(summary['operations'].items(), key=lambda kv: -kv[1]['total_ms']):
+        total = row['total_ms'] or 1.0
+        parts = sorted(row['breakdown_ms'].items(), key=lambda kv: -kv[1])
+        shares = ", ".join(f"{cat} {ms / total:.0%}" if cat != 'queue' else f"queue {ms / 1000:.1f}s"
+                           for cat, ms in parts)
+        print(f"   {op:<44} {row['jobs']:>3} jobs {row['total_ms'] / 1000:>8.2f}s  {shares}")
+
+
+_tracer = None
+
+
+def start(path: str) -> Tracer:
+    """Turns tracing on for this process; the trace is written to 'path' at exit (or on save())."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(path)
+        atexit.register(_flush)
+    else:
+        _tracer.path = path
+    return _tracer
+
+
+def get_tracer():
+    """The active Tracer, or None when tracing is off."""
+    return _tracer
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, cat: str, **args):
+    """Context manager timing one span; a no-op when tracing is off."""
+    if _tracer is None:
+        return nullcontext(args)
+    return _tracer.span(name, cat, **args)
+
+
+def traced(name: str, cat: str):
+    """Decorator form of span() for whole functions (plan steps, joins)."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.span(name, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record(name: str, cat: str, start: float, end: float, tid: int = None, thread_name: str = None, **args):
+    """Adds a span measured by the caller (e.g. time spent queued before a worker picked the job up)."""
+    if _tracer is not None:
+        _tracer.record(name, cat, start, end, args, tid, thread_name)
+
+
+def record_async(name: str, cat: str, start: float, end: float, **args):
+    """Like record(), for waits that overlap each other on one thread (see Tracer.record_async)."""
+    if _tracer is not None:
+        _tracer.record_async(name, cat, start, end, args)
+
+
+def _flush():
+    if _tracer is None or not _tracer.path:
+        return
+    try:
+        _tracer.save()
+    except OSError as e:
+        print(f"⚠️  Could not write trace: {e}")
+        return
+    print_summary(summarize(_tracer.events))
+    print(f"🔬 Trace written to {_tracer.path} (open in chrome://tracing or ui.perfetto.dev)")
+
+
+if os.environ.get('VIDFLOW_TRACE'):
+    start(os.environ['VIDFLOW_TRACE'])
+
+
+# --- STANDALONE EXECUTION LOGIC ---
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python src/utils/tracing.py <trace.json>")
+        sys.exit(1)
+    with open(sys.argv[1], encoding='utf-8') as f:
+        print_summary(summarize(json.load(f).get('traceEvents', [])))
+
+# ==========================================
+# HOW TO USE THIS CODE (EXAMPLE)
+# ==========================================
+#
+# VIDFLOW_TRACE=trace.json python main.py run nightly.json
+# python main.py --trace trace.json gif "Movie.mp4" "Clip.gif"
+#   -> per-span summary on exit; open trace.json in chrome://tracing or ui.perfetto.dev
+#
+# python src/utils/tracing.py trace.json      (summary of an existing trace)
+#
+# In code:
+#   from src.utils import tracing
+#   with tracing.span("probe", "probe", path=path) as span:
+#       span['cached'] = True
@@ -1,43 +1,262 @@
-import time
+import ctypes
+import ctypes.util
 import os
-import sys
+import select
 import shutil
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 # Note: When running standalone, you might need to adjust imports or run via module
 # For simplicity in this structure, we assume running from root via -m
 try:
     from src.processors.compressor import VideoCompressor
+    from src.utils import tracing
+    from src.utils.ledger import JobLedger
+    from src.utils.operations import succeeded
 except ImportError:
     # Fallback for direct execution if paths aren't set
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
     from src.processors.compressor import VideoCompressor
+    from src.utils import tracing
+    from src.utils.ledger import JobLedger
+    from src.utils.operations import succeeded
+
+
+class _Inotify:
+    """Minimal Linux inotify binding (ctypes, no third-party packages)."""
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_MOVED_FROM = 0x00000040
+    IN_Q_OVERFLOW = 0x00004000  # Kernel queue overflowed: events were dropped
+    _HEADER = struct.Struct('iIII')
+
+    def __init__(self, folder: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init failed")
+        mask = (self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO |
+                self.IN_CREATE | self.IN_DELETE | self.IN_MOVED_FROM)
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    @classmethod
+    def available(cls) -> bool:
+        if not sys.platform.startswith('linux'):
+            return False
+        try:
+            return hasattr(ctypes.CDLL(ctypes.util.find_library('c')), 'inotify_init')
+        except OSError:
+            return False
+
+    def read(self, timeout: float) -> list:
+        """Returns [(mask, filename), ...] for events that arrive within 'timeout'."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset + self._HEADER.size <= len(data):
+            _, mask, _, length = self._HEADER.unpack_from(data, offset)
+            offset += self._HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
 
 class FolderWatcher:
-    def __init__(self, watch_folder, output_folder):
+    """
+    Watches a drop folder and runs a processor on every finished video.
+    Uses inotify close-write/rename events on Linux and size/mtime stability
+    polling elsewhere, so half-copied files are never picked up. Ready files go
+    to a bounded worker pool; in-flight paths are tracked so nothing runs twice.
+
+    handler: callable(input_path, output_path) -> bool. Defaults to the audio
+    compressor, but any processor method with that shape can be routed here.
+    In inotify mode the folder is still rescanned every 'rescan_interval' seconds
+    (and straight away after a queue overflow), since network mounts deliver no
+    events for files written by other machines.
+    Jobs go through a JobLedger, so outputs appear atomically and a restarted
+    watcher doesn't redo files it already finished.
+    """
+
+    def __init__(self, watch_folder, output_folder, handler=None, workers: int = 2,
+                 extensions=('.mp4', '.mkv', '.mov'), settle_time: float = 2.0,
+                 max_queue: int = 64, delete_source: bool = True, use_inotify: bool = True,
+                 ledger: JobLedger = None, rescan_interval: float = 30.0):
         self.watch_folder = watch_folder
         self.output_folder = output_folder
-        self.compressor = VideoCompressor()
+        if handler is None:
+            self.compressor = VideoCompressor()
+            handler = self.compressor.compress_audio_maintain_video
+        self.handler = handler
+        self.op = f"watch:{getattr(handler, '__qualname__', repr(handler))}"
+        self.ledger = ledger or JobLedger()
+        self.workers = max(1, workers)
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.settle_time = settle_time
+        self.capacity = self.workers + max_queue
+        self.delete_source = delete_source
+        self.use_inotify = use_inotify and _Inotify.available()
+        self.rescan_interval = rescan_interval
+
+        self._pending = {}      # path -> (stamp, stable_since)
+        self._ready = set()     # paths confirmed complete by close-write / rename
+        self._writing = set()   # paths inotify saw being written (wait for close-write)
+        self._in_flight = set()
+        self._finished = {}     # path -> stamp already handled (retried only if the file changes)
+        self._lock = threading.Lock()
         os.makedirs(watch_folder, exist_ok=True)
         os.makedirs(output_folder, exist_ok=True)
 
+    def _is_video(self, name: str) -> bool:
+        # Dot-files are in-progress outputs (JobLedger temp files) or editor droppings
+        return not name.startswith('.') and name.lower().endswith(self.extensions)
+
+    @staticmethod
+    def _stamp(path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _track(self, path: str):
+        with self._lock:
+            if path in self._in_flight or path in self._pending:
+                return
+        stamp = self._stamp(path)
+        if stamp is not None and self._finished.get(path) != stamp:
+            self._pending[path] = (stamp, time.monotonic())
+
+    def _scan(self):
+        with os.scandir(self.watch_folder) as entries:
+            for entry in entries:
+                if entry.is_file() and self._is_video(entry.name):
+                    self._track(entry.path)
+
+    def _handle_event(self, mask: int, name: str):
+        if not self._is_video(name):
+            return
+        path = os.path.join(self.watch_folder, name)
+        if mask & (_Inotify.IN_DELETE | _Inotify.IN_MOVED_FROM):
+            self._pending.pop(path, None)
+            self._ready.discard(path)
+            self._writing.discard(path)
+        elif mask & (_Inotify.IN_CLOSE_WRITE | _Inotify.IN_MOVED_TO):
+            # Writer closed the file (or it was atomically renamed in): it's complete
+            self._finished.pop(path, None)
+            self._writing.discard(path)
+            self._track(path)
+            self._ready.add(path)
+        else:
+            self._writing.add(path)
+            self._track(path)
+
+    def _check_pending(self):
+        now = time.monotonic()
+        for path, (stamp, since) in list(self._pending.items()):
+            current = self._stamp(path)
+            if current is None:
+                self._pending.pop(path, None)
+                self._ready.discard(path)
+                continue
+            if path in self._ready:
+                complete = True
+            elif path in self._writing:
+                continue
+            elif current != stamp:
+                self._pending[path] = (current, now)
+                continue
+            else:
+                # Files already present at start-up (or any file when polling) rely on stability
+                complete = now - since >= self.settle_time
+
+            if complete and not self._dispatch(path, current):
+                break
+
+    def _dispatch(self, path: str, stamp) -> bool:
+        with self._lock:
+            if len(self._in_flight) >= self.capacity:
+                return False
+            self._in_flight.add(path)
+        self._pending.pop(path, None)
+        self._ready.discard(path)
+        self._executor.submit(self._process, path, stamp, time.perf_counter())
+        return True
+
+    def _process(self, input_path: str, stamp, queued: float):
+        name = os.path.basename(input_path)
+        output_path = os.path.join(self.output_folder, name)
+        start = time.perf_counter()
+        tracing.record_async('queue wait', 'queue', queued, start, job=name)
+        try:
+            print(f"⚡ Processing: {name}")
+            with tracing.span(name, 'job', op=self.op):
+                ok = succeeded(self.ledger.run(self.op, self.handler, input_path, output_path))
+        except Exception as e:
+            print(f"Error: {e}")
+            ok = False
+
+        if ok:
+            print(f"✅ Done: {name} ({time.perf_counter() - start:.1f}s)")
+            if self.delete_source and os.path.exists(input_path):
+                if os.path.exists(output_path):
+                    os.remove(input_path)
+                else:
+                    # The processor skipped it (already optimal): deliver the original
+                    shutil.move(input_path, output_path)
+        else:
+            print(f"❌ Failed: {name}")
+        self._finished[input_path] = stamp
+        with self._lock:
+            self._in_flight.discard(input_path)
+
     def start(self):
-        print(f"👀 Watching: {self.watch_folder}")
+        mode = "inotify" if self.use_inotify else "polling"
+        print(f"👀 Watching: {self.watch_folder} ({mode}, {self.workers} workers)")
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        notifier = _Inotify(self.watch_folder) if self.use_inotify else None
+        self._scan()
+        last_scan = time.monotonic()
         try:
             while True:
-                files = [f for f in os.listdir(self.watch_folder) if f.lower().endswith(('.mp4', '.mkv', '.mov'))]
-                for f in files:
-                    input_path = os.path.join(self.watch_folder, f)
-                    time.sleep(1) # Wait for copy
-                    print(f"⚡ Processing: {f}")
-                    output_path = os.path.join(self.output_folder, f)
-                    if self.compressor.compress_audio_maintain_video(input_path, output_path):
-                        print(f"✅ Done.")
-                        os.remove(input_path)
-                time.sleep(2)
+                if notifier:
+                    for mask, name in notifier.read(timeout=0.5):
+                        if mask & _Inotify.IN_Q_OVERFLOW:
+                            print("⚠️ Event queue overflowed, rescanning folder...")
+                            last_scan = 0
+                        else:
+                            self._handle_event(mask, name)
+                    if time.monotonic() - last_scan >= self.rescan_interval:
+                        self._scan()
+                        last_scan = time.monotonic()
+                else:
+                    time.sleep(1)
+                    self._scan()
+                self._check_pending()
         except KeyboardInterrupt:
-            print("Stopped.")
+            print("Stopped. Waiting for running jobs...")
+        finally:
+            if notifier:
+                notifier.close()
+            self._executor.shutdown(wait=True)
+
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python watcher.py <watch_folder> <output_folder>")
+        print("Usage: python watcher.py <watch_folder> <output_folder> [workers]")
     else:
-        FolderWatcher(sys.argv[1], sys.argv[2]).start()
\ No newline at end of file
+        workers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+        FolderWatcher(sys.argv[1], sys.argv[2], workers=workers).start()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the code the same way the scripts do: from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import operations  # noqa: E402
+
+
+class StubProcessor:
+    """Stand-in operation: reports the requested outcome without calling FFmpeg."""
+
+    def run(self, label: str, ok: bool = True):
+        return ok
+
+
+@pytest.fixture
+def register_op(monkeypatch):
+    """register(name, processor_class, method='run') adds an operation for this test only."""
+    monkeypatch.setattr(operations, '_instances', {})
+
+    def register(name: str, processor_class, method: str = 'run') -> str:
+        monkeypatch.setitem(operations.OPERATIONS, name,
+                            (processor_class.__module__, processor_class.__name__, method))
+        return name
+    return register
+
+
+@pytest.fixture
+def stub_op(register_op):
+    return register_op('stub', StubProcessor)
@@ -0,0 +1,39 @@
+import pytest
+
+from src.utils.cache import ResultCache
+
+
+def _write(path: str, data: bytes = b'frames'):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+@pytest.mark.parametrize('result', [False, None, (False, []), {'status': 'error'}])
+def test_failed_results_are_not_stored(tmp_path, result):
+    cache = ResultCache(root=str(tmp_path / 'cache'))
+    source, output = str(tmp_path / 'in.mp4'), str(tmp_path / 'out.gif')
+    _write(source)
+
+    def convert(input_path, output_path):
+        _write(output_path, b'half a gif')
+        return result
+
+    assert cache.run('gif', convert, source, output) == result
+    assert cache.stats()['results'] == 0
+
+
+def test_successful_result_is_served_from_the_cache(tmp_path):
+    cache = ResultCache(root=str(tmp_path / 'cache'))
+    source, output = str(tmp_path / 'in.mp4'), str(tmp_path / 'out.gif')
+    _write(source)
+    calls = []
+
+    def convert(input_path, output_path, fps):
+        calls.append(fps)
+        _write(output_path, b'gif')
+        return (True, [output_path])
+
+    assert cache.run('gif', convert, source, output, {'fps': 10}) == (True, [output])
+    assert cache.run('gif', convert, source, output, {'fps': 10}) is True
+    assert calls == [10]
+    assert cache.stats()['results'] == 1
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from conftest import StubProcessor
+from src.utils.farm import FarmQueue, FarmWorker
+
+
+class LoggingStub(StubProcessor):
+    """Records each run in a log file, optionally after a delay, so tests can see who ran what."""
+    _lock = threading.Lock()
+
+    def run(self, label: str, ok: bool = True, log_path: str = None, delay: float = 0.0):
+        time.sleep(delay)
+        with self._lock:
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(label + '\n')
+        return super().run(label, ok)
+
+
+@pytest.fixture
+def stub_op(register_op):
+    return register_op('stub', LoggingStub)
+
+
+def _runs(log_path: str) -> list:
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path, encoding='utf-8') as f:
+        return f.read().split()
+
+
+def _drain(queue: FarmQueue, workers: int = 3, slots: int = 2):
+    farm = [FarmWorker(queue, slots=slots, poll=0.05, worker_id=f"node{i}") for i in range(workers)]
+    threads = [threading.Thread(target=w.run, kwargs={'exit_when_idle': True}) for w in farm]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+        assert not thread.is_alive(), "worker did not drain the queue"
+    return farm
+
+
+def _make_stale(queue: FarmQueue, job_id: str, owner: str = 'dead-node'):
+    path = os.path.join(queue.root, 'leases', f"{job_id}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'worker': owner}, f)
+    past = time.time() - queue.lease_ttl - 5
+    os.utime(path, (past, past))
+    return path
+
+
+def test_several_workers_run_every_job_exactly_once(tmp_path, stub_op):
+    queue = FarmQueue(str(tmp_path / 'queue'))
+    log = str(tmp_path / 'runs.log')
+    for i in range(12):
+        queue.submit(stub_op, {'log_path': log, 'label': f"job{i}", 'delay': 0.02})
+
+    farm = _drain(queue)
+
+    assert sorted(_runs(log)) == sorted(f"job{i}" for i in range(12))
+    assert sum(w.completed for w in farm) == 12
+    assert queue.status()['done'] == 12
+
+
+def test_dependents_wait_for_their_dependencies(tmp_path, stub_op):
+    queue = FarmQueue(str(tmp_path / 'queue'))
+    log = str(tmp_path / 'runs.log')
+    first = queue.submit(stub_op, {'log_path': log, 'label': 'first', 'delay': 0.1})
+    queue.submit(stub_op, {'log_path': log, 'label': 'second'}, after=[first])
+
+    _drain(queue)
+
+    assert _runs(log) == ['first', 'second']
+
+
+def test_failed_dependency_fails_dependents_without_running_them(tmp_path, stub_op):
+    queue = FarmQueue(str(tmp_path / 'queue'), max_attempts=2)
+    log = str(tmp_path / 'runs.log')
+    broken = queue.submit(stub_op, {'log_path': log, 'label': 'broken', 'ok': False})
+    child = queue.submit(stub_op, {'log_path': log, 'label': 'child'}, after=[broken])
+    grandchild = queue.submit(stub_op, {'log_path': log, 'label': 'grandchild'}, after=[child])
+
+    _drain(queue)
+
+    assert _runs(log) == ['broken', 'broken']  # Retried up to max_attempts, dependents never ran
+    status = queue.status()
+    assert status['failed'] == 3 and status['done'] == 0
+    with open(os.path.join(queue.root, 'failed', f"{grandchild}.json"), encoding='utf-8') as f:
+        assert 'dependency failed' in json.load(f)['error']
+
+
+def test_expired_lease_is_reclaimed_and_counted_as_an_attempt(tmp_path, stub_op):
+    queue = FarmQueue(str(tmp_path / 'queue'), lease_ttl=1.0)
+    log = str(tmp_path / 'runs.log')
+    job_id = queue.submit(stub_op, {'log_path': log, 'label': 'orphan'})
+    _make_stale(queue, job_id)
+
+    job = queue.claim('rescuer')
+
+    assert job is not None and job['id'] == job_id
+    assert job['attempts'] == 1
+    assert queue.owns(job_id, 'rescuer')
+
+
+def test_live_lease_is_not_taken_over(tmp_path, stub_op):
+    queue = FarmQueue(str(tmp_path / 'queue'), lease_ttl=60.0)
+    job_id = queue.submit(stub_op, {'log_path': str(tmp_path / 'runs.log'), 'label': 'busy'})
+    assert queue.claim('node0')['id'] == job_id
+
+    assert queue.claim('node1') is None
+    assert queue.owns(job_id, 'node0')
+
+
+def test_job_that_keeps_killing_its_worker_gives_up(tmp_path, stub_op):
+    queue = FarmQueue(str(tmp_path / 'queue'), lease_ttl=1.0, max_attempts=2)
+    job_id = queue.submit(stub_op, {'log_path': str(tmp_path / 'runs.log'), 'label': 'crasher'})
+
+    _make_stale(queue, job_id, 'node0')
+    assert queue.claim('node1')['attempts'] == 1
+    _make_stale(queue, job_id, 'node1')
+
+    assert queue.claim('node2') is None
+    assert os.path.exists(os.path.join(queue.root, 'failed', f"{job_id}.json"))
+
+
+def test_reclaim_restores_a_lease_renewed_before_the_rename(tmp_path, stub_op, monkeypatch):
+    queue = FarmQueue(str(tmp_path / 'queue'), lease_ttl=1.0)
+    job_id = queue.submit(stub_op, {'log_path': str(tmp_path / 'runs.log'), 'label': 'contended'})
+    lease_path = _make_stale(queue, job_id)
+    real_rename = os.rename
+
+    def rename_after_takeover(src, dst):
+        # Another worker reclaimed the job between our expiry check and our rename
+        if src == lease_path:
+            os.remove(lease_path)
+            with open(lease_path, 'w', encoding='utf-8') as f:
+                json.dump({'worker': 'fast-node'}, f)
+        real_rename(src, dst)
+
+    monkeypatch.setattr(os, 'rename', rename_after_takeover)
+    assert queue.claim('slow-node') is None
+    monkeypatch.setattr(os, 'rename', real_rename)
+
+    assert queue.owns(job_id, 'fast-node')
+    assert not [n for n in os.listdir(os.path.join(queue.root, 'leases')) if '.stale-' in n]
@@ -0,0 +1,37 @@
+import re
+
+import pytest
+
+from src.processors.gif_maker import GifClip, GifMaker
+
+
+def _labels(command: list):
+    """(labels produced by the filter graph, labels consumed by it or by -map)."""
+    graph = command[command.index('-filter_complex') + 1]
+    produced, consumed = [], []
+    for chain in graph.split(';'):
+        head = re.match(r'((?:\[[^\]]+\])*)', chain).group(1)
+        consumed.extend(re.findall(r'\[([^\]]+)\]', head))
+        tail = re.search(r'((?:\[[^\]]+\])*)$', chain).group(1)
+        produced.extend(re.findall(r'\[([^\]]+)\]', tail))
+    mapped = [value.strip('[]') for flag, value in zip(command, command[1:]) if flag == '-map']
+    return produced, consumed + mapped
+
+
+@pytest.mark.parametrize('variants', [[], ['mp4', 'webp']])
+@pytest.mark.parametrize('cache_palettes', [False, True])
+def test_every_filter_output_is_used_exactly_once(variants, cache_palettes):
+    clips = [GifClip(10, 3, output_path='a.gif'), GifClip(15, 2, width=320, output_path='b.gif')]
+
+    command = GifMaker()._group_command('in.mp4', clips, variants, cache_palettes)
+
+    produced, used = _labels(command)
+    assert sorted(produced) == sorted(label for label in used if label != '0:v')
+    assert len(set(produced)) == len(produced)
+
+
+def test_cached_palettes_are_written_next_to_each_gif():
+    command = GifMaker()._group_command('in.mp4', [GifClip(0, 2, output_path='a.gif')], [], True)
+
+    start = command.index('[pal0]') - 1
+    assert command[start:start + 8] == ['-map', '[pal0]', '-frames:v', '1', '-update', '1', '-y', 'a.palette.png']
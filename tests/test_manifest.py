@@ -0,0 +1,46 @@
+import pytest
+
+from src.utils.manifest import DONE, FAILED, PENDING, SKIPPED, ManifestError, ManifestRunner
+
+
+def _job(job_id: str, after=(), ok: bool = True) -> dict:
+    return {'id': job_id, 'op': 'stub', 'args': {'label': job_id, 'ok': ok}, 'after': list(after)}
+
+
+def test_cycle_is_rejected_before_anything_runs(stub_op):
+    entries = [_job('a'), _job('b', ['a', 'd']), _job('c', ['b']), _job('d', ['c'])]
+
+    with pytest.raises(ManifestError, match='cycle among: b, c, d'):
+        ManifestRunner().load(entries)
+
+
+def test_unknown_dependency_and_bad_arguments_are_rejected(stub_op):
+    with pytest.raises(ManifestError, match="unknown job 'missing'"):
+        ManifestRunner().load([_job('a', ['missing'])])
+    with pytest.raises(ManifestError, match='job a'):
+        ManifestRunner().load([{'id': 'a', 'op': 'stub', 'args': {'colour': 'red'}}])
+
+
+def test_skip_dependents_marks_the_whole_subtree(stub_op):
+    runner = ManifestRunner().load([_job('root'), _job('child', ['root']), _job('grandchild', ['child']),
+                                    _job('other', ['root']), _job('unrelated')])
+    runner.jobs['other'].state = DONE
+
+    assert runner._skip_dependents(runner.jobs['root']) == 2
+    assert runner.jobs['child'].state == SKIPPED
+    assert runner.jobs['grandchild'].state == SKIPPED
+    assert "dependency 'root' failed" in runner.jobs['grandchild'].error
+    assert runner.jobs['other'].state == DONE
+    assert runner.jobs['unrelated'].state == PENDING
+
+
+def test_failure_skips_dependents_and_the_rest_still_runs(stub_op):
+    runner = ManifestRunner(workers=2).load([
+        _job('broken', ok=False), _job('after-broken', ['broken']),
+        _job('fine'), _job('after-fine', ['fine']),
+    ])
+
+    counts = runner.run()
+
+    assert counts == {FAILED: 1, SKIPPED: 1, DONE: 2}
+    assert runner.jobs['after-fine'].state == DONE
@@ -0,0 +1,50 @@
+from src.processors.tracks import TrackProcessor
+from src.utils.pipeline import Pipeline, PipelineStage
+
+
+def _maps(command: list) -> list:
+    return [value for flag, value in zip(command, command[1:]) if flag == '-map']
+
+
+def test_copy_only_pipeline_is_a_stream_copy():
+    command = Pipeline('in.mkv').add(TrackProcessor().keep_tracks_stage([2], 'a')).build_command('out.mkv')
+
+    assert command == ['ffmpeg', '-i', 'in.mkv', '-map', '0:v?', '-map', '0:a:2', '-map', '0:s?',
+                       '-c', 'copy', '-c:s', 'copy', '-y', 'out.mkv']
+
+
+def test_filter_stages_fuse_into_one_graph_with_extra_inputs():
+    pipeline = (Pipeline('in.mp4')
+                .add(PipelineStage.from_chain('grey', 'hue=s=0', encoder_args=['-c:v', 'libx264', '-crf', '18']))
+                .add(PipelineStage('logo', '{in}{extra0}overlay=10:10{out}', extra_inputs=['logo.png'])))
+
+    command = pipeline.build_command('out.mp4')
+
+    assert command[:5] == ['ffmpeg', '-i', 'in.mp4', '-i', 'logo.png']
+    assert command[command.index('-filter_complex') + 1] == '[0:v]hue=s=0[p0];[p0][1:v]overlay=10:10[vout]'
+    assert _maps(command) == ['[vout]', '0:a?']
+    assert command[command.index('-c:v'):command.index('-c:v') + 4] == ['-c:v', 'libx264', '-crf', '18']
+
+
+def test_internal_pad_labels_are_renamed_per_stage():
+    split = '{in}split[bg][fg];[bg][fg]overlay{out}'
+    graph, _ = Pipeline('in.mp4').add(PipelineStage('a', split)).add(PipelineStage('b', split)).build_filter_graph()
+
+    assert graph == ('[0:v]split[s0_bg][s0_fg];[s0_bg][s0_fg]overlay[p0];'
+                     '[p0]split[s1_bg][s1_fg];[s1_bg][s1_fg]overlay[vout]')
+
+
+def test_track_selections_merge_per_stream_type():
+    tracks = TrackProcessor()
+    pipeline = (Pipeline('in.mkv')
+                .add(tracks.keep_tracks_stage([0], 'a'))
+                .add(tracks.keep_tracks_stage([1], 's')))
+
+    assert _maps(pipeline.build_command('out.mkv')) == ['0:v?', '0:a:0', '0:s:1']
+
+
+def test_subtitles_follow_the_output_container():
+    pipeline = Pipeline('in.mkv').add(TrackProcessor().keep_tracks_stage([1], 's'))
+
+    assert pipeline.build_command('out.mp4')[-5:-2] == ['copy', '-c:s', 'mov_text']
+    assert '-sn' in Pipeline('in.mkv').build_command('out.avi')
@@ -0,0 +1,60 @@
+from src.utils.planning import COPY, DROP, TRANSCODE, plan_streams
+from src.utils.probe import MediaInfo, StreamInfo
+
+
+def _info(path: str, *streams) -> MediaInfo:
+    """streams: (codec_type, codec_name) pairs, numbered in order."""
+    counts = {}
+    infos = []
+    for index, (kind, codec) in enumerate(streams):
+        infos.append(StreamInfo(index, counts.get(kind, 0), kind, codec))
+        counts[kind] = counts.get(kind, 0) + 1
+    return MediaInfo(path, 1000, streams=infos)
+
+
+def _actions(plan) -> list:
+    return [d.action for d in plan.decisions]
+
+
+def test_same_container_with_supported_streams_is_a_noop():
+    plan = plan_streams(_info('a.mp4', ('video', 'h264'), ('audio', 'aac')), 'b.mp4')
+
+    assert _actions(plan) == [COPY, COPY]
+    assert plan.is_noop and not plan.needs_encode
+
+
+def test_different_extension_of_the_same_family_still_remuxes():
+    plan = plan_streams(_info('a.mp4', ('video', 'h264'), ('audio', 'aac')), 'b.mov')
+
+    assert _actions(plan) == [COPY, COPY]
+    assert not plan.is_noop
+
+
+def test_webm_output_transcodes_streams_matroska_would_copy():
+    plan = plan_streams(_info('a.mkv', ('video', 'h264'), ('audio', 'ac3'), ('subtitle', 'subrip')), 'b.webm')
+
+    assert _actions(plan) == [TRANSCODE, TRANSCODE, TRANSCODE]
+    assert [d.codec_args[0] for d in plan.decisions] == ['libvpx-vp9', 'libopus', 'webvtt']
+    assert not plan.is_noop and plan.needs_encode
+
+
+def test_webm_codecs_are_copied_into_webm():
+    plan = plan_streams(_info('a.mkv', ('video', 'vp9'), ('audio', 'opus')), 'b.webm')
+
+    assert _actions(plan) == [COPY, COPY]
+    assert not plan.is_noop
+
+
+def test_mp4_converts_text_subtitles_and_drops_image_ones():
+    plan = plan_streams(_info('a.mkv', ('video', 'h264'), ('subtitle', 'subrip'),
+                              ('subtitle', 'hdmv_pgs_subtitle'), ('attachment', 'ttf')), 'b.mp4')
+
+    assert _actions(plan) == [COPY, TRANSCODE, DROP, DROP]
+    assert plan.decisions[1].codec_args == ['mov_text']
+
+
+def test_ffmpeg_args_scope_options_to_each_output_stream():
+    plan = plan_streams(_info('a.mkv', ('video', 'h264'), ('data', None), ('audio', 'dts')), 'b.avi')
+
+    assert plan.ffmpeg_args() == ['-map', '0:0', '-map', '0:2', '-c:0', 'copy',
+                                  '-c:1', 'libmp3lame', '-b:1', '192k']
@@ -0,0 +1,53 @@
+import pytest
+
+from src.processors.extractor import AudioExtractor
+from src.processors.watermark import Watermarker
+from src.utils import ffmpeg
+from src.utils.scheduler import AUDIO, COPY, ENCODE, JobScheduler, ResourceGate, classify
+
+
+@pytest.mark.parametrize('args, expected', [
+    (['-c', 'copy'], COPY),
+    (['-map', '0', '-c:v', 'copy', '-c:a', 'copy', '-c:s', 'mov_text'], COPY),
+    (['-vcodec', 'copy', '-acodec', 'copy'], COPY),
+    (['-c', 'copy', '-c:a', 'aac'], AUDIO),
+    (['-c:v', 'copy', '-af', 'loudnorm'], AUDIO),
+    (['-vn', '-c:a', 'libmp3lame'], AUDIO),
+    (['-c:a', 'flac'], AUDIO),
+    (['-c:v', 'libx264', '-c:a', 'copy'], ENCODE),
+    (['-vf', 'scale=1280:-2', '-c:a', 'copy'], ENCODE),
+    ([], ENCODE),
+    # Output-index flags, as planning's StreamPlan.ffmpeg_args() emits them
+    (['-map', '0:0', '-map', '0:1', '-c:0', 'copy', '-c:1', 'copy'], COPY),
+    (['-c:0', 'copy', '-c:1', 'aac', '-b:1', '128k', '-c:2', 'copy'], AUDIO),
+    (['-c:0', 'copy', '-c:1', 'copy', '-c:2', 'mov_text'], COPY),
+    (['-c:0', 'libvpx-vp9', '-c:1', 'copy'], ENCODE),
+    (['-c:0', 'copy', '-c:1', 'libx264'], ENCODE),
+])
+def test_classify(args, expected):
+    assert classify(['ffmpeg', '-i', 'in.mkv', *args, 'out.mp4']) == expected
+
+
+def test_audio_extraction_is_pooled_by_format():
+    scheduler = JobScheduler()
+    extractor = AudioExtractor()
+
+    assert scheduler.resource_of(extractor.extract_audio, ('in.mkv', 'original')) == COPY
+    assert scheduler.resource_of(extractor.extract_audio, ('in.mkv',), {'output_format': 'mp3'}) == AUDIO
+    assert scheduler.resource_of(extractor.extract_targets, ('in.mkv', [('all', 'original'), ('eng', 'aac')])) == AUDIO
+    assert scheduler.resource_of(Watermarker().add_image_watermark, ()) == ENCODE
+
+
+def test_scheduler_only_replaces_the_gate_while_its_jobs_run():
+    outer = ResourceGate().install()
+    try:
+        scheduler = JobScheduler()
+        assert ffmpeg._resource_gate is outer
+
+        scheduler.submit('noop', lambda: ffmpeg._resource_gate is scheduler.gate)
+        results = scheduler.wait()
+
+        assert [r.value for r in results] == [True]
+        assert ffmpeg._resource_gate is outer
+    finally:
+        outer.uninstall()
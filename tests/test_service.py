@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from conftest import StubProcessor
+from src.utils.service import JobService
+
+
+class BlockingStub(StubProcessor):
+    """Holds its worker until the test releases it."""
+    release = threading.Event()
+
+    def run(self, label: str, ok: bool = True):
+        self.release.wait(10)
+        return super().run(label, ok)
+
+
+def _wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def service(register_op):
+    register_op('block', BlockingStub)
+    BlockingStub.release.clear()
+    service = JobService(workers=1, max_queued=2)
+    yield service
+    BlockingStub.release.set()
+    _wait_for(lambda: not any(state in service.counts() for state in ('queued', 'running')))
+    service.manager.shutdown()
+    service.loop.call_soon_threadsafe(service.loop.stop)
+    service._thread.join(5)
+    service.loop.close()
+
+
+def test_cancelled_queued_jobs_free_their_queue_places(service):
+    service.submit('block', {'label': 'running'})
+    queued = [service.submit('block', {'label': f"queued{i}"})['id'] for i in range(2)]
+    _wait_for(lambda: service.counts() == {'running': 1, 'queued': 2})
+    with pytest.raises(OverflowError):
+        service.submit('block', {'label': 'one too many'})
+
+    for job_id in queued:
+        assert service.cancel(job_id)
+    _wait_for(lambda: service.counts() == {'running': 1, 'cancelled': 2})
+
+    assert all(service.get(job_id)['finished'] for job_id in queued)
+    assert service.submit('block', {'label': 'accepted'})['state'] == 'queued'
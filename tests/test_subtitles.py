@@ -0,0 +1,26 @@
+import pytest
+
+from src.utils.subtitles import normalize_language, parse_subtitle_name
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('Movie.srt', ('movie', None, False, False, False)),
+    ('Movie.en.forced.srt', ('movie', 'eng', True, False, False)),
+    ('The.Movie.fr.foreign.srt', ('the.movie', 'fre', True, False, False)),
+    ('Movie.eng.sdh.default.ass', ('movie', 'eng', False, True, True)),
+    ('Movie.Name.2020.srt', ('movie.name.2020', None, False, False, False)),
+])
+def test_tags_are_peeled_off_the_end_of_the_name(name, expected):
+    assert parse_subtitle_name(name) == expected
+
+
+def test_hi_is_hindi_alone_and_hearing_impaired_after_a_language():
+    assert parse_subtitle_name('Movie.hi.srt')[1:4] == ('hin', False, False)
+    assert parse_subtitle_name('Movie.en.hi.srt')[1:4] == ('eng', False, True)
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('en', 'eng'), ('EN', 'eng'), ('eng', 'eng'), ('fra', 'fre'), ('jpn', 'jpn'), (None, 'und'), ('', 'und'),
+])
+def test_normalize_language(code, expected):
+    assert normalize_language(code) == expected
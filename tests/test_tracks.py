@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from src.processors import tracks
+from src.processors.tracks import TrackProcessor, TrackRules
+from src.utils.probe import MediaInfo, StreamInfo
+
+
+class FakeProbe:
+    def __init__(self, infos: dict):
+        self.infos = infos
+
+    def probe(self, path: str):
+        return self.infos.get(os.path.basename(path))
+
+
+def _info(path: str, *streams) -> MediaInfo:
+    """streams: (codec_type, codec_name, language) triples, numbered in order."""
+    counts = {}
+    infos = []
+    for index, (kind, codec, language) in enumerate(streams):
+        infos.append(StreamInfo(index, counts.get(kind, 0), kind, codec, language=language))
+        counts[kind] = counts.get(kind, 0) + 1
+    return MediaInfo(path, 1000, streams=infos)
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """A source with English and Japanese audio, already cleaned down to English."""
+    source, output = tmp_path / 'movie.mkv', tmp_path / 'movie_clean.mkv'
+    source.write_bytes(b'source')
+    output.write_bytes(b'output')
+    os.utime(source, ns=(1_000_000_000, 1_000_000_000))
+    os.utime(output, ns=(2_000_000_000, 2_000_000_000))
+    video = ('video', 'h264', None)
+    monkeypatch.setattr(tracks, 'get_probe', lambda: FakeProbe({
+        'movie.mkv': _info(str(source), video, ('audio', 'aac', 'eng'), ('audio', 'aac', 'jpn')),
+        'movie_clean.mkv': _info(str(output), video, ('audio', 'aac', 'eng')),
+    }))
+    return str(tmp_path)
+
+
+def _clean(folder: str, **rules) -> dict:
+    stats = TrackProcessor().clean_library(folder, TrackRules(**rules))
+    return {key: count for key, count in stats.items() if count and key != 'files'}
+
+
+def test_output_made_with_the_same_rules_is_up_to_date(library):
+    assert _clean(library, audio_languages=['en']) == {'up_to_date': 1}
+
+
+def test_output_made_with_other_rules_is_redone(library):
+    assert _clean(library, audio_languages=['jpn']) == {'changed': 1}
+
+
+def test_source_the_rules_keep_whole_is_compliant(library):
+    assert _clean(library, audio_languages=['eng', 'jpn']) == {'compliant': 1}